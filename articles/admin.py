@@ -18,5 +18,5 @@ class ArticleAdmin(admin.ModelAdmin):
         list_display (tuple): Fields to display in the admin list view.
         search_fields (tuple): Fields that can be searched via the admin interface.
     """
-    list_display = ('title', 'author', 'publication_date')
+    list_display = ('title', 'author', 'publication_date', 'sentiment_score')
     search_fields = ('title', 'author', 'content')
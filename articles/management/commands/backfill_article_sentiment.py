@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from articles.models import SENTIMENT_FIELDS, Article
+from ml.registry import active_model
+from ml.services import score_sentiments
+
+
+class Command(BaseCommand):
+    help = "Compute the stored sentiment score of the articles whose content changed or was never scored"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=1000,
+            help="Articles read, scored in one vectorized call and updated at a time (default: 1000)",
+        )
+        parser.add_argument("--all", action="store_true", help="Rescore every article, e.g. after a model change")
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive")
+
+        # One model version for the whole run, even during a hot reload
+        bundle = active_model.get()
+        started = time.perf_counter()
+        scanned = scored = 0
+        last_pk = 0
+
+        while True:
+            articles = list(
+                Article.objects.filter(pk__gt=last_pk).order_by("pk")
+                .only("pk", "content", *SENTIMENT_FIELDS)[:options["batch_size"]]
+            )
+            if not articles:
+                break
+            last_pk = articles[-1].pk
+            scanned += len(articles)
+
+            hashes = [Article.hash_content(article.content) for article in articles]
+            stale = [
+                (article, content_hash) for article, content_hash in zip(articles, hashes)
+                if options["all"] or article.sentiment_score is None or article.content_hash != content_hash
+            ]
+            if not stale:
+                continue
+
+            scores = score_sentiments([article.content for article, _ in stale], bundle)
+            for (article, content_hash), score in zip(stale, scores):
+                article.sentiment_score = score
+                article.content_hash = content_hash
+                article.sentiment_model_version = bundle.version
+            with transaction.atomic():
+                Article.objects.bulk_update([article for article, _ in stale], SENTIMENT_FIELDS)
+            scored += len(stale)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Scored {scored} of {scanned} articles in {elapsed:.2f}s with model version {bundle.version}."
+        ))
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-17 19:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='sentiment_model_version',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='sentiment_score',
+            field=models.FloatField(blank=True, db_index=True, editable=False, null=True),
+        ),
+    ]
@@ -1,8 +1,17 @@
+import hashlib
+import logging
+
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
 
 
+logger = logging.getLogger(__name__)
+
+# Fields written when the sentiment of an article is (re)computed
+SENTIMENT_FIELDS = ("sentiment_score", "content_hash", "sentiment_model_version")
+
+
 def get_today_date():
     """
     Returns the current date without time component.
@@ -21,6 +30,12 @@ class Article(models.Model):
         author (ForeignKey): Optional reference to the user who wrote the article.
         publication_date (DateTimeField): Date and time of publication,
             defaults to the current time.
+        sentiment_score (FloatField): Probability that the content is
+            positive (0 to 1), computed on save by the ml app. Indexed for
+            filtering and ordering.
+        content_hash (CharField): SHA-256 of the scored content; the score
+            is only recomputed when it changes.
+        sentiment_model_version (CharField): Model version that computed the score.
     """
     title = models.CharField(max_length=255)
     content = models.TextField()
@@ -29,7 +44,44 @@ class Article(models.Model):
         null=True, related_name="articles"
     )
     publication_date = models.DateTimeField(default=timezone.now)
+    sentiment_score = models.FloatField(null=True, blank=True, editable=False, db_index=True)
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)
+    sentiment_model_version = models.CharField(max_length=64, blank=True, editable=False)
 
     def __str__(self):
         """Return the string representation of the article (its title)."""
         return self.title
+
+    @staticmethod
+    def hash_content(content):
+        """Return the SHA-256 of an article content, as stored in `content_hash`."""
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def save(self, *args, **kwargs):
+        """
+        Save the article, scoring its sentiment first when the content changed.
+
+        A scoring failure does not prevent the save: the score is left empty
+        and `manage.py backfill_article_sentiment` computes it later.
+        """
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "content" in update_fields:
+            content_hash = self.hash_content(self.content)
+            if content_hash != self.content_hash:
+                self._score_sentiment(content_hash)
+                if update_fields is not None:
+                    kwargs["update_fields"] = {*update_fields, *SENTIMENT_FIELDS}
+        super().save(*args, **kwargs)
+
+    def _score_sentiment(self, content_hash):
+        from ml.registry import active_model
+        from ml.services import score_sentiments
+
+        try:
+            bundle = active_model.get()
+            self.sentiment_score = score_sentiments([self.content], bundle)[0]
+        except Exception:
+            logger.exception("Could not score the sentiment of article %s", self.pk)
+            self.sentiment_score, self.content_hash, self.sentiment_model_version = None, "", ""
+        else:
+            self.content_hash, self.sentiment_model_version = content_hash, bundle.version
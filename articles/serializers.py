@@ -18,6 +18,9 @@ class ArticleSerializer(serializers.ModelSerializer):
     Adds custom fields:
         - author: Human-readable name or email of the author.
         - publication_date_str: Localized, human-friendly string for the publication date.
+
+    sentiment_score (probability that the content is positive) is computed by
+    the model on save and is read-only.
     """
     # DRF will automatically call the method `get_author` and inject its
     # return value into the serialized output.
@@ -33,8 +36,8 @@ class ArticleSerializer(serializers.ModelSerializer):
         - read_only_fields (list): Fields that cannot be updated via the API.
         """
         model = Article
-        fields = ["id", "publication_date", "publication_date_str", "title", "content", "author"]
-        read_only_fields = ["publication_date_str", "author"]
+        fields = ["id", "publication_date", "publication_date_str", "title", "content", "author", "sentiment_score"]
+        read_only_fields = ["publication_date_str", "author", "sentiment_score"]
 
     def get_author(self, obj):
         """
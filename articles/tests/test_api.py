@@ -186,3 +186,61 @@ def test_article_default_ordering_is_by_publication_date(api_client, user):
 
     titles = [item["title"] for item in response.data]
     assert titles[0] == second.title
+
+
+# ============================
+# SENTIMENT SCORE
+# ============================
+
+def test_article_exposes_sentiment_score(api_client, user):
+    """The stored sentiment score is part of the serialized article."""
+    article = Article.objects.create(title="Positive", content="Super article, j'adore !", author=user)
+
+    url = reverse("article-detail", args=[article.id])
+    response = api_client.get(url)
+
+    assert response.data["sentiment_score"] == pytest.approx(article.sentiment_score)
+
+
+def test_sentiment_score_is_read_only(authenticated_client, user):
+    """Clients cannot set the sentiment score themselves."""
+    url = reverse("article-list")
+    response = authenticated_client.post(
+        url, {"title": "Article", "content": "Nul, horrible.", "sentiment_score": 1}, format="json",
+    )
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.data["sentiment_score"] < 0.5
+
+
+def test_article_filter_and_ordering_by_sentiment(api_client, user):
+    """Articles can be filtered by sentiment bounds and ordered by score."""
+    Article.objects.create(title="Positive", content="Super article, j'adore, je recommande !", author=user)
+    Article.objects.create(title="Negative", content="Nul, une perte de temps, horrible.", author=user)
+    Article.objects.create(title="Also positive", content="Très bien, merci", author=user)
+
+    response = api_client.get(reverse("article-list") + "?sentiment_min=0.5&ordering=-sentiment_score")
+
+    assert response.status_code == status.HTTP_200_OK
+    scores = [item["sentiment_score"] for item in response.data]
+    assert len(scores) == 2
+    assert scores == sorted(scores, reverse=True)
+    assert all(score >= 0.5 for score in scores)
+
+    response = api_client.get(reverse("article-list") + "?sentiment_max=0.5")
+    assert [item["title"] for item in response.data] == ["Negative"]
+
+
+def test_article_sentiment_filter_rejects_non_numbers(api_client):
+    """A sentiment bound that is not a number is a client error."""
+    response = api_client.get(reverse("article-list") + "?sentiment_min=abc")
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.parametrize("value", ["nan", "inf", "-Infinity", "5", "-0.1"])
+def test_article_sentiment_filter_rejects_bounds_outside_0_1(api_client, value):
+    """Bounds outside [0, 1], nan included, are rejected like any other invalid number."""
+    response = api_client.get(reverse("article-list") + f"?sentiment_max={value}")
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
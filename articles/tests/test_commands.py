@@ -0,0 +1,43 @@
+import pytest
+from django.core.management import call_command
+
+from articles.models import Article
+
+# All tests in this file require access to the test database
+pytestmark = pytest.mark.django_db
+
+
+def test_backfill_scores_unscored_and_changed_articles():
+    """Rows never scored or whose content changed behind the model's back are scored in batches."""
+    scored = Article.objects.create(title="Scored", content="Super article")
+    Article.objects.bulk_create([  # bulk_create bypasses save(): no score
+        Article(title=f"Imported {i}", content="Nul, horrible" if i % 2 else "Super, j'adore") for i in range(5)
+    ])
+    Article.objects.filter(pk=scored.pk).update(content="Nul, horrible")
+
+    call_command("backfill_article_sentiment", batch_size=2)
+
+    articles = list(Article.objects.order_by("pk"))
+    assert all(article.sentiment_score is not None for article in articles)
+    assert all(article.content_hash == Article.hash_content(article.content) for article in articles)
+    assert articles[0].sentiment_score < 0.5
+    assert [article.sentiment_score < 0.5 for article in articles[1:]] == [False, True, False, True, False]
+
+
+def test_backfill_skips_up_to_date_articles(monkeypatch):
+    """Articles whose score matches their content are not rescored, unless --all is given."""
+    from articles.management.commands import backfill_article_sentiment
+
+    Article.objects.create(title="Scored", content="Super article")
+    calls = []
+    monkeypatch.setattr(
+        backfill_article_sentiment, "score_sentiments",
+        lambda texts, bundle=None: calls.append(texts) or [0.5] * len(texts),
+    )
+
+    call_command("backfill_article_sentiment")
+    assert calls == []
+
+    call_command("backfill_article_sentiment", "--all")
+    assert calls == [["Super article"]]
+    assert Article.objects.get().sentiment_score == 0.5
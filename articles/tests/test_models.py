@@ -142,3 +142,81 @@ def test_article_accepts_long_content(user):
 
     # Should not raise any exception
     article.full_clean()
+
+
+# ============================
+# SENTIMENT SCORE
+# ============================
+
+def test_sentiment_score_is_computed_on_save():
+    """Saving an article stores the probability that its content is positive."""
+    positive = Article.objects.create(title="Positive", content="Super article, j'adore, je recommande !")
+    negative = Article.objects.create(title="Negative", content="Nul, une perte de temps, horrible.")
+
+    assert 0.5 < positive.sentiment_score <= 1
+    assert 0 <= negative.sentiment_score < 0.5
+    assert positive.content_hash == Article.hash_content(positive.content)
+    assert positive.sentiment_model_version
+
+
+def test_long_content_is_scored_by_windows(settings, monkeypatch):
+    """Content longer than ML_LONG_TEXT_CHARS goes through the long-document path."""
+    from ml import services
+
+    settings.ML_LONG_TEXT_CHARS = 200
+    content = "Super article, j'adore, je recommande ! " * 50
+    calls = []
+    real_predict_long_document = services.predict_long_document
+
+    def counting_predict_long_document(text, bundle=None, with_windows=False):
+        calls.append(text)
+        return real_predict_long_document(text, bundle, with_windows)
+
+    monkeypatch.setattr(services, "predict_long_document", counting_predict_long_document)
+    article = Article.objects.create(title="Long", content=content)
+
+    assert calls == [content]
+    assert article.sentiment_score > 0.5
+
+
+def test_sentiment_is_only_rescored_when_content_changes(monkeypatch):
+    """Saves that do not change the content do not run the model."""
+    from ml import services
+
+    calls = []
+    real_score_sentiments = services.score_sentiments
+
+    def counting_score_sentiments(texts, bundle=None):
+        calls.append(texts)
+        return real_score_sentiments(texts, bundle)
+
+    monkeypatch.setattr(services, "score_sentiments", counting_score_sentiments)
+
+    article = Article.objects.create(title="Article", content="Super article")
+    article.title = "Renamed"
+    article.save()
+    article.save(update_fields=["title"])
+    assert len(calls) == 1
+
+    article.content = "Nul, horrible"
+    article.save(update_fields=["content"])
+    article.refresh_from_db()
+
+    assert len(calls) == 2
+    assert article.sentiment_score < 0.5
+    assert article.content_hash == Article.hash_content("Nul, horrible")
+
+
+def test_scoring_failure_does_not_prevent_save(monkeypatch):
+    """An unavailable model leaves the score empty, for the backfill to compute."""
+    from ml import services
+
+    def failing_score_sentiments(texts, bundle=None):
+        raise RuntimeError("model unavailable")
+
+    monkeypatch.setattr(services, "score_sentiments", failing_score_sentiments)
+    article = Article.objects.create(title="Article", content="Super article")
+
+    assert article.pk is not None
+    assert article.sentiment_score is None
+    assert article.content_hash == ""
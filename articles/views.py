@@ -5,7 +5,10 @@ This module defines viewsets that expose CRUD operations for the Article model
 using Django REST Framework.
 """
 
+import math
+
 from rest_framework import viewsets, filters
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from .models import Article
 from .serializers import ArticleSerializer
@@ -17,7 +20,8 @@ class ArticleViewSet(viewsets.ModelViewSet):
 
     This class automatically provides 'list', 'create', 'retrieve',
     'update', and 'destroy' actions via DRF's ModelViewSet.
-    It also supports search and ordering via query parameters.
+    It also supports search and ordering via query parameters, and filtering
+    on the stored sentiment score (?sentiment_min=0.5&sentiment_max=1).
     """
     queryset = Article.objects.all()
     serializer_class = ArticleSerializer
@@ -28,7 +32,32 @@ class ArticleViewSet(viewsets.ModelViewSet):
     # Enable search and ordering filters
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['title', 'content']                    # e.g., ?search=python
-    ordering_fields = ['publication_date', 'title']         # e.g., ?ordering=-title
+    ordering_fields = ['publication_date', 'title', 'sentiment_score']  # e.g., ?ordering=-sentiment_score
+
+    # Query parameter -> lookup on the indexed sentiment_score column
+    sentiment_filters = {'sentiment_min': 'sentiment_score__gte', 'sentiment_max': 'sentiment_score__lte'}
+
+    def get_queryset(self):
+        """
+        Apply the sentiment score bounds given in the query parameters.
+
+        Raises:
+            ValidationError: If a bound is not a number between 0 and 1.
+        """
+        queryset = super().get_queryset()
+        for param, lookup in self.sentiment_filters.items():
+            value = self.request.query_params.get(param)
+            if value is None:
+                continue
+            try:
+                bound = float(value)
+            except ValueError:
+                bound = math.nan
+            # nan fails the comparison too
+            if not 0 <= bound <= 1:
+                raise ValidationError({param: "Un nombre entre 0 et 1 est attendu."})
+            queryset = queryset.filter(**{lookup: bound})
+        return queryset
     
     def get_permissions(self):
         """
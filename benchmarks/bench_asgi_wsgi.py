@@ -0,0 +1,135 @@
+"""
+Side-by-side load benchmark of the sync (WSGI) and async (ASGI) sentiment views.
+
+Starts one server process per mode on a free local port:
+    - wsgi: gunicorn, gthread worker with --threads threads, sync view
+    - asgi: uvicorn, async view scoring in the ML_ASYNC_MAX_WORKERS pool
+
+then sends --requests prediction requests with --concurrency clients at once
+and prints throughput and latency percentiles. --slow-upload-ms makes every
+client send its body in two halves separated by that delay, which is what
+slow mobile clients do: a WSGI thread is held during the upload, the ASGI
+event loop is not.
+
+Usage (from the repository root, with the usual .env variables set):
+    python -m benchmarks.bench_asgi_wsgi [--concurrency 64] [--slow-upload-ms 200]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+def free_port():
+    """Return a free local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def server_command(mode, port, threads):
+    """Return the command line and URL path of a server mode."""
+    if mode == "wsgi":
+        command = [
+            sys.executable, "-m", "gunicorn", "weeb_api.wsgi:application",
+            "--bind", f"127.0.0.1:{port}", "--workers", "1",
+            "--worker-class", "gthread", "--threads", str(threads),
+        ]
+        return command, "/api/ml/predict/sentiment-analysis"
+    command = [
+        sys.executable, "-m", "uvicorn", "weeb_api.asgi:application",
+        "--host", "127.0.0.1", "--port", str(port), "--workers", "1", "--no-access-log",
+    ]
+    return command, "/api/ml/predict/sentiment-analysis/async"
+
+
+async def one_request(client, url, index, slow_upload):
+    """Send one prediction request and return its latency in seconds."""
+    body = json.dumps({"text": f"Super article numéro {index}, j'adore !"}).encode()
+
+    async def chunks():
+        yield body[: len(body) // 2]
+        await asyncio.sleep(slow_upload)
+        yield body[len(body) // 2:]
+
+    started = time.perf_counter()
+    response = await client.post(
+        url,
+        content=chunks() if slow_upload else body,
+        headers={"Content-Type": "application/json", "Content-Length": str(len(body))},
+    )
+    response.raise_for_status()
+    return time.perf_counter() - started
+
+
+async def load(url, requests, concurrency, slow_upload):
+    """Run the load and return (wall time, latencies)."""
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=120) as client:
+        async def bounded(index):
+            async with semaphore:
+                return await one_request(client, url, index, slow_upload)
+
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*(bounded(i) for i in range(requests)))
+        return time.perf_counter() - started, sorted(latencies)
+
+
+def wait_until_up(base_url, path, deadline=60):
+    """Poll the server until it answers a prediction request."""
+    end = time.time() + deadline
+    while True:
+        try:
+            httpx.post(base_url + path, json={"text": "warm up"}, timeout=5).raise_for_status()
+            return
+        except httpx.HTTPError:
+            if time.time() > end:
+                raise RuntimeError(f"server at {base_url} did not start")
+            time.sleep(0.2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--threads", type=int, default=8, help="gthread threads of the WSGI worker")
+    parser.add_argument("--slow-upload-ms", type=float, default=0)
+    parser.add_argument("--modes", nargs="+", choices=["wsgi", "asgi"], default=["wsgi", "asgi"])
+    args = parser.parse_args()
+
+    print(f"{'mode':<5} {'req/s':>8} {'p50 (ms)':>9} {'p90 (ms)':>9} {'p99 (ms)':>9}")
+    for mode in args.modes:
+        port = free_port()
+        command, path = server_command(mode, port, args.threads)
+        env = dict(os.environ)
+        env["ALLOWED_HOSTS"] = ",".join(filter(None, [env.get("ALLOWED_HOSTS"), "127.0.0.1"]))
+        server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            wait_until_up(base_url, path)
+            wall, latencies = asyncio.run(
+                load(base_url + path, args.requests, args.concurrency, args.slow_upload_ms / 1000)
+            )
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+
+        print(f"{mode:<5} {len(latencies) / wall:>8.1f} {statistics.median(latencies) * 1000:>9.1f} "
+              f"{percentile(0.90):>9.1f} {percentile(0.99):>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
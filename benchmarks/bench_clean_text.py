@@ -0,0 +1,54 @@
+"""
+Micro-benchmark of the text cleaning used on the ML hot path.
+
+Compares the optimized `utils.text_utils.clean_text` with the original
+multi-pass implementation (`reference_clean_text`) on short, medium and long
+texts, and times the `clean_texts` batch API.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_clean_text [--repeat 5] [--number 20000]
+"""
+
+import argparse
+import timeit
+
+from utils.text_utils import clean_text, clean_texts, reference_clean_text
+
+
+SAMPLES = {
+    "short": "Super !",
+    "medium": "Salut @bob ! Regarde https://t.co/xyz c'est génial #anime 2024 © vraiment top...",
+    "long": " ".join(
+        ["Ce film est vraiment super, je le recommande à tout le monde (9/10) !"] * 30
+    ),
+}
+
+
+def best_time(func, number, repeat):
+    """Return the best time per call, in microseconds, over `repeat` runs."""
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'sample':<8} {'reference (µs)':>15} {'clean_text (µs)':>16} {'speedup':>8}")
+    for name, text in SAMPLES.items():
+        assert clean_text(text) == reference_clean_text(text)
+        number = max(1, args.number // max(1, len(text) // 100))
+        reference = best_time(lambda: reference_clean_text(text), number, args.repeat)
+        optimized = best_time(lambda: clean_text(text), number, args.repeat)
+        print(f"{name:<8} {reference:>15.2f} {optimized:>16.2f} {reference / optimized:>7.2f}x")
+
+    batch = list(SAMPLES.values()) * 1000
+    reference = best_time(lambda: [reference_clean_text(text) for text in batch], 1, args.repeat)
+    optimized = best_time(lambda: clean_texts(batch), 1, args.repeat)
+    print(f"\nbatch of {len(batch)} texts: reference {reference / 1000:.1f} ms, "
+          f"clean_texts {optimized / 1000:.1f} ms ({reference / optimized:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Benchmark suite of the ML inference hot path, with regression check against a baseline.
+
+On a fixed, generated corpus of short, medium and long French comments, times
+every stage of a single-text prediction separately:
+    - clean:     utils.clean_text
+    - transform: vectorizer.transform of the cleaned text
+    - predict:   model.predict of the vectorized row
+    - view:      the whole `sentiment_analysis` view (JSON parsing, cleaning,
+                 scoring, response), prediction cache disabled
+
+and reports p50/p90/p99 latencies plus the memory allocated per call
+(tracemalloc, measured in a separate pass as it slows allocations down). It
+then compares the throughput (best of 3) of one `predict_sentiment` call per
+text with one `predict_sentiments` call for the whole corpus.
+
+Results are compared with a stored baseline (benchmarks/baseline_inference.json
+by default): every latency or throughput worse than the baseline by more than
+--tolerance is reported as a regression. Timings depend on the machine, so
+record the baseline on the machine that runs the comparison.
+
+Usage (from the repository root, with the usual environment variables set):
+    python -m benchmarks.bench_inference [--iterations 300] [--save-baseline]
+    python -m benchmarks.bench_inference --fail-on-regression --tolerance 0.25
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import django
+import numpy as np
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline_inference.json")
+
+PHRASES = [
+    "Super article, j'adore !",
+    "Nul, une perte de temps.",
+    "Le site répond globalement aux attentes",
+    "Je ne suis pas content du tout, service client horrible",
+    "Très bien, je recommande à tout le monde",
+    "Pas terrible, déçu par la fin de l'anime",
+    "Un chef-d'oeuvre absolu, merci @studio https://example.com #anime",
+    "L'animation est magnifique mais le scénario est un peu lent (7/10)",
+    "Honnêtement je ne m'attendais à rien et j'ai été agréablement surpris",
+    "Les personnages secondaires sont mal écrits, dommage...",
+]
+
+# Number of phrases joined into one text of each size
+SIZES = {"short": (1, 1), "medium": (3, 6), "long": (30, 60)}
+
+
+def build_corpus(per_size, seed=42):
+    """Return {size: [texts]}: `per_size` reproducible texts of each size."""
+    rng = random.Random(seed)
+    return {
+        size: [" ".join(rng.choice(PHRASES) for _ in range(rng.randint(low, high))) for _ in range(per_size)]
+        for size, (low, high) in SIZES.items()
+    }
+
+
+def latencies(func, inputs):
+    """Call func(x) for every input and return the p50/p90/p99 latencies in µs."""
+    for value in inputs[:10]:
+        func(value)  # warm-up, out of the measure
+    timings = np.empty(len(inputs))
+    for i, value in enumerate(inputs):
+        started = time.perf_counter()
+        func(value)
+        timings[i] = time.perf_counter() - started
+    p50, p90, p99 = np.percentile(timings, [50, 90, 99]) * 1e6
+    return {"p50_us": round(p50, 2), "p90_us": round(p90, 2), "p99_us": round(p99, 2)}
+
+
+def allocations(func, inputs):
+    """Return the largest peak of memory (KiB) allocated by one call, over a traced pass."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    peak = 0
+    for value in inputs:
+        tracemalloc.reset_peak()
+        func(value)
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+    return {"peak_kib": round(peak / 1024, 2)}
+
+
+def throughput(func, count, repeat=3):
+    """Return the best texts/s of `repeat` calls of func() scoring `count` texts."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return count / best
+
+
+def run(iterations):
+    """Run the whole suite and return its results as a JSON-serializable dict."""
+    from django.conf import settings
+    from django.test import RequestFactory
+
+    from ml.registry import active_model
+    from ml.services import predict_sentiment, predict_sentiments
+    from ml.views import sentiment_analysis
+    from utils import clean_text
+
+    settings.ML_PREDICTION_CACHE_SIZE = 0
+    bundle = active_model.get()
+    vectorizer, model = bundle.sklearn()
+    factory = RequestFactory()
+    corpus = build_corpus(iterations)
+
+    def view(text):
+        request = factory.post(
+            "/api/ml/predict/sentiment-analysis", json.dumps({"text": text}), content_type="application/json",
+        )
+        response = sentiment_analysis(request)
+        assert response.status_code == 200, response.content
+
+    stages = {}
+    for size, texts in corpus.items():
+        cleaned = [clean_text(text) for text in texts]
+        rows = [vectorizer.transform([text]) for text in cleaned]
+        steps = {
+            "clean": (clean_text, texts),
+            "transform": (lambda text: vectorizer.transform([text]), cleaned),
+            "predict": (model.predict, rows),
+            "view": (view, texts),
+        }
+        stages[size] = {
+            name: {**latencies(func, inputs), **allocations(func, inputs[:50])}
+            for name, (func, inputs) in steps.items()
+        }
+        stages[size]["mean_chars"] = round(sum(map(len, texts)) / len(texts), 1)
+
+    texts = [text for size_texts in corpus.values() for text in size_texts]
+    single = throughput(lambda: [predict_sentiment(text, bundle) for text in texts], len(texts))
+    batch = throughput(lambda: predict_sentiments(texts, bundle), len(texts))
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "model_version": bundle.version,
+            "scoring_engine": settings.ML_SCORING_ENGINE,
+            "iterations": iterations,
+        },
+        "stages": stages,
+        "throughput": {
+            "single_texts_per_s": round(single, 1),
+            "batch_texts_per_s": round(batch, 1),
+        },
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare results with a baseline.
+
+    Returns:
+        list[tuple[str, float, float, bool]]: (metric, baseline, current,
+        regressed) for every latency (lower is better) and throughput (higher
+        is better) present in both.
+    """
+    rows = []
+    for size, stages in results["stages"].items():
+        for stage, metrics in stages.items():
+            if not isinstance(metrics, dict):
+                continue
+            for metric, value in metrics.items():
+                reference = baseline.get("stages", {}).get(size, {}).get(stage, {}).get(metric)
+                if metric.endswith("_us") and reference:
+                    rows.append((f"{size}.{stage}.{metric}", reference, value, value > reference * (1 + tolerance)))
+    for metric, value in results["throughput"].items():
+        reference = baseline.get("throughput", {}).get(metric)
+        if reference:
+            rows.append((f"throughput.{metric}", reference, value, value < reference / (1 + tolerance)))
+    return rows
+
+
+def print_results(results):
+    print(f"{'size':<7} {'stage':<10} {'p50 (µs)':>10} {'p90 (µs)':>10} {'p99 (µs)':>10} {'peak (KiB)':>11}")
+    for size, stages in results["stages"].items():
+        for stage, metrics in stages.items():
+            if isinstance(metrics, dict):
+                print(f"{size:<7} {stage:<10} {metrics['p50_us']:>10.1f} {metrics['p90_us']:>10.1f} "
+                      f"{metrics['p99_us']:>10.1f} {metrics['peak_kib']:>11.1f}")
+    throughput = results["throughput"]
+    print(f"\nsingle-text: {throughput['single_texts_per_s']:,.0f} texts/s, "
+          f"batch: {throughput['batch_texts_per_s']:,.0f} texts/s "
+          f"({throughput['batch_texts_per_s'] / throughput['single_texts_per_s']:.1f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=300, help="Texts timed per size and stage")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before a regression (0.2 = 20%%)")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 on a regression")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "weeb_api.settings.development")
+    django.setup()
+
+    results = run(args.iterations)
+    print_results(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+        return
+
+    if not os.path.isfile(args.baseline):
+        print(f"\nNo baseline at {args.baseline}, run with --save-baseline to record one")
+        return
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    rows = compare(results, baseline, args.tolerance)
+    regressions = [row for row in rows if row[3]]
+    print(f"\nAgainst {args.baseline} (tolerance {args.tolerance:.0%}):")
+    for metric, reference, value, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"   {metric:<36} {reference:>12,.1f} -> {value:>12,.1f} ({value / reference:.2f}x){flag}")
+    print(f"{len(regressions)} regression(s) out of {len(rows)} metrics")
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Memory and throughput of the inference sidecar against in-process scoring.
+
+Starts gunicorn once per mode, sends the same concurrent load of prediction
+requests (prediction cache disabled, so every request is scored), then reads
+the memory of every worker, and of the sidecar, from /proc/<pid>/smaps_rollup
+(Linux only, see bench_worker_memory).
+
+Modes:
+    - in-process: each worker loads the artifacts and scores in the request thread
+    - sidecar:    `manage.py ml_sidecar` holds the only copy of the artifacts and
+                  batches the texts of every worker (ML_SIDECAR_ENABLED)
+
+Usage (from the repository root, with the usual .env variables set):
+    python -m benchmarks.bench_sidecar [--workers 4] [--clients 16] [--requests 2000]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks.bench_inference import build_corpus
+from benchmarks.bench_worker_memory import free_port, predict, smaps_rollup, worker_pids
+
+
+MODES = {
+    "in-process": {"ML_SIDECAR_ENABLED": "false"},
+    "sidecar": {"ML_SIDECAR_ENABLED": "true"},
+}
+
+
+def wait_for(check, what, timeout=60):
+    """Call check() until it stops raising OSError."""
+    deadline = time.time() + timeout
+    while True:
+        try:
+            return check()
+        except OSError:
+            if time.time() > deadline:
+                raise RuntimeError(f"{what} did not start")
+            time.sleep(0.2)
+
+
+def load(port, texts, clients):
+    """Send every text from `clients` threads; return requests/s and p50/p99 latencies (ms)."""
+    def call(text):
+        started = time.perf_counter()
+        predict(port, text)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        timings = np.fromiter(pool.map(call, texts), dtype=np.float64, count=len(texts))
+    elapsed = time.perf_counter() - started
+    p50, p99 = np.percentile(timings, [50, 99]) * 1000
+    return len(texts) / elapsed, p50, p99
+
+
+def measure(mode, workers, clients, texts):
+    """Run gunicorn (and the sidecar) in `mode`; return throughput, latencies and memory figures."""
+    port = free_port()
+    socket_path = os.path.join(tempfile.mkdtemp(), "sidecar.sock")
+    env = dict(
+        os.environ, **MODES[mode],
+        GUNICORN_WORKERS=str(workers), GUNICORN_BIND=f"127.0.0.1:{port}",
+        ML_SIDECAR_SOCKET=socket_path, ML_PREDICTION_CACHE_SIZE="0",
+    )
+    env["ALLOWED_HOSTS"] = ",".join(filter(None, [env.get("ALLOWED_HOSTS"), "127.0.0.1"]))
+
+    processes = []
+    try:
+        sidecar = None
+        if mode == "sidecar":
+            sidecar = subprocess.Popen(
+                [sys.executable, "manage.py", "ml_sidecar"],
+                env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            processes.append(sidecar)
+            wait_for(lambda: os.stat(socket_path), "The sidecar")
+
+        master = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "weeb_api.wsgi:application", "-c", "gunicorn.conf.py"],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        processes.append(master)
+        wait_for(lambda: predict(port, "warm up"), f"gunicorn in mode '{mode}'")
+
+        # Warm every worker up, then measure
+        load(port, texts[:workers * 20], clients)
+        throughput, p50, p99 = load(port, texts, clients)
+
+        figures = [smaps_rollup(pid) for pid in worker_pids(master.pid)]
+        if sidecar is not None:
+            figures.append(smaps_rollup(sidecar.pid))
+        return throughput, p50, p99, figures
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            process.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent client threads")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests measured per mode")
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.requests)
+    # Mostly short and medium texts, like the real traffic
+    texts = (corpus["short"] + corpus["medium"])[:args.requests]
+
+    print(f"{'mode':<11} {'req/s':>8} {'p50 (ms)':>9} {'p99 (ms)':>9} {'PSS (MiB)':>10} {'USS (MiB)':>10}")
+    for mode in args.modes:
+        throughput, p50, p99, figures = measure(mode, args.workers, args.clients, texts)
+        total_pss = sum(pss for _, pss, _ in figures)
+        total_uss = sum(uss for _, _, uss in figures)
+        print(f"{mode:<11} {throughput:>8.0f} {p50:>9.2f} {p99:>9.2f} {total_pss:>10.1f} {total_uss:>10.1f}")
+    print("\nPSS and USS are summed over the workers (and the sidecar).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Peak memory of the streaming NDJSON endpoint versus a whole-payload batch.
+
+Scores N generated comments the way `sentiment_analysis_stream` does (lines
+read one at a time, scored by chunks, results yielded per chunk) and the way
+a JSON array batch would (whole request parsed, whole response built), and
+reports the tracemalloc peak of each for growing N. The streaming peak should
+stay flat while the batch one grows with N.
+
+Usage (from the repository root, with the usual environment variables set):
+    python -m benchmarks.bench_stream_memory [--sizes 1000 10000 100000]
+"""
+
+import argparse
+import json
+import os
+import time
+import tracemalloc
+
+import django
+
+
+SENTENCES = [
+    "Super article, j'adore !",
+    "Nul, une perte de temps.",
+    "Le site répond globalement aux attentes",
+    "Je ne suis pas content du tout, service client horrible",
+]
+
+
+class GeneratedBody:
+    """Request-like body producing `size` NDJSON lines lazily through readline()."""
+
+    def __init__(self, size):
+        self._lines = (
+            (json.dumps({"id": i, "text": f"{SENTENCES[i % len(SENTENCES)]} {i}"}) + "\n").encode()
+            for i in range(size)
+        )
+        self._pending = b""
+
+    def readline(self, size=-1):
+        if not self._pending:
+            self._pending = next(self._lines, b"")
+        line, self._pending = (self._pending, b"") if size < 0 else (self._pending[:size], self._pending[size:])
+        return line
+
+
+def measure(func):
+    """Return (seconds, peak MiB) of a call; tracemalloc runs apart as it slows allocations."""
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "weeb_api.settings.development")
+    django.setup()
+
+    from django.conf import settings
+    from ml.registry import active_model
+    from ml.services import predict_sentiments
+    from ml.views import _read_ndjson_lines, _stream_ndjson_results
+
+    bundle = active_model.get()
+    settings.ML_PREDICTION_CACHE_SIZE = 0
+
+    def stream(size):
+        lines = _read_ndjson_lines(GeneratedBody(size), settings.ML_STREAM_MAX_LINE_BYTES)
+        for _ in _stream_ndjson_results(lines, bundle):
+            pass
+
+    def batch(size):
+        body = b"".join(iter(GeneratedBody(size).readline, b""))
+        texts = [item["text"] for item in map(json.loads, body.splitlines())]
+        json.dumps({"results": [{"prediction": p} for p in predict_sentiments(texts, bundle)]})
+
+    print(f"chunk size {settings.ML_STREAM_CHUNK_SIZE}, engine {settings.ML_SCORING_ENGINE}")
+    print(f"{'texts':>8} {'stream peak (MiB)':>18} {'batch peak (MiB)':>17} {'stream (s)':>11} {'batch (s)':>10}")
+    for size in args.sizes:
+        stream_time, stream_peak = measure(lambda: stream(size))
+        batch_time, batch_peak = measure(lambda: batch(size))
+        print(f"{size:>8} {stream_peak:>18.1f} {batch_peak:>17.1f} {stream_time:>11.2f} {batch_time:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Per-worker memory report for the gunicorn serving modes of the ML endpoint.
+
+Starts gunicorn once per serving mode, warms every worker with prediction
+requests, then reads /proc/<pid>/smaps_rollup (Linux only) for each worker:
+    - RSS: resident pages, shared ones included
+    - PSS: resident pages, shared ones divided between the processes using them
+    - USS: pages private to the worker (what a new worker really costs)
+
+Modes:
+    - baseline: sklearn pickles loaded by each worker on its first request
+    - preload:  sklearn pickles loaded by the master, then gc.freeze()
+    - shared:   linear engine with memory-mapped artifacts, preload + gc.freeze()
+
+Usage (from the repository root, with the usual .env variables set):
+    python -m benchmarks.bench_worker_memory [--workers 4] [--modes baseline shared]
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+
+MODES = {
+    "baseline": {"ML_SCORING_ENGINE": "sklearn", "GUNICORN_PRELOAD": "false", "ML_SHARED_ARTIFACTS": "false"},
+    "preload": {"ML_SCORING_ENGINE": "sklearn", "GUNICORN_PRELOAD": "true", "ML_SHARED_ARTIFACTS": "false"},
+    "shared": {"ML_SCORING_ENGINE": "linear", "GUNICORN_PRELOAD": "true", "ML_SHARED_ARTIFACTS": "true"},
+}
+
+
+def free_port():
+    """Return a free local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def smaps_rollup(pid):
+    """Return RSS, PSS and USS of a process, in MiB."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                values[parts[0].rstrip(":")] = int(parts[1])
+    uss = values.get("Private_Clean", 0) + values.get("Private_Dirty", 0)
+    return values["Rss"] / 1024, values["Pss"] / 1024, uss / 1024
+
+
+def worker_pids(master_pid):
+    """Return the pids of the gunicorn workers forked by `master_pid`."""
+    with open(f"/proc/{master_pid}/task/{master_pid}/children") as f:
+        return [int(pid) for pid in f.read().split()]
+
+
+def predict(port, text):
+    """Send one prediction request to the local server."""
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{port}/api/ml/predict/sentiment-analysis",
+        data=json.dumps({"text": text}).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.load(response)
+
+
+def measure(mode, workers, requests_per_worker):
+    """Run gunicorn in `mode` and return the memory figures of each worker."""
+    port = free_port()
+    env = dict(os.environ, **MODES[mode], GUNICORN_WORKERS=str(workers), GUNICORN_BIND=f"127.0.0.1:{port}")
+    env["ALLOWED_HOSTS"] = ",".join(filter(None, [env.get("ALLOWED_HOSTS"), "127.0.0.1"]))
+    master = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "weeb_api.wsgi:application", "-c", "gunicorn.conf.py"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.time() + 60
+        while True:
+            try:
+                predict(port, "warm up")
+                break
+            except OSError:
+                if time.time() > deadline:
+                    raise RuntimeError(f"gunicorn did not start in mode '{mode}'")
+                time.sleep(0.2)
+
+        # Enough requests for every worker to have scored some texts
+        for i in range(workers * requests_per_worker):
+            predict(port, f"Super article numéro {i}, j'adore vraiment !")
+
+        return [smaps_rollup(pid) for pid in worker_pids(master.pid)]
+    finally:
+        master.terminate()
+        master.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests-per-worker", type=int, default=50)
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    args = parser.parse_args()
+
+    print(f"{'mode':<9} {'worker':>6} {'RSS (MiB)':>10} {'PSS (MiB)':>10} {'USS (MiB)':>10}")
+    for mode in args.modes:
+        figures = measure(mode, args.workers, args.requests_per_worker)
+        for i, (rss, pss, uss) in enumerate(figures):
+            print(f"{mode:<9} {i:>6} {rss:>10.1f} {pss:>10.1f} {uss:>10.1f}")
+        total_pss = sum(pss for _, pss, _ in figures)
+        mean_uss = sum(uss for _, _, uss in figures) / len(figures)
+        print(f"{mode:<9} {'total':>6} {'':>10} {total_pss:>10.1f} {mean_uss:>10.1f} (mean USS)\n")
+
+
+if __name__ == "__main__":
+    main()
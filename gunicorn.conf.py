@@ -0,0 +1,65 @@
+"""
+Gunicorn configuration for the weeb_api project.
+
+Usage:
+    gunicorn weeb_api.wsgi:application -c gunicorn.conf.py
+
+With GUNICORN_PRELOAD=true the master process imports the Django application
+and loads the ML artifacts (ml.services.preload_artifacts) before forking the
+workers. Every object alive at that point is then moved to the permanent
+generation with gc.freeze(), so the garbage collector of the workers never
+touches (and copies) the pages inherited from the master.
+
+With ML_WARMUP_ENABLED, the preloaded master also waits for the model
+warm-up (ml/warmup.py) before forking, so every worker starts warm and ready.
+
+Each worker writes its buffered prediction log rows (ml/prediction_log.py)
+and its drift sketch (ml/drift.py) before exiting, see `worker_exit`.
+
+With ML_SIDECAR_ENABLED, the workers do not load the artifacts at all: they
+send their texts to `manage.py ml_sidecar` (ml/sidecar.py), run next to
+gunicorn.
+
+Combine it with ML_SCORING_ENGINE=linear and ML_SHARED_ARTIFACTS=true to keep
+the numeric arrays and the vocabulary in read-only memory-mapped files, shared
+by all workers through the page cache.
+"""
+
+import gc
+import os
+
+from utils.utils import env_bool, env_int
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = env_int("GUNICORN_WORKERS", 4)
+preload_app = env_bool("GUNICORN_PRELOAD")
+
+
+def when_ready(server):
+    """Load the ML artifacts (and wait for the warm-up) in the master once the application is preloaded."""
+    if not server.cfg.preload_app:
+        return
+
+    from ml.services import preload_artifacts
+    from ml.warmup import warmup
+
+    preload_artifacts()
+    warmup.wait()
+    gc.collect()
+    gc.freeze()
+    server.log.info("ML artifacts preloaded, %d objects frozen", gc.get_freeze_count())
+
+
+def pre_fork(server, worker):
+    """Freeze whatever the master allocated since the previous fork."""
+    if server.cfg.preload_app:
+        gc.freeze()
+
+
+def worker_exit(server, worker):
+    """Write the prediction log rows and the drift sketch still held by the exiting worker."""
+    from ml.drift import drift_monitor
+    from ml.prediction_log import prediction_log
+
+    prediction_log.close()
+    drift_monitor.flush()
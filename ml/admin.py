@@ -1,3 +1,32 @@
 from django.contrib import admin
+from .models import PredictionLog, SentimentFeedback
 
-# Register your models here.
+@admin.register(PredictionLog)
+class PredictionLogAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for the PredictionLog model.
+
+    Read-mostly view of the predictions served, filterable by model version
+    and endpoint.
+    """
+    # Fields shown in the admin list view
+    list_display = ('created_at', 'prediction', 'model_version', 'endpoint', 'text')
+
+    # Filters and search of the admin list view
+    list_filter = ('prediction', 'model_version', 'endpoint')
+    search_fields = ('text',)
+
+
+@admin.register(SentimentFeedback)
+class SentimentFeedbackAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for the SentimentFeedback model.
+
+    Lists the user-labelled texts, pending ones having no applied version.
+    """
+    # Fields shown in the admin list view
+    list_display = ('created_at', 'label', 'model_version', 'applied_version', 'text')
+
+    # Filters and search of the admin list view
+    list_filter = ('label', 'applied_version')
+    search_fields = ('text',)
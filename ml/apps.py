@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class MlConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "ml"
+
+    def ready(self):
+        """Start warming the sentiment model up in the background (ML_WARMUP_ENABLED)."""
+        if settings.ML_WARMUP_ENABLED:
+            from .warmup import warmup
+
+            warmup.start()
@@ -0,0 +1,167 @@
+"""
+Prediction cache for the sentiment endpoints.
+
+Short texts such as "super" or "nul" come back over and over. Predictions are
+cached by a hash of the cleaned text and of the model version, in two levels:
+    - a bounded in-process LRU with a TTL (always on, see ML_PREDICTION_CACHE_SIZE)
+    - an optional shared Django cache (ML_PREDICTION_CACHE_BACKEND), so workers
+      and pods reuse each other's predictions
+
+The model version is part of every key: as soon as different artifacts are
+loaded, the old entries are never read again and leave the local LRU as it
+fills up. Nothing is dropped on a version change, so requests still served by
+the previous version during a hot reload keep their entries.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU + TTL cache of predictions, with hit/miss/eviction counters.
+
+    Size, TTL and shared backend are read from the settings on each call, so
+    they can be changed without rebuilding the cache.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(cleaned_text, version):
+        """
+        Build the cache key of a cleaned text for a given model version.
+
+        Args:
+            cleaned_text (str): A text returned by `clean_text`.
+            version (str): The model version.
+
+        Returns:
+            str: The cache key.
+        """
+        digest = hashlib.blake2b(cleaned_text.encode("utf-8"), digest_size=16).hexdigest()
+        return f"ml:sentiment:{version}:{digest}"
+
+    def _shared_cache(self):
+        alias = settings.ML_PREDICTION_CACHE_BACKEND
+        return caches[alias] if alias else None
+
+    def get_many(self, cleaned_texts, version):
+        """
+        Look up the cached predictions of several cleaned texts.
+
+        Args:
+            cleaned_texts (list[str]): Distinct cleaned texts.
+            version (str): The model version the predictions must come from.
+
+        Returns:
+            dict[str, int]: Cleaned text to prediction, for cache hits only.
+        """
+        if settings.ML_PREDICTION_CACHE_SIZE <= 0:
+            return {}
+
+        keys = {self.make_key(text, version): text for text in cleaned_texts}
+        found = {}
+        now = time.monotonic()
+
+        with self._lock:
+            self._version = version
+            for key, text in keys.items():
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                prediction, expires_at = entry
+                if expires_at <= now:
+                    del self._entries[key]
+                    self.evictions += 1
+                    continue
+                self._entries.move_to_end(key)
+                found[text] = prediction
+
+        shared = self._shared_cache()
+        missing = [key for key, text in keys.items() if text not in found]
+        if shared is not None and missing:
+            shared_found = shared.get_many(missing)
+            self._store_local(shared_found, now)
+            for key, prediction in shared_found.items():
+                found[keys[key]] = prediction
+
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def set_many(self, predictions, version):
+        """
+        Store freshly computed predictions.
+
+        Args:
+            predictions (dict[str, int]): Cleaned text to prediction.
+            version (str): The model version the predictions come from.
+        """
+        if settings.ML_PREDICTION_CACHE_SIZE <= 0 or not predictions:
+            return
+
+        entries = {self.make_key(text, version): prediction for text, prediction in predictions.items()}
+        with self._lock:
+            self._version = version
+        self._store_local(entries, time.monotonic())
+
+        shared = self._shared_cache()
+        if shared is not None:
+            shared.set_many(entries, timeout=settings.ML_PREDICTION_CACHE_TTL)
+
+    def _store_local(self, entries, now):
+        expires_at = now + settings.ML_PREDICTION_CACHE_TTL
+        maxsize = settings.ML_PREDICTION_CACHE_SIZE
+        with self._lock:
+            for key, prediction in entries.items():
+                self._entries[key] = (prediction, expires_at)
+                self._entries.move_to_end(key)
+            while len(self._entries) > maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every local entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """
+        Return the counters of this process' cache.
+
+        Returns:
+            dict: size, maxsize, ttl, hits, misses, evictions, hit_rate, last
+            version looked up or stored and the alias of the shared backend (None when disabled).
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": settings.ML_PREDICTION_CACHE_SIZE,
+                "ttl": settings.ML_PREDICTION_CACHE_TTL,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "version": self._version,
+                "shared_backend": settings.ML_PREDICTION_CACHE_BACKEND or None,
+            }
+
+
+# Process-wide cache used by ml.services
+prediction_cache = PredictionCache()
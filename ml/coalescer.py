@@ -0,0 +1,152 @@
+"""
+Micro-batching of concurrent single-text predictions.
+
+When many clients call the sentiment endpoint at the same time, every request
+pays the fixed cost of `transform` and `predict` on its own. With
+ML_COALESCE_ENABLED, the requests of a worker hand their cleaned text to a
+`BatchCoalescer`: a background thread collects the texts arriving within a
+small window (ML_COALESCE_WINDOW_MS) or until ML_COALESCE_MAX_BATCH texts are
+waiting, scores them as one batch and gives each caller its own result.
+
+Only threaded workers (gunicorn --threads, ASGI) have concurrent requests to
+coalesce; with one request at a time the window only adds latency.
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from utils.threads import ProcessThread
+
+
+class BatchCoalescer:
+    """
+    Collect texts submitted concurrently and score them in batches.
+
+    Args:
+        score_batch (callable): Function mapping a list of submitted items
+            (cleaned texts) to a list of predictions, in the same order.
+        window (float): Maximum time, in seconds, the first text of a batch
+            waits for others.
+        max_batch (int): Batch size that triggers scoring before the window ends.
+    """
+
+    # Upper bounds of the batch size histogram buckets
+    BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+    def __init__(self, score_batch, window=0.002, max_batch=32):
+        self.score_batch = score_batch
+        self.window = window
+        self.max_batch = max_batch
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._worker = ProcessThread(self._run, "ml-batch-coalescer", self._lock)
+        self.batches = 0
+        self.items = 0
+        self.max_batch_size = 0
+        self.fallbacks = 0
+        self.batch_size_histogram = [0] * (len(self.BATCH_SIZE_BUCKETS) + 1)
+        # Recent queueing delays (seconds), for percentiles
+        self._delays = deque(maxlen=2048)
+
+    def _new_queue(self, forked):
+        # Items queued for a previous thread would never be scored
+        self._queue = queue.SimpleQueue()
+
+    def submit(self, item):
+        """
+        Queue an item (a cleaned text) for the next batch.
+
+        Args:
+            item: What `score_batch` expects for one text.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the prediction of the item.
+        """
+        self._worker.ensure(self._new_queue)
+        future = Future()
+        self._queue.put((item, future, time.monotonic()))
+        return future
+
+    def fallback(self):
+        """Count a caller that gave up waiting and scored its item itself."""
+        with self._lock:
+            self.fallbacks += 1
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started_at = time.monotonic()
+            items = [item for item, _, _ in batch]
+            try:
+                predictions = self.score_batch(items)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future, _), prediction in zip(batch, predictions):
+                    future.set_result(prediction)
+            self._record(batch, started_at)
+
+    def _record(self, batch, started_at):
+        size = len(batch)
+        bucket = next(
+            (i for i, bound in enumerate(self.BATCH_SIZE_BUCKETS) if size <= bound),
+            len(self.BATCH_SIZE_BUCKETS),
+        )
+        with self._lock:
+            self.batches += 1
+            self.items += size
+            self.max_batch_size = max(self.max_batch_size, size)
+            self.batch_size_histogram[bucket] += 1
+            self._delays.extend(started_at - submitted_at for _, _, submitted_at in batch)
+
+    def stats(self):
+        """
+        Return batch size and queueing delay metrics of this process.
+
+        Returns:
+            dict: Window, max batch, number of batches and items, mean and max
+            batch size, batch size histogram, callers that timed out and
+            queueing delay percentiles (ms) over the most recent items.
+        """
+        with self._lock:
+            delays = sorted(self._delays)
+
+            def percentile(p):
+                if not delays:
+                    return None
+                return round(delays[min(len(delays) - 1, int(p * len(delays)))] * 1000, 3)
+
+            labels = [f"<={bound}" for bound in self.BATCH_SIZE_BUCKETS] + [f">{self.BATCH_SIZE_BUCKETS[-1]}"]
+            return {
+                "window_ms": self.window * 1000,
+                "max_batch": self.max_batch,
+                "batches": self.batches,
+                "items": self.items,
+                "mean_batch_size": round(self.items / self.batches, 3) if self.batches else None,
+                "max_batch_size": self.max_batch_size,
+                "batch_size_histogram": dict(zip(labels, self.batch_size_histogram)),
+                "fallbacks": self.fallbacks,
+                "queue_delay_ms": {
+                    "p50": percentile(0.50),
+                    "p90": percentile(0.90),
+                    "p99": percentile(0.99),
+                    "max": round(delays[-1] * 1000, 3) if delays else None,
+                },
+            }
@@ -0,0 +1,272 @@
+"""
+Cached preparation stages of the training dataset (see train_model.py).
+
+Downloading and cleaning the labelled comments never change between two
+training runs, so both stages are stored in a content-addressed cache
+directory (TRAIN_CACHE_DIR, `.cache/train` by default):
+
+    raw/<sha256>.csv          the downloaded CSV, named after its checksum
+    raw/<file id>.sha256      checksum of the last download of a Drive file
+    clean/<key>.npz           the cleaned corpus, key = raw checksum + cleaning code
+
+The cleaned corpus is columnar: an int8 array of labels and the cleaned texts
+as one UTF-8 buffer, separated by newlines (`clean_text` never keeps one).
+Loading it is a single read, with no CSV parsing and no cleaning.
+
+A run with an unchanged raw file and unchanged cleaning code therefore skips
+the download and the cleaning entirely. When they do run, cleaning and
+`transform` are spread over a process pool (`parallel_clean_texts`,
+`parallel_transform`); both return exactly what the single-process calls do.
+"""
+
+import hashlib
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from utils import text_utils
+
+from .registry import file_sha256
+
+
+# Google Drive file of the labelled comments (columns: comment, label)
+DATASET_FILE_ID = "17jeCw3TisLxDOtS5d3PXSF5G4mc4zWwq"
+
+# Bump when the cleaning stage below changes in a way text_utils does not show
+CLEANING_FORMAT_VERSION = 1
+
+
+class DatasetError(Exception):
+    """Raised when a downloaded or cached file does not match its checksum."""
+
+
+def _gdown(file_id, path):
+    import gdown
+
+    gdown.download(f"https://drive.google.com/uc?id={file_id}", path, quiet=False)
+
+
+def _replace_atomically(cache_dir, path, write):
+    """Call `write(tmp_path)` and move the result to `path` in one rename."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix=".tmp-", suffix=os.path.splitext(path)[1])
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def fetch_raw_dataset(cache_dir, file_id=DATASET_FILE_ID, sha256=None, download=_gdown, refresh=False):
+    """
+    Return the path and checksum of the raw CSV, downloading it only when needed.
+
+    Args:
+        cache_dir (str): The cache directory.
+        file_id (str): Google Drive id of the CSV.
+        sha256 (str): Expected checksum. When given, a cached file with this
+            checksum is reused and a download must match it. When omitted, the
+            checksum recorded by the last download of `file_id` is trusted.
+        download (callable): download(file_id, path), gdown by default.
+        refresh (bool): Download again whatever is cached, e.g. after the
+            Drive file was updated; the recorded checksum is replaced.
+
+    Returns:
+        tuple[str, str]: (path of the CSV, its SHA-256)
+
+    Raises:
+        DatasetError: If the downloaded file does not match `sha256`.
+    """
+    raw_dir = os.path.join(cache_dir, "raw")
+    pointer = os.path.join(raw_dir, f"{file_id}.sha256")
+
+    if not refresh:
+        cached = sha256
+        if cached is None and os.path.isfile(pointer):
+            with open(pointer, encoding="utf-8") as f:
+                cached = f.read().strip()
+        if cached is not None and os.path.isfile(os.path.join(raw_dir, f"{cached}.csv")):
+            return os.path.join(raw_dir, f"{cached}.csv"), cached
+
+    os.makedirs(raw_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=raw_dir, prefix=".download-", suffix=".csv")
+    os.close(fd)
+    try:
+        download(file_id, tmp_path)
+        checksum = file_sha256(tmp_path)
+        if sha256 is not None and checksum != sha256:
+            raise DatasetError(f"Downloaded dataset checksum {checksum} does not match the expected {sha256}")
+        path = os.path.join(raw_dir, f"{checksum}.csv")
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    _replace_atomically(cache_dir, pointer, lambda tmp: _write_text(tmp, checksum))
+    return path, checksum
+
+
+def _write_text(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def cleaning_fingerprint():
+    """Return a checksum of the cleaning code: utils/text_utils.py and the format version."""
+    sha = hashlib.sha256(f"v{CLEANING_FORMAT_VERSION}".encode())
+    with open(text_utils.__file__, "rb") as f:
+        sha.update(f.read())
+    return sha.hexdigest()
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def parallel_clean_texts(texts, workers=None, chunk_size=10000):
+    """
+    Clean texts in chunks across a process pool.
+
+    Args:
+        texts (list[str]): The raw texts.
+        workers (int): Number of processes, all CPUs by default. With one
+            worker, or a single chunk, the texts are cleaned in this process.
+        chunk_size (int): Texts sent to a process at a time.
+
+    Returns:
+        list[str]: Same output as `clean_texts`, in input order.
+    """
+    workers = workers or os.cpu_count()
+    if workers <= 1 or len(texts) <= chunk_size:
+        return text_utils.clean_texts(texts)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return [text for chunk in executor.map(text_utils.clean_texts, _chunks(texts, chunk_size)) for text in chunk]
+
+
+# Fitted vectorizer of a `parallel_transform` worker, set once by its initializer
+_worker_vectorizer = None
+
+
+def _init_transform_worker(vectorizer):
+    global _worker_vectorizer
+    _worker_vectorizer = vectorizer
+
+
+def _transform_chunk(texts):
+    return _worker_vectorizer.transform(texts)
+
+
+def parallel_transform(vectorizer, texts, workers=None, chunk_size=20000):
+    """
+    Vectorize texts with a fitted vectorizer, in chunks across a process pool.
+
+    Rows are independent once the vocabulary and IDF are fitted, so the
+    stacked chunks equal `vectorizer.transform(texts)`.
+
+    Args:
+        vectorizer (TfidfVectorizer): The fitted vectorizer, sent once per process.
+        texts (list[str]): The cleaned texts.
+        workers (int): Number of processes, all CPUs by default.
+        chunk_size (int): Texts sent to a process at a time.
+
+    Returns:
+        scipy.sparse.csr_matrix: One row per text.
+    """
+    import scipy.sparse
+
+    workers = workers or os.cpu_count()
+    if workers <= 1 or len(texts) <= chunk_size:
+        return vectorizer.transform(texts)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_transform_worker, initargs=(vectorizer,)) as executor:
+        return scipy.sparse.vstack(list(executor.map(_transform_chunk, _chunks(texts, chunk_size))), format="csr")
+
+
+def _clean_raw_dataset(raw_path, workers=None):
+    """Parse the raw CSV and clean its comments: the expensive stage."""
+    import pandas as pd
+
+    df = pd.read_csv(raw_path).dropna(subset=["comment", "label"])
+    texts = parallel_clean_texts(df["comment"].astype(str).tolist(), workers)
+    return texts, df["label"].to_numpy(dtype=np.int8)
+
+
+def save_corpus(path, texts, labels):
+    """Store a cleaned corpus as labels + one newline-separated UTF-8 buffer."""
+    buffer = np.frombuffer("\n".join(texts).encode("utf-8"), dtype=np.uint8)
+    with open(path, "wb") as f:
+        np.savez(f, labels=np.asarray(labels, dtype=np.int8), texts=buffer, count=np.array(len(texts)))
+
+
+def load_corpus(path):
+    """
+    Load a corpus written by `save_corpus`.
+
+    Returns:
+        tuple[list[str], numpy.ndarray]: (cleaned texts, labels)
+    """
+    with np.load(path) as data:
+        count = int(data["count"])
+        texts = data["texts"].tobytes().decode("utf-8").split("\n") if count else []
+        labels = data["labels"]
+    if len(texts) != count or len(labels) != count:
+        raise DatasetError(f"Corrupted corpus cache {path}")
+    return texts, labels
+
+
+def load_clean_corpus(cache_dir, sha256=None, download=_gdown, workers=None, refresh=False):
+    """
+    Return the cleaned training corpus, running only the stages whose inputs changed.
+
+    Args:
+        cache_dir (str): The cache directory.
+        sha256 (str): Expected checksum of the raw CSV (see `fetch_raw_dataset`).
+        download (callable): download(file_id, path), gdown by default.
+        workers (int): Processes used to clean the corpus, all CPUs by default.
+        refresh (bool): Download the raw CSV again (see `fetch_raw_dataset`);
+            the cleaning is still skipped if its content did not change.
+
+    Returns:
+        tuple[list[str], numpy.ndarray, dict]: cleaned texts, labels, and the
+        stages info: raw checksum, corpus path, whether the download and
+        cleaning stages ran, and the wall-clock seconds of each stage.
+    """
+    downloads = []
+
+    def recorded_download(file_id, path):
+        downloads.append(file_id)
+        download(file_id, path)
+
+    started = time.perf_counter()
+    raw_path, raw_sha256 = fetch_raw_dataset(cache_dir, sha256=sha256, download=recorded_download, refresh=refresh)
+    timings = {"fetch": time.perf_counter() - started}
+
+    key = hashlib.sha256(f"{raw_sha256}:{cleaning_fingerprint()}".encode()).hexdigest()[:32]
+    corpus_path = os.path.join(cache_dir, "clean", f"{key}.npz")
+    info = {
+        "raw_sha256": raw_sha256,
+        "corpus": corpus_path,
+        "downloaded": bool(downloads),
+        "cleaned": False,
+        "timings": timings,
+    }
+
+    started = time.perf_counter()
+    if os.path.isfile(corpus_path):
+        texts, labels = load_corpus(corpus_path)
+        timings["load"] = time.perf_counter() - started
+    else:
+        if file_sha256(raw_path) != raw_sha256:
+            raise DatasetError(f"Cached dataset {raw_path} does not match its checksum")
+        texts, labels = _clean_raw_dataset(raw_path, workers)
+        _replace_atomically(cache_dir, corpus_path, lambda tmp: save_corpus(tmp, texts, labels))
+        info["cleaned"] = True
+        timings["clean"] = time.perf_counter() - started
+    return texts, labels, info
@@ -0,0 +1,459 @@
+"""
+Fixed-memory sketches of the texts sent to the sentiment endpoints (ML_DRIFT_ENABLED).
+
+To notice production texts drifting away from what the model was trained
+on, without storing them, every worker folds the texts it scores into a
+`DriftSketch`:
+    - histogram of the text length (characters)
+    - histogram of the out-of-vocabulary rate of each text, and the overall rate
+    - count-min sketch of the out-of-vocabulary tokens, with the top-k of them
+    - predicted class balance, and histogram of the scores when the endpoint
+      computes one (long documents)
+
+Its size does not depend on the traffic: a count-min table of
+CMS_DEPTH x CMS_WIDTH counters, a few short histograms and at most
+4 x ML_DRIFT_TOP_K candidate tokens. At most ML_DRIFT_MAX_WORDS words of a
+text are inspected, and only one text in ML_DRIFT_SAMPLE_EVERY.
+
+Requests only queue their sampled texts: the tokenization, the sketch
+updates and the database writes all run in a background thread.
+
+Every ML_DRIFT_FLUSH_SECONDS a worker saves its sketch as a
+`DriftSnapshot` row and starts a new one. Sketches add up, so the monitoring
+app merges the snapshots of all workers over a time window
+(/api/monitoring/drift/?minutes=60).
+"""
+
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter, deque
+from datetime import timedelta
+from itertools import islice
+
+import numpy as np
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from utils import iter_clean_tokens
+from utils.threads import ProcessThread
+
+from .linear import HashedVocabulary
+
+
+logger = logging.getLogger(__name__)
+
+# Count-min sketch dimensions, fixed so that snapshots can always be merged
+CMS_WIDTH = 1024
+CMS_DEPTH = 4
+
+# Upper bounds (characters) of the text length histogram buckets
+LENGTH_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 4096, 16384)
+
+# Buckets of the out-of-vocabulary rate and score histograms, over [0, 1]
+RATE_BUCKETS = 10
+
+# Characters cleaned at a time to find the first ML_DRIFT_MAX_WORDS words
+_CLEAN_CHUNK_CHARS = 1024
+
+# Characters of a sampled text kept for the background thread, enough for
+# ML_DRIFT_MAX_WORDS words of ordinary text
+_TEXT_PREFIX_CHARS = 16384
+
+# Tokens as the TF-IDF vectorizer sees them (its default token_pattern)
+_TOKEN_RE = re.compile(r"(?u)\b\w\w+\b")
+
+
+def _bucket(value):
+    return min(int(value * RATE_BUCKETS), RATE_BUCKETS - 1)
+
+
+class CountMinSketch:
+    """
+    Approximate token counts in CMS_DEPTH x CMS_WIDTH counters.
+
+    Estimates never undercount; they overcount by the collisions of the least
+    collided row. Rows are indexed with a stable hash so that sketches built
+    by different processes can be added.
+    """
+
+    def __init__(self, table=None):
+        self.table = np.zeros((CMS_DEPTH, CMS_WIDTH), dtype=np.int64) if table is None else table
+
+    @staticmethod
+    def _columns(token):
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=2 * CMS_DEPTH).digest()
+        return [int.from_bytes(digest[2 * row:2 * row + 2], "little") % CMS_WIDTH for row in range(CMS_DEPTH)]
+
+    def add(self, token, count=1):
+        """Count `token` and return its new estimate."""
+        estimate = None
+        for row, column in enumerate(self._columns(token)):
+            self.table[row, column] += count
+            value = int(self.table[row, column])
+            estimate = value if estimate is None else min(estimate, value)
+        return estimate
+
+    def estimate(self, token):
+        """Return the estimated count of `token`."""
+        return min(int(self.table[row, column]) for row, column in enumerate(self._columns(token)))
+
+    def merge(self, other):
+        self.table += other.table
+
+
+class DriftSketch:
+    """
+    Mergeable summary of the scored texts, of fixed size.
+
+    Args:
+        top_k (int): Number of out-of-vocabulary tokens reported.
+    """
+
+    def __init__(self, top_k=20):
+        self.top_k = top_k
+        self.texts = 0
+        self.tokens = 0
+        self.oov_tokens = 0
+        self.length_histogram = np.zeros(len(LENGTH_BUCKETS) + 1, dtype=np.int64)
+        self.oov_rate_histogram = np.zeros(RATE_BUCKETS, dtype=np.int64)
+        self.score_histogram = np.zeros(RATE_BUCKETS, dtype=np.int64)
+        self.predictions = {}
+        self.unseen = CountMinSketch()
+        # Candidate heavy hitters: token -> count-min estimate
+        self.candidates = {}
+
+    def _track(self, token, estimate):
+        self.candidates[token] = estimate
+        if len(self.candidates) > 4 * self.top_k:
+            # Keep the memory fixed: forget the least frequent candidates
+            kept = sorted(self.candidates.items(), key=lambda item: -item[1])[:2 * self.top_k]
+            self.candidates = dict(kept)
+
+    def add(self, length, tokens, known, prediction, score=None):
+        """
+        Fold one text into the sketch.
+
+        Args:
+            length (int): Length of the raw text, in characters.
+            tokens (list[str]): Tokens of the (beginning of the) cleaned text.
+            known (list[bool]): Whether each token is in the model vocabulary,
+                None when the model has no vocabulary (hashing vectorizer).
+            prediction (int): The predicted class.
+            score (float): Probability of being positive, when computed.
+        """
+        self.texts += 1
+        self.length_histogram[np.searchsorted(LENGTH_BUCKETS, length)] += 1
+        key = str(prediction)
+        self.predictions[key] = self.predictions.get(key, 0) + 1
+        if score is not None:
+            self.score_histogram[_bucket(score)] += 1
+        if known is None:
+            return
+
+        unseen = [token for token, is_known in zip(tokens, known) if not is_known]
+        self.tokens += len(tokens)
+        self.oov_tokens += len(unseen)
+        if tokens:
+            self.oov_rate_histogram[_bucket(len(unseen) / len(tokens))] += 1
+        for token, count in Counter(unseen).items():
+            self._track(token, self.unseen.add(token, count))
+
+    def merge(self, other):
+        """Add the counts of another sketch to this one."""
+        self.texts += other.texts
+        self.tokens += other.tokens
+        self.oov_tokens += other.oov_tokens
+        self.length_histogram += other.length_histogram
+        self.oov_rate_histogram += other.oov_rate_histogram
+        self.score_histogram += other.score_histogram
+        for key, count in other.predictions.items():
+            self.predictions[key] = self.predictions.get(key, 0) + count
+        self.unseen.merge(other.unseen)
+        for token in set(self.candidates) | set(other.candidates):
+            self._track(token, self.unseen.estimate(token))
+
+    def to_dict(self):
+        """Return the sketch as JSON-serializable data (see `from_dict`)."""
+        return {
+            "texts": self.texts,
+            "tokens": self.tokens,
+            "oov_tokens": self.oov_tokens,
+            "length_histogram": self.length_histogram.tolist(),
+            "oov_rate_histogram": self.oov_rate_histogram.tolist(),
+            "score_histogram": self.score_histogram.tolist(),
+            "predictions": self.predictions,
+            "unseen": self.unseen.table.tolist(),
+            "candidates": self.candidates,
+        }
+
+    @classmethod
+    def from_dict(cls, data, top_k=20):
+        sketch = cls(top_k)
+        sketch.texts, sketch.tokens, sketch.oov_tokens = data["texts"], data["tokens"], data["oov_tokens"]
+        sketch.length_histogram = np.array(data["length_histogram"], dtype=np.int64)
+        sketch.oov_rate_histogram = np.array(data["oov_rate_histogram"], dtype=np.int64)
+        sketch.score_histogram = np.array(data["score_histogram"], dtype=np.int64)
+        sketch.predictions = dict(data["predictions"])
+        sketch.unseen = CountMinSketch(np.array(data["unseen"], dtype=np.int64))
+        sketch.candidates = dict(data["candidates"])
+        return sketch
+
+    def summary(self):
+        """
+        Return the readable drift indicators.
+
+        Returns:
+            dict: number of texts, overall out-of-vocabulary rate, class
+            balance, the three histograms and the top out-of-vocabulary tokens
+            with their estimated counts.
+        """
+        length_labels = [f"<={bound}" for bound in LENGTH_BUCKETS] + [f">{LENGTH_BUCKETS[-1]}"]
+        rate_labels = [f"{i / RATE_BUCKETS:.1f}-{(i + 1) / RATE_BUCKETS:.1f}" for i in range(RATE_BUCKETS)]
+        top = sorted(self.candidates.items(), key=lambda item: (-item[1], item[0]))[:self.top_k]
+        return {
+            "texts": self.texts,
+            "oov_rate": round(self.oov_tokens / self.tokens, 4) if self.tokens else None,
+            "predictions": {
+                label: {"count": count, "share": round(count / self.texts, 4)}
+                for label, count in sorted(self.predictions.items())
+            },
+            "length_chars": dict(zip(length_labels, self.length_histogram.tolist())),
+            "oov_rate_histogram": dict(zip(rate_labels, self.oov_rate_histogram.tolist())),
+            "score_histogram": dict(zip(rate_labels, self.score_histogram.tolist())),
+            "top_unseen_tokens": [{"token": token, "count": count} for token, count in top],
+        }
+
+
+def _vocabulary_check(bundle):
+    """Return tokens -> [in vocabulary?] for the served model, None without vocabulary."""
+    if settings.ML_SIDECAR_ENABLED:
+        # The vocabulary lives in the sidecar (ml/sidecar.py): loading it here
+        # would defeat the purpose, out-of-vocabulary rates are not measured
+        return None
+    if settings.ML_SCORING_ENGINE == "linear":
+        vocabulary = bundle.linear(settings.ML_SHARED_ARTIFACTS).vocabulary
+        if isinstance(vocabulary, HashedVocabulary):
+            return None
+        return lambda tokens: (vocabulary.lookup(tokens) >= 0).tolist()
+
+    vectorizer, _ = bundle.sklearn()
+    vocabulary = getattr(vectorizer, "vocabulary_", None)
+    if vocabulary is None:
+        return None
+    return lambda tokens: [token in vocabulary for token in tokens]
+
+
+class DriftMonitor:
+    """
+    Sketch of the texts scored by this process, saved periodically as a DriftSnapshot.
+
+    Requests only sample their texts into a bounded queue: a background
+    thread (one per process) tokenizes them, folds them into the sketch and
+    saves it, so neither the token work nor the database writes run on the
+    request path. Sampled texts arriving while MAX_PENDING of them wait are
+    dropped and counted.
+
+    Enabled flag, sampling, flush interval and retention are read from the
+    settings on each call.
+    """
+
+    # Sampled texts waiting for the background thread
+    MAX_PENDING = 10000
+
+    def __init__(self):
+        # Guards the sketch
+        self._lock = threading.Lock()
+        # Guards the queue of sampled texts
+        self._condition = threading.Condition()
+        self._queue = deque()
+        self._worker = ProcessThread(self._run, "ml-drift", self._condition)
+        self._sketch = None
+        self._version = None
+        self._pid = None
+        self._next_flush = None
+        self._seen = 0
+        self.dropped = 0
+
+    def _current(self):
+        """Return the sketch of this process (lock held), new after a fork."""
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._sketch = DriftSketch(settings.ML_DRIFT_TOP_K)
+            self._next_flush = time.monotonic() + settings.ML_DRIFT_FLUSH_SECONDS
+        return self._sketch
+
+    def _ensure_thread(self):
+        self._worker.ensure(self._on_start)
+
+    def _on_start(self, forked):
+        if forked:
+            # Texts inherited from the parent are its own to sketch
+            self._queue.clear()
+
+    def observe(self, texts, predictions, bundle, scores=None):
+        """
+        Queue scored texts for the sketch of this process, without tokenizing them.
+
+        Args:
+            texts (list[str]): The raw texts.
+            predictions (list[int]): Their predictions, in the same order.
+            bundle (ModelBundle): The model version that scored them.
+            scores (list[float]): Their probability of being positive, if computed.
+        """
+        if not settings.ML_DRIFT_ENABLED or not texts:
+            return
+        self._ensure_thread()
+        every = max(1, settings.ML_DRIFT_SAMPLE_EVERY)
+        scores = scores or [None] * len(texts)
+
+        with self._condition:
+            for text, prediction, score in zip(texts, predictions, scores):
+                self._seen += 1
+                if self._seen % every:
+                    continue
+                if len(self._queue) >= self.MAX_PENDING:
+                    self.dropped += 1
+                    continue
+                # Only the beginning of a text is inspected: do not keep 1 MB texts alive
+                self._queue.append((text[:_TEXT_PREFIX_CHARS], len(text), prediction, score, bundle))
+            self._condition.notify()
+
+    def _drain(self):
+        """
+        Fold the queued texts into the sketch, in the calling thread.
+
+        Returns:
+            list[tuple]: (sketch, version) pairs to save, closed because the
+            model version changed.
+        """
+        with self._condition:
+            queued = list(self._queue)
+            self._queue.clear()
+
+        to_save = []
+        checks = {}
+        for text, length, prediction, score, bundle in queued:
+            if bundle not in checks:
+                checks[bundle] = _vocabulary_check(bundle)
+            check = checks[bundle]
+            # Small pieces: only the beginning of a long text is ever cleaned
+            words = " ".join(islice(iter_clean_tokens(text, _CLEAN_CHUNK_CHARS), settings.ML_DRIFT_MAX_WORDS))
+            tokens = _TOKEN_RE.findall(words)
+            row = (length, tokens, check(tokens) if check is not None else None, prediction, score)
+
+            with self._lock:
+                self._current()
+                if self._version not in (None, bundle.version):
+                    # A new model has a new vocabulary: do not mix their sketches
+                    to_save.append(self._swap_locked())
+                self._version = bundle.version
+                self._sketch.add(*row)
+        return [(sketch, version) for sketch, version in to_save if sketch.texts]
+
+    def _swap_locked(self):
+        """Start a new sketch (lock held) and return the previous one with its version."""
+        previous = self._sketch, self._version
+        self._sketch = DriftSketch(settings.ML_DRIFT_TOP_K)
+        self._next_flush = time.monotonic() + settings.ML_DRIFT_FLUSH_SECONDS
+        return previous
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._queue:
+                    # Wake up regularly to save idle sketches too
+                    self._condition.wait(1.0)
+            to_save = self._drain()
+            with self._lock:
+                self._current()
+                if settings.ML_DRIFT_FLUSH_SECONDS > 0 and time.monotonic() >= self._next_flush:
+                    sketch, version = self._swap_locked()
+                    if sketch.texts:
+                        to_save.append((sketch, version))
+            if to_save:
+                close_old_connections()
+                for sketch, version in to_save:
+                    self._save(sketch, version)
+
+    def _save(self, sketch, version):
+        from .models import DriftSnapshot
+
+        try:
+            DriftSnapshot.objects.create(model_version=version or "", texts=sketch.texts, sketch=sketch.to_dict())
+            cutoff = timezone.now() - timedelta(days=settings.ML_DRIFT_RETENTION_DAYS)
+            DriftSnapshot.objects.filter(created_at__lt=cutoff).delete()
+        except Exception:
+            logger.exception("Could not save the drift snapshot of %d texts", sketch.texts)
+
+    def flush(self):
+        """Sketch the queued texts and save the sketch now, in the calling thread, then start a new one."""
+        to_save = self._drain()
+        with self._lock:
+            self._current()
+            sketch, version = self._swap_locked()
+        if sketch.texts:
+            to_save.append((sketch, version))
+        for sketch, version in to_save:
+            self._save(sketch, version)
+
+    def pending(self):
+        """Return a copy of the sketch not saved yet (queued texts included), and its model version."""
+        for sketch, version in self._drain():
+            self._save(sketch, version)
+        with self._lock:
+            sketch = self._current()
+            return DriftSketch.from_dict(sketch.to_dict(), sketch.top_k), self._version
+
+    def reset(self):
+        """Drop the current sketch and the queued texts (tests)."""
+        with self._condition:
+            self._queue.clear()
+            self.dropped = 0
+        with self._lock:
+            self._pid = None
+            self._version = None
+            self._seen = 0
+
+
+def merged_summary(minutes):
+    """
+    Merge the snapshots of every worker over the last `minutes` with the
+    unsaved sketch of this process.
+
+    Args:
+        minutes (int): Size of the time window.
+
+    Returns:
+        dict: The `DriftSketch.summary` of the merged sketch, plus the window,
+        the number of snapshots and the model versions they cover.
+    """
+    from .models import DriftSnapshot
+
+    since = timezone.now() - timedelta(minutes=minutes)
+    merged = DriftSketch(settings.ML_DRIFT_TOP_K)
+    versions = set()
+    snapshots = 0
+    for model_version, data in DriftSnapshot.objects.filter(created_at__gte=since).values_list("model_version", "sketch"):
+        merged.merge(DriftSketch.from_dict(data))
+        versions.add(model_version)
+        snapshots += 1
+
+    pending, version = drift_monitor.pending()
+    if pending.texts:
+        merged.merge(pending)
+        versions.add(version)
+
+    return {
+        "window_minutes": minutes,
+        "snapshots": snapshots,
+        "model_versions": sorted(versions),
+        **merged.summary(),
+    }
+
+
+drift_monitor = DriftMonitor()
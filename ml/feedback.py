@@ -0,0 +1,141 @@
+"""
+Incremental update of the sentiment model from user feedback (ml.models.SentimentFeedback).
+
+Correcting a prediction with train_model.py means downloading, cleaning and
+vectorizing the whole corpus again, then a full saga solve. `apply_feedback`
+learns the pending feedback on top of the served model instead:
+    1. the vectorizer is frozen: the feedback texts are cleaned and
+       vectorized with the vocabulary (and idf) of the current version
+    2. an SGD logistic regression is warm-started from the coefficients of
+       the current model and run over the feedback with `partial_fit`, a few
+       epochs at a small constant learning rate so the model moves towards the
+       corrections without forgetting what it learned from the corpus
+    3. the updated coefficients are copied into a copy of the current model,
+       which is published to the registry (ml/registry.py) as a new version
+       next to the unchanged vectorizer
+
+Only the feedback rows are vectorized and fitted, so an update takes seconds
+whatever the size of the original corpus. The feedback rows learned are
+marked with the version that includes them once it is activated: a version
+published without activation is a preview, its rows stay pending and the
+next run learns them again on top of the version actually served.
+
+As the vocabulary is frozen, words that only appear in the feedback (new
+slang, names, typos unseen in the corpus) are ignored: the update can only
+reweight n-grams the current version already knows. A full train_model.py
+run is needed for the model to learn new words.
+"""
+
+import copy
+import os
+import pickle
+import tempfile
+import time
+
+import numpy as np
+from sklearn.linear_model import SGDClassifier
+
+from utils import clean_texts
+
+from .registry import MODEL_FILENAME
+
+
+def incremental_update(vectorizer, model, texts, labels, epochs=5, learning_rate=0.05, alpha=1e-6, seed=42):
+    """
+    Return a copy of `model` updated on labelled texts, the vocabulary frozen.
+
+    Args:
+        vectorizer: Fitted vectorizer of the current version, used as is.
+        model: Fitted binary linear classifier (coef_, intercept_, classes_ [0, 1]).
+        texts (list[str]): Raw texts.
+        labels (list[int]): Their labels (0 or 1).
+        epochs (int): Passes of `partial_fit` over the texts.
+        learning_rate (float): Constant SGD step size.
+        alpha (float): L2 regularization of the SGD classifier.
+        seed (int): Seed of the shuffles.
+
+    Returns:
+        tuple: (updated model, metrics) where metrics holds the number of rows
+        and the accuracy on them before and after the update. These are
+        training-set accuracies, measured on the rows the update was fitted
+        on: they show that the corrections were learned, not how the new
+        version generalizes.
+
+    Raises:
+        ValueError: If there is nothing to learn or the model is not a binary
+            0/1 linear classifier.
+    """
+    if not texts:
+        raise ValueError("No feedback to learn")
+    if list(getattr(model, "classes_", [])) != [0, 1] or getattr(model, "coef_", None) is None:
+        raise ValueError("Only binary 0/1 linear models can be updated incrementally")
+
+    X = vectorizer.transform(clean_texts(texts))
+    y = np.asarray(labels, dtype=np.int64)
+
+    sgd = SGDClassifier(
+        loss="log_loss", alpha=alpha, learning_rate="constant", eta0=learning_rate, random_state=seed,
+    )
+    # Warm start: partial_fit keeps coefficients that are already set
+    sgd.coef_ = np.array(model.coef_, dtype=np.float64)
+    sgd.intercept_ = np.array(model.intercept_, dtype=np.float64)
+    rng = np.random.default_rng(seed)
+    for _ in range(epochs):
+        shuffle = rng.permutation(len(y))
+        sgd.partial_fit(X[shuffle], y[shuffle], classes=[0, 1])
+
+    updated = copy.deepcopy(model)
+    updated.coef_ = sgd.coef_.astype(model.coef_.dtype)
+    updated.intercept_ = sgd.intercept_.astype(model.intercept_.dtype)
+    return updated, {
+        "rows": len(y),
+        "train_accuracy_before": float((model.predict(X) == y).mean()),
+        "train_accuracy_after": float((updated.predict(X) == y).mean()),
+    }
+
+
+def apply_feedback(registry, bundle, epochs=5, learning_rate=0.05, version=None, activate=False, limit=None):
+    """
+    Learn the pending feedback on top of a model version and publish the result.
+
+    Args:
+        registry (ModelRegistry): Registry the new version is published to.
+        bundle (ModelBundle): Version to update (usually the active one).
+        epochs (int): Passes over the feedback.
+        learning_rate (float): Constant SGD step size.
+        version (str): Name of the new version, defaults to the registry's.
+        activate (bool): Activate the new version once published, and mark
+            the feedback learned as applied (it stays pending otherwise).
+        limit (int): Learn at most this many pending rows, oldest first.
+
+    Returns:
+        dict | None: The published version, the version it was updated from,
+        the metrics of `incremental_update` and the duration in seconds, or
+        None when no feedback is pending.
+    """
+    from .models import SentimentFeedback
+
+    pending = SentimentFeedback.objects.filter(applied_version="").order_by("id")
+    rows = list(pending.values_list("id", "text", "label")[:limit])
+    if not rows:
+        return None
+
+    started = time.perf_counter()
+    ids, texts, labels = zip(*rows)
+    vectorizer, model = bundle.sklearn()
+    updated, metrics = incremental_update(vectorizer, model, list(texts), list(labels), epochs, learning_rate)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_path = os.path.join(tmp_dir, MODEL_FILENAME)
+        with open(model_path, "wb") as f:
+            pickle.dump(updated, f)
+        published = registry.publish(model_path, bundle.vectorizer_path, version=version)
+    if activate:
+        registry.activate(published)
+        SentimentFeedback.objects.filter(id__in=ids).update(applied_version=published)
+    return {
+        "version": published,
+        "base_version": bundle.version,
+        **metrics,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
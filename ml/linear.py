@@ -0,0 +1,556 @@
+"""
+Fused tokenize-and-score engine for the sentiment analysis model.
+
+The pickled TF-IDF vectorizer and logistic regression are exported once into
+a compact artifact directory:
+    - meta.json: intercept, classes and tokenization parameters
+    - vocabulary_terms.npy: the n-grams, sorted, as a fixed-width unicode array
+    - vocabulary_indexes.npy: the feature index of each sorted n-gram
+    - idf.npy / coef.npy: one float64 value per feature
+
+Every file except meta.json is a plain .npy array, so the artifact can be
+memory-mapped and shared between forked workers (see `load(mmap=True)`).
+
+`compact_linear_model` derives a smaller artifact from an exported one: the
+features whose |coef| is below a threshold are dropped, the n-grams are
+replaced by their sorted 64-bit hashes (vocabulary_hashes.npy, 8 bytes per
+feature instead of a fixed-width string) and idf/coef are stored as float32
+or float16. `compaction_report` measures what it costs and saves.
+
+Models trained on a HashingVectorizer (ml/streaming.py) have no vocabulary
+and no IDF: their artifact is meta.json (with "n_features") and coef.npy
+only, and n-grams are hashed at scoring time exactly like sklearn does.
+
+`LinearSentimentScorer` then computes the logistic regression decision value
+straight from the token counts of a text, without building a sparse matrix:
+
+    score = sum(count_j * idf_j * coef_j) / sqrt(sum((count_j * idf_j) ** 2)) + intercept
+
+which is the l2-normalised TF-IDF row dotted with the coefficients, i.e.
+exactly what `model.decision_function(vectorizer.transform([text]))` returns.
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import time
+import tracemalloc
+
+import numpy as np
+
+
+META_FILENAME = "meta.json"
+VOCABULARY_TERMS_FILENAME = "vocabulary_terms.npy"
+VOCABULARY_INDEXES_FILENAME = "vocabulary_indexes.npy"
+VOCABULARY_HASHES_FILENAME = "vocabulary_hashes.npy"
+IDF_FILENAME = "idf.npy"
+COEF_FILENAME = "coef.npy"
+
+
+def export_linear_model(vectorizer, model, directory):
+    """
+    Export a fitted TfidfVectorizer and binary LogisticRegression to `directory`.
+
+    Only the vectorizer options the fused scorer reproduces are accepted, so
+    an exported artifact always scores like the original sklearn pipeline.
+
+    Args:
+        vectorizer (TfidfVectorizer | HashingVectorizer): The fitted vectorizer.
+        model (LogisticRegression | SGDClassifier): The fitted binary classifier.
+        directory (str): Target directory, created if needed.
+
+    Raises:
+        ValueError: If the vectorizer or the model uses an unsupported option.
+    """
+    hashing = not hasattr(vectorizer, "vocabulary_")
+    unsupported = {
+        "analyzer": "word",
+        "tokenizer": None,
+        "preprocessor": None,
+        "stop_words": None,
+        "strip_accents": None,
+        "binary": False,
+        "norm": "l2",
+    }
+    unsupported.update({"alternate_sign": False} if hashing else {"sublinear_tf": False, "use_idf": True})
+    for option, expected in unsupported.items():
+        if getattr(vectorizer, option) != expected:
+            raise ValueError(f"Unsupported vectorizer option {option}={getattr(vectorizer, option)!r}")
+    if model.coef_.shape[0] != 1:
+        raise ValueError("Only binary classifiers can be exported")
+
+    os.makedirs(directory, exist_ok=True)
+    meta = {
+        "intercept": float(model.intercept_[0]),
+        "classes": [int(label) for label in model.classes_],
+        "lowercase": bool(vectorizer.lowercase),
+        "token_pattern": vectorizer.token_pattern,
+        "ngram_range": list(vectorizer.ngram_range),
+    }
+    if hashing:
+        meta["n_features"] = int(vectorizer.n_features)
+    with open(os.path.join(directory, META_FILENAME), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    if hashing:
+        # Files of a previous TF-IDF export in the same directory would be stale
+        for filename in (VOCABULARY_TERMS_FILENAME, VOCABULARY_INDEXES_FILENAME, IDF_FILENAME):
+            if os.path.exists(os.path.join(directory, filename)):
+                os.remove(os.path.join(directory, filename))
+    else:
+        terms = sorted(vectorizer.vocabulary_)
+        indexes = [vectorizer.vocabulary_[term] for term in terms]
+        np.save(os.path.join(directory, VOCABULARY_TERMS_FILENAME), np.array(terms, dtype=np.str_))
+        np.save(os.path.join(directory, VOCABULARY_INDEXES_FILENAME), np.array(indexes, dtype=np.int32))
+        np.save(os.path.join(directory, IDF_FILENAME), np.asarray(vectorizer.idf_, dtype=np.float64))
+    np.save(os.path.join(directory, COEF_FILENAME), np.asarray(model.coef_[0], dtype=np.float64))
+
+
+class DictVocabulary:
+    """
+    n-gram lookup backed by a Python dict.
+
+    The fastest lookup, but every worker holds its own copy of the dict:
+    refcount updates on its keys defeat copy-on-write sharing after fork.
+    """
+
+    def __init__(self, terms, indexes):
+        self._index = dict(zip(terms.tolist(), indexes.tolist()))
+
+    def __len__(self):
+        return len(self._index)
+
+    def lookup(self, grams):
+        """
+        Return the feature index of each n-gram, -1 when it is out of vocabulary.
+
+        Args:
+            grams (list[str]): The n-grams to look up.
+
+        Returns:
+            numpy.ndarray: One feature index per n-gram.
+        """
+        get = self._index.get
+        return np.fromiter((get(gram, -1) for gram in grams), dtype=np.intp, count=len(grams))
+
+
+class SortedVocabulary:
+    """
+    n-gram lookup backed by a sorted fixed-width unicode array.
+
+    Holds no per-term Python object, so once memory-mapped the pages are
+    shared by all forked workers. Lookups are a vectorized binary search.
+    """
+
+    def __init__(self, terms, indexes):
+        self._terms = terms
+        self._indexes = indexes
+
+    def __len__(self):
+        return len(self._terms)
+
+    def lookup(self, grams):
+        """
+        Return the feature index of each n-gram, -1 when it is out of vocabulary.
+
+        Args:
+            grams (list[str]): The n-grams to look up.
+
+        Returns:
+            numpy.ndarray: One feature index per n-gram.
+        """
+        if not grams:
+            return np.empty(0, dtype=np.intp)
+        grams = np.array(grams, dtype=np.str_)
+        positions = np.searchsorted(self._terms, grams)
+        np.minimum(positions, len(self._terms) - 1, out=positions)
+        found = self._terms[positions] == grams
+        return np.where(found, self._indexes[positions], -1)
+
+
+def term_hashes(terms):
+    """
+    Return the stable 64-bit hash (BLAKE2b) of each n-gram.
+
+    Args:
+        terms (list[str]): The n-grams.
+
+    Returns:
+        numpy.ndarray: One uint64 per n-gram.
+    """
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little") for term in terms),
+        dtype=np.uint64, count=len(terms),
+    )
+
+
+class HashedTermsVocabulary:
+    """
+    n-gram lookup backed by the sorted 64-bit hashes of the vocabulary.
+
+    The feature index of an n-gram is the position of its hash, so neither
+    the strings nor an index array are stored: 8 bytes per feature. An
+    out-of-vocabulary n-gram is mistaken for a known one with a probability
+    of about len(vocabulary) / 2**64.
+    """
+
+    def __init__(self, hashes):
+        self._hashes = hashes
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def lookup(self, grams):
+        """
+        Return the feature index of each n-gram, -1 when it is out of vocabulary.
+
+        Args:
+            grams (list[str]): The n-grams to look up.
+
+        Returns:
+            numpy.ndarray: One feature index per n-gram.
+        """
+        if not grams or not len(self._hashes):
+            return np.full(len(grams), -1, dtype=np.intp)
+        hashes = term_hashes(grams)
+        positions = np.searchsorted(self._hashes, hashes)
+        np.minimum(positions, len(self._hashes) - 1, out=positions)
+        return np.where(self._hashes[positions] == hashes, positions, -1)
+
+
+class HashedVocabulary:
+    """
+    n-gram lookup of a HashingVectorizer: the feature index is computed from
+    the n-gram itself (signed 32-bit MurmurHash3 modulo n_features), so there
+    is nothing to store and every n-gram is in vocabulary.
+    """
+
+    def __init__(self, n_features):
+        from sklearn.utils import murmurhash3_32
+
+        self.n_features = n_features
+        self._hash = murmurhash3_32
+
+    def __len__(self):
+        return self.n_features
+
+    def lookup(self, grams):
+        """
+        Return the feature index of each n-gram.
+
+        Args:
+            grams (list[str]): The n-grams to hash.
+
+        Returns:
+            numpy.ndarray: One feature index per n-gram.
+        """
+        hash_, n_features = self._hash, self.n_features
+        return np.fromiter(
+            (abs(hash_(gram, positive=False)) % n_features for gram in grams),
+            dtype=np.intp, count=len(grams),
+        )
+
+
+class LinearSentimentScorer:
+    """
+    Lightweight scorer computing the TF-IDF + logistic regression decision
+    value directly from the n-gram counts of a text.
+
+    Attributes:
+        vocabulary (DictVocabulary | SortedVocabulary | HashedVocabulary): n-gram
+            to feature index.
+        idf (numpy.ndarray | None): Inverse document frequency per feature,
+            None for hashed features (plain term counts).
+        coef (numpy.ndarray): Logistic regression coefficient per feature.
+        intercept (float): Logistic regression intercept.
+        classes (list[int]): Labels returned for a negative / positive score.
+    """
+
+    def __init__(self, vocabulary, idf, coef, intercept, classes,
+                 token_pattern=r"(?u)\b\w\w+\b", ngram_range=(1, 2), lowercase=True):
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.coef = coef
+        self.intercept = intercept
+        self.classes = classes
+        self.ngram_range = tuple(ngram_range)
+        self.lowercase = lowercase
+        self._token_pattern = re.compile(token_pattern)
+
+    @classmethod
+    def load(cls, directory, mmap=False):
+        """
+        Load a scorer from an artifact directory written by `export_linear_model`.
+
+        Args:
+            directory (str): The artifact directory.
+            mmap (bool): Memory-map the arrays read-only and keep the vocabulary
+                as a sorted array instead of a dict. Meant for pre-fork servers:
+                the artifact is then held once in the page cache and shared by
+                every worker.
+
+        Returns:
+            LinearSentimentScorer: The loaded scorer.
+        """
+        mmap_mode = "r" if mmap else None
+
+        def load_array(filename):
+            return np.load(os.path.join(directory, filename), mmap_mode=mmap_mode)
+
+        with open(os.path.join(directory, META_FILENAME), encoding="utf-8") as f:
+            meta = json.load(f)
+
+        if meta.get("n_features"):
+            vocabulary, idf = HashedVocabulary(meta["n_features"]), None
+        elif meta.get("vocabulary") == "hash64":
+            vocabulary = HashedTermsVocabulary(load_array(VOCABULARY_HASHES_FILENAME))
+            idf = load_array(IDF_FILENAME)
+        else:
+            vocabulary_class = SortedVocabulary if mmap else DictVocabulary
+            vocabulary = vocabulary_class(
+                load_array(VOCABULARY_TERMS_FILENAME),
+                load_array(VOCABULARY_INDEXES_FILENAME),
+            )
+            idf = load_array(IDF_FILENAME)
+
+        return cls(
+            vocabulary=vocabulary,
+            idf=idf,
+            coef=load_array(COEF_FILENAME),
+            intercept=meta["intercept"],
+            classes=meta["classes"],
+            token_pattern=meta["token_pattern"],
+            ngram_range=meta["ngram_range"],
+            lowercase=meta["lowercase"],
+        )
+
+    def ngrams(self, text):
+        """
+        Yield the word n-grams of `text`, in the same order as sklearn's analyzer.
+
+        Args:
+            text (str): An already cleaned text.
+
+        Yields:
+            str: Unigrams first, then bigrams, etc. up to the maximum n.
+        """
+        if self.lowercase:
+            text = text.lower()
+        tokens = self._token_pattern.findall(text)
+        min_n, max_n = self.ngram_range
+        for n in range(min_n, min(max_n, len(tokens)) + 1):
+            if n == 1:
+                yield from tokens
+            else:
+                for i in range(len(tokens) - n + 1):
+                    yield " ".join(tokens[i:i + n])
+
+    def counts(self, text):
+        """
+        Count the in-vocabulary n-grams of `text`.
+
+        Args:
+            text (str): An already cleaned text.
+
+        Returns:
+            tuple[numpy.ndarray, numpy.ndarray]: The feature indexes present in
+            the text and their term counts (non-zero features only).
+        """
+        indexes = self.vocabulary.lookup(list(self.ngrams(text)))
+        return np.unique(indexes[indexes >= 0], return_counts=True)
+
+    def _weights(self, indexes, counts):
+        """Un-normalised TF-IDF (or plain TF for hashed features) of the given features."""
+        if self.idf is None:
+            return counts.astype(np.float64)
+        return counts * self.idf[indexes]
+
+    def decision_function(self, text):
+        """
+        Compute the logistic regression decision value of a cleaned text.
+
+        Args:
+            text (str): An already cleaned text.
+
+        Returns:
+            float: The signed distance to the decision boundary.
+        """
+        indexes, counts = self.counts(text)
+        if not len(indexes):
+            return self.intercept
+
+        weights = self._weights(indexes, counts)
+        return float(weights @ self.coef[indexes]) / math.sqrt(float(weights @ weights)) + self.intercept
+
+    def predict(self, text):
+        """
+        Predict the class of a cleaned text.
+
+        Args:
+            text (str): An already cleaned text.
+
+        Returns:
+            int: The predicted label (0 for negative, 1 for positive).
+        """
+        return self.classes[1] if self.decision_function(text) > 0 else self.classes[0]
+
+    def explain(self, text, top_k=5):
+        """
+        Compute the decision value of a cleaned text and its top contributing n-grams.
+
+        The contribution of an n-gram is its l2-normalised TF-IDF weight times
+        its coefficient; contributions plus the intercept sum to the decision
+        value. Only the n-grams of the text are visited, never the vocabulary.
+
+        Args:
+            text (str): An already cleaned text.
+            top_k (int): Number of n-grams to return.
+
+        Returns:
+            tuple[float, list[tuple[str, float]]]: The decision value and the
+            `top_k` (n-gram, contribution) pairs with the largest |contribution|.
+        """
+        grams = list(self.ngrams(text))
+        indexes = self.vocabulary.lookup(grams)
+        known = np.flatnonzero(indexes >= 0)
+        if not len(known):
+            return self.intercept, []
+
+        features, first, counts = np.unique(indexes[known], return_index=True, return_counts=True)
+        weights = self._weights(features, counts)
+        weights /= math.sqrt(float(weights @ weights))
+        contributions = weights * self.coef[features]
+
+        order = np.argsort(-np.abs(contributions), kind="stable")[:top_k]
+        top = [(grams[known[first[i]]], float(contributions[i])) for i in order]
+        return float(contributions.sum()) + self.intercept, top
+
+    def predict_many(self, texts):
+        """
+        Predict the class of several cleaned texts.
+
+        Args:
+            texts (iterable[str]): Already cleaned texts.
+
+        Returns:
+            list[int]: One predicted label per text, in input order.
+        """
+        return [self.predict(text) for text in texts]
+
+
+def compact_linear_model(source, target, threshold=0.0, dtype="float32"):
+    """
+    Write a pruned, hashed-vocabulary, reduced-precision copy of an artifact.
+
+    Pruned features no longer count in the l2 norm of the TF-IDF row either,
+    so the decision values move slightly: check `compaction_report`.
+
+    Args:
+        source (str): Directory written by `export_linear_model`.
+        target (str): Directory of the compact artifact, created if needed.
+        threshold (float): Features with |coef| below it are dropped.
+        dtype (str): "float32" or "float16", for idf and coef.
+
+    Returns:
+        int: Number of features kept.
+
+    Raises:
+        ValueError: For an unknown dtype, a hashing model with a threshold (it
+            has no vocabulary to prune) or two kept n-grams sharing a hash.
+    """
+    if dtype not in ("float32", "float16"):
+        raise ValueError(f"Unsupported dtype {dtype!r} (expected 'float32' or 'float16')")
+
+    with open(os.path.join(source, META_FILENAME), encoding="utf-8") as f:
+        meta = json.load(f)
+    coef = np.load(os.path.join(source, COEF_FILENAME))
+
+    os.makedirs(target, exist_ok=True)
+    for filename in (VOCABULARY_TERMS_FILENAME, VOCABULARY_INDEXES_FILENAME, VOCABULARY_HASHES_FILENAME, IDF_FILENAME):
+        if os.path.exists(os.path.join(target, filename)):
+            os.remove(os.path.join(target, filename))
+
+    if meta.get("n_features"):
+        if threshold:
+            raise ValueError("Hashing models have no vocabulary to prune")
+        np.save(os.path.join(target, COEF_FILENAME), coef.astype(dtype))
+        kept = len(coef)
+    else:
+        if meta.get("vocabulary") == "hash64":
+            raise ValueError("The source artifact is already compacted")
+        terms = np.load(os.path.join(source, VOCABULARY_TERMS_FILENAME))
+        indexes = np.load(os.path.join(source, VOCABULARY_INDEXES_FILENAME))
+        idf = np.load(os.path.join(source, IDF_FILENAME))
+
+        features = indexes[np.abs(coef[indexes]) >= threshold]
+        hashes = term_hashes(terms[np.abs(coef[indexes]) >= threshold].tolist())
+        order = np.argsort(hashes, kind="stable")
+        hashes, features = hashes[order], features[order]
+        if np.any(hashes[1:] == hashes[:-1]):
+            raise ValueError("Two n-grams share the same 64-bit hash")
+
+        np.save(os.path.join(target, VOCABULARY_HASHES_FILENAME), hashes)
+        np.save(os.path.join(target, IDF_FILENAME), idf[features].astype(dtype))
+        np.save(os.path.join(target, COEF_FILENAME), coef[features].astype(dtype))
+        meta["vocabulary"] = "hash64"
+        kept = len(features)
+
+    meta.update({"dtype": dtype, "pruned_below": threshold})
+    with open(os.path.join(target, META_FILENAME), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return kept
+
+
+def _artifact_footprint(directory, repeat):
+    size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+    load_times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        LinearSentimentScorer.load(directory)
+        load_times.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    scorer = LinearSentimentScorer.load(directory)
+    resident, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return scorer, {
+        "features": len(scorer.vocabulary),
+        "size_bytes": size,
+        "load_ms": round(min(load_times) * 1000, 3),
+        "resident_bytes": resident,
+    }
+
+
+def compaction_report(full_dir, compact_dir, texts=None, labels=None, repeat=5):
+    """
+    Compare an artifact with its compacted copy.
+
+    Args:
+        full_dir (str): Directory written by `export_linear_model`.
+        compact_dir (str): Directory written by `compact_linear_model`.
+        texts (list[str]): Cleaned evaluation texts, optional.
+        labels (list[int]): Their labels, optional.
+        repeat (int): Loads timed, the best one is reported.
+
+    Returns:
+        dict: features, size on disk, load time and memory held after loading
+        of both artifacts; with `texts`, the share of identical predictions;
+        with `labels`, both accuracies and their difference.
+    """
+    full, full_stats = _artifact_footprint(full_dir, repeat)
+    compact, compact_stats = _artifact_footprint(compact_dir, repeat)
+    report = {"full": full_stats, "compact": compact_stats}
+
+    if texts:
+        full_predictions = np.array(full.predict_many(texts))
+        compact_predictions = np.array(compact.predict_many(texts))
+        report["agreement"] = round(float((full_predictions == compact_predictions).mean()), 6)
+        if labels is not None:
+            labels = np.asarray(labels)
+            full_stats["accuracy"] = round(float((full_predictions == labels).mean()), 6)
+            compact_stats["accuracy"] = round(float((compact_predictions == labels).mean()), 6)
+            report["accuracy_delta"] = round(compact_stats["accuracy"] - full_stats["accuracy"], 6)
+    return report
@@ -0,0 +1,47 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ml.feedback import apply_feedback
+from ml.registry import ModelRegistry, RegistryError, builtin_bundle
+
+
+class Command(BaseCommand):
+    help = "Learn the pending sentiment feedback on top of the active model and publish it as a new version"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--epochs", type=int, default=5, help="Passes over the feedback (default: 5)")
+        parser.add_argument(
+            "--learning-rate", type=float, default=0.05, help="Constant SGD step size (default: 0.05)",
+        )
+        parser.add_argument("--limit", type=int, help="Learn at most this many pending rows, oldest first")
+        parser.add_argument("--name", help="Version name (defaults to timestamp + checksum)")
+        parser.add_argument(
+            "--activate", action="store_true",
+            help="Activate the version once published and mark the feedback applied (it stays pending otherwise)",
+        )
+
+    def handle(self, *args, **options):
+        registry = ModelRegistry(settings.ML_MODEL_REGISTRY_DIR)
+        try:
+            active = registry.active()
+            bundle = registry.bundle(active["version"]) if active else builtin_bundle()
+            result = apply_feedback(
+                registry, bundle,
+                epochs=options["epochs"],
+                learning_rate=options["learning_rate"],
+                version=options["name"],
+                activate=options["activate"],
+                limit=options["limit"],
+            )
+        except (RegistryError, ValueError) as e:
+            raise CommandError(str(e))
+
+        if result is None:
+            self.stdout.write("No pending feedback.")
+            return
+        self.stdout.write(json.dumps(result, indent=2))
+        self.stdout.write(self.style.SUCCESS(f"Model version {result['version']} published."))
+        if options["activate"]:
+            self.stdout.write(self.style.SUCCESS(f"Model version {result['version']} activated."))
@@ -0,0 +1,48 @@
+import json
+
+import pandas as pd
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ml.linear import compact_linear_model, compaction_report
+from utils import clean_texts
+
+
+class Command(BaseCommand):
+    help = "Write a pruned, reduced-precision copy of the linear scorer artifact and compare it with the original"
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", help="Directory of the compact artifact")
+        parser.add_argument(
+            "--source",
+            default=settings.ML_LINEAR_MODEL_DIR,
+            help="Artifact to compact (defaults to ML_LINEAR_MODEL_DIR)",
+        )
+        parser.add_argument(
+            "--threshold", type=float, default=0.0,
+            help="Drop the features whose |coef| is below it (default: 0, keep every feature)",
+        )
+        parser.add_argument(
+            "--dtype", choices=["float32", "float16"], default="float32",
+            help="Precision of the stored idf and coef (default: float32)",
+        )
+        parser.add_argument(
+            "--eval-csv",
+            help="CSV with 'comment' and 'label' columns to compare the accuracy of both artifacts on",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            kept = compact_linear_model(options["source"], options["output"], options["threshold"], options["dtype"])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        texts = labels = None
+        if options["eval_csv"]:
+            df = pd.read_csv(options["eval_csv"]).dropna(subset=["comment", "label"])
+            texts = clean_texts(df["comment"].astype(str).tolist())
+            labels = df["label"].astype(int).tolist()
+
+        report = compaction_report(options["source"], options["output"], texts, labels)
+        self.stdout.write(json.dumps(report, indent=2))
+        self.stdout.write(self.style.SUCCESS(f"Compact linear model ({kept} features) written to {options['output']}."))
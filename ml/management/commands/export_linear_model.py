@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ml.linear import export_linear_model
+from ml.registry import builtin_bundle
+
+
+class Command(BaseCommand):
+    help = "Export the pickled TF-IDF vectorizer and model (repository root) into the fused linear scorer artifact"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            default=settings.ML_LINEAR_MODEL_DIR,
+            help="Target directory (defaults to ML_LINEAR_MODEL_DIR)",
+        )
+
+    def handle(self, *args, **options):
+        vectorizer, model = builtin_bundle().sklearn()
+        try:
+            export_linear_model(vectorizer, model, options["output"])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(f"Linear model exported to {options['output']}."))
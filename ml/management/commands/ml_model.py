@@ -0,0 +1,62 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ml.registry import BUILTIN_DIR, MODEL_FILENAME, VECTORIZER_FILENAME, ModelRegistry, RegistryError
+
+
+class Command(BaseCommand):
+    help = "Manage the versioned model registry (list, publish, activate, rollback, verify)"
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest="action", required=True)
+
+        subparsers.add_parser("list", help="List the published versions")
+
+        publish = subparsers.add_parser("publish", help="Publish a pickled model and vectorizer as a new version")
+        publish.add_argument("--model", default=os.path.join(BUILTIN_DIR, MODEL_FILENAME))
+        publish.add_argument("--vectorizer", default=os.path.join(BUILTIN_DIR, VECTORIZER_FILENAME))
+        publish.add_argument("--version", dest="name", help="Version name (defaults to timestamp + checksum)")
+        publish.add_argument("--activate", action="store_true", help="Activate the version once published")
+
+        activate = subparsers.add_parser("activate", help="Serve a published version")
+        activate.add_argument("name", metavar="VERSION")
+
+        subparsers.add_parser("rollback", help="Serve the previously active version again")
+
+        verify = subparsers.add_parser("verify", help="Check the checksums of a version")
+        verify.add_argument("name", metavar="VERSION")
+
+    def handle(self, *args, **options):
+        registry = ModelRegistry(settings.ML_MODEL_REGISTRY_DIR)
+        action = options["action"]
+
+        try:
+            if action == "list":
+                active = registry.active() or {}
+                for manifest in registry.versions():
+                    marker = "*" if manifest["version"] == active.get("version") else " "
+                    self.stdout.write(f"{marker} {manifest['version']}  {manifest['created_at']}")
+
+            elif action == "publish":
+                version = registry.publish(options["model"], options["vectorizer"], version=options["name"])
+                self.stdout.write(self.style.SUCCESS(f"Model version {version} published."))
+                if options["activate"]:
+                    registry.activate(version)
+                    self.stdout.write(self.style.SUCCESS(f"Model version {version} activated."))
+
+            elif action == "activate":
+                registry.activate(options["name"])
+                self.stdout.write(self.style.SUCCESS(f"Model version {options['name']} activated."))
+
+            elif action == "rollback":
+                version = registry.rollback()
+                self.stdout.write(self.style.SUCCESS(f"Rolled back to model version {version}."))
+
+            elif action == "verify":
+                registry.verify(options["name"])
+                self.stdout.write(self.style.SUCCESS(f"Model version {options['name']} is intact."))
+
+        except RegistryError as e:
+            raise CommandError(str(e))
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ml.registry import active_model
+from ml.sidecar import SidecarServer
+from ml.warmup import warmup
+
+
+class Command(BaseCommand):
+    help = "Run the inference sidecar scoring the texts of every web worker over a Unix socket"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--socket",
+            default=settings.ML_SIDECAR_SOCKET,
+            help="Unix socket to listen on (defaults to ML_SIDECAR_SOCKET)",
+        )
+
+    def handle(self, *args, **options):
+        # The sidecar scores in-process, whatever the workers are configured with
+        settings.ML_SIDECAR_ENABLED = False
+        active_model.get()
+        if settings.ML_WARMUP_ENABLED:
+            # A warm-up started before the flag changed skipped the model
+            warmup.wait()
+            warmup.run()
+
+        server = SidecarServer(options["socket"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Inference sidecar serving model version {active_model.get().version} on {options['socket']}."
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,192 @@
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+
+from utils.utils import write_json_atomically
+
+
+# Bundle of the worker process, loaded once by `_init_worker`
+_worker_bundle = None
+
+
+def _init_worker():
+    """Set up Django (spawned processes) and load the served model once per process."""
+    global _worker_bundle
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+    from ml.registry import active_model
+
+    _worker_bundle = active_model.get()
+
+
+def _score_chunk(lines, text_field):
+    """
+    Score a chunk of JSONL lines.
+
+    Every valid line is an object whose `text_field` holds the text; it is
+    written back with a "prediction" key added. Other lines get an "error" key
+    (lines that are not JSON objects are kept as a "line" string).
+
+    Returns:
+        tuple: (output bytes, number of rows, pid, model version, seconds spent)
+    """
+    from ml.services import predict_sentiments
+
+    if _worker_bundle is None:
+        _init_worker()
+    started = time.perf_counter()
+
+    records, texts = [], []
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        if isinstance(record, dict):
+            text = record.get(text_field)
+        else:
+            record, text = {"line": line.decode("utf-8", "replace").rstrip("\r\n")}, None
+        records.append(record)
+        texts.append(text if isinstance(text, str) and text else None)
+
+    valid_indexes = [i for i, text in enumerate(texts) if text is not None]
+    predictions = dict(zip(valid_indexes, predict_sentiments([texts[i] for i in valid_indexes], _worker_bundle)))
+    for i, record in enumerate(records):
+        if i in predictions:
+            record["prediction"] = predictions[i]
+        else:
+            record["error"] = "Texte vide ou invalide"
+
+    output = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode("utf-8")
+    return output, len(records), os.getpid(), _worker_bundle.version, time.perf_counter() - started
+
+
+def _read_chunks(f, chunk_size):
+    """Yield (lines, input offset after the chunk) for the non-blank lines of `f`."""
+    lines = []
+    while True:
+        line = f.readline()
+        if not line:
+            break
+        if line.strip():
+            lines.append(line)
+        if len(lines) >= chunk_size:
+            yield lines, f.tell()
+            lines = []
+    if lines:
+        yield lines, f.tell()
+
+
+class _InProcessExecutor:
+    """Executor running chunks in the current process (--workers 0)."""
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+class Command(BaseCommand):
+    help = "Score the texts of a JSONL file offline, in parallel, into another JSONL file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("input", help="JSONL file, one object per line")
+        parser.add_argument("output", help="JSONL file written with a 'prediction' (or 'error') key per line")
+        parser.add_argument("--text-field", default="text", help="Key of the text in each object (default: text)")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Lines scored per task (default: 1000)")
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count(),
+            help="Scoring processes (default: number of CPUs, 0 scores in this process)",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            help="Progress file updated after every chunk written (default: <output>.checkpoint)",
+        )
+        parser.add_argument("--resume", action="store_true", help="Continue from the checkpoint of a previous run")
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] < 1 or options["workers"] < 0:
+            raise CommandError("--chunk-size must be positive and --workers not negative")
+
+        checkpoint_path = options["checkpoint"] or options["output"] + ".checkpoint"
+        state = {"input_offset": 0, "output_offset": 0, "rows": 0}
+        if options["resume"]:
+            try:
+                with open(checkpoint_path, encoding="utf-8") as f:
+                    state = json.load(f)
+            except FileNotFoundError:
+                raise CommandError(f"No checkpoint to resume from at {checkpoint_path}")
+            self.stdout.write(f"Resuming after {state['rows']} rows.")
+
+        workers = options["workers"]
+        executor = (
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) if workers
+            else _InProcessExecutor()
+        )
+        # Chunks submitted ahead of the one being written: keeps every worker busy
+        # while bounding the memory held by results waiting for their turn
+        max_pending = max(1, workers) * 2
+        per_worker = {}
+        versions = set()
+        started = time.perf_counter()
+        rows = 0
+
+        try:
+            with open(options["input"], "rb") as source, open(options["output"], "ab") as target:
+                source.seek(state["input_offset"])
+                target.truncate(state["output_offset"])
+                target.seek(state["output_offset"])
+
+                pending = deque()
+                chunks = _read_chunks(source, options["chunk_size"])
+                while True:
+                    for lines, offset in chunks:
+                        pending.append((executor.submit(_score_chunk, lines, options["text_field"]), offset))
+                        if len(pending) >= max_pending:
+                            break
+                    if not pending:
+                        break
+
+                    # Results are written in input order, whatever the completion order
+                    future, offset = pending.popleft()
+                    output, count, pid, version, seconds = future.result()
+                    target.write(output)
+                    target.flush()
+                    os.fsync(target.fileno())
+
+                    rows += count
+                    versions.add(version)
+                    worker = per_worker.setdefault(pid, {"rows": 0, "seconds": 0.0})
+                    worker["rows"] += count
+                    worker["seconds"] += seconds
+
+                    state = {
+                        "input_offset": offset,
+                        "output_offset": target.tell(),
+                        "rows": state["rows"] + count,
+                    }
+                    write_json_atomically(checkpoint_path, state)
+        except FileNotFoundError as e:
+            raise CommandError(str(e))
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        elapsed = time.perf_counter() - started
+        for pid, worker in sorted(per_worker.items()):
+            rate = worker["rows"] / worker["seconds"] if worker["seconds"] else 0
+            self.stdout.write(f"worker {pid}: {worker['rows']} rows, {rate:,.0f} rows/s")
+        total_rate = rows / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Scored {rows} rows in {elapsed:.2f}s ({total_rate:,.0f} rows/s) "
+            f"with model version {', '.join(sorted(versions)) or '-'} into {options['output']}."
+        ))
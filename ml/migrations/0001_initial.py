@@ -0,0 +1,26 @@
+# Generated by Django 5.2.1 on 2026-10-17 19:32
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PredictionLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.TextField()),
+                ('prediction', models.SmallIntegerField()),
+                ('model_version', models.CharField(max_length=64)),
+                ('endpoint', models.CharField(max_length=32)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
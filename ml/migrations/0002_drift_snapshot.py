@@ -0,0 +1,24 @@
+# Generated by Django 5.2.1 on 2026-10-17 19:41
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ml', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DriftSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('model_version', models.CharField(max_length=64)),
+                ('texts', models.PositiveIntegerField()),
+                ('sketch', models.JSONField()),
+            ],
+        ),
+    ]
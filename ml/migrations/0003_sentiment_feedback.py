@@ -0,0 +1,25 @@
+# Generated by Django 5.2.1 on 2026-10-17 19:44
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ml', '0002_drift_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SentimentFeedback',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.TextField()),
+                ('label', models.SmallIntegerField(choices=[(0, 'Negative'), (1, 'Positive')])),
+                ('model_version', models.CharField(max_length=64)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('applied_version', models.CharField(blank=True, db_index=True, default='', max_length=64)),
+            ],
+        ),
+    ]
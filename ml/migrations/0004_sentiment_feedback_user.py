@@ -0,0 +1,21 @@
+# Generated by Django 5.2.1 on 2026-10-17 20:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ml', '0003_sentiment_feedback'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sentimentfeedback',
+            name='user',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sentiment_feedback', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
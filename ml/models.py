@@ -1,3 +1,81 @@
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+
+class PredictionLog(models.Model):
+    """
+    Model representing one prediction served by the sentiment endpoints.
+
+    Rows are written in batches by ml.prediction_log (ML_PREDICTION_LOG_ENABLED),
+    never from the request itself.
+    """
+    text = models.TextField()
+    prediction = models.SmallIntegerField()
+    model_version = models.CharField(max_length=64)
+    endpoint = models.CharField(max_length=32)
+    # Time of the prediction, not of the (delayed) insert
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        """
+        String representation of the prediction log entry.
+        Useful for displaying entries in the Django admin.
+        """
+        return f"{self.prediction} ({self.model_version}) {self.text[:50]}"
+
+
+class DriftSnapshot(models.Model):
+    """
+    Model representing the input drift sketch of one worker over one period.
+
+    Written by ml.drift every ML_DRIFT_FLUSH_SECONDS; the monitoring app
+    merges the snapshots of a time window. No raw text is stored.
+    """
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+    model_version = models.CharField(max_length=64)
+    texts = models.PositiveIntegerField()
+    # ml.drift.DriftSketch.to_dict()
+    sketch = models.JSONField()
+
+    def __str__(self):
+        """
+        String representation of the snapshot.
+        Useful for displaying entries in the Django admin.
+        """
+        return f"{self.created_at:%Y-%m-%d %H:%M} {self.model_version} ({self.texts} texts)"
+
+
+class SentimentFeedback(models.Model):
+    """
+    Model representing a user-labelled text, sent to correct a prediction.
+
+    Pending rows (no applied_version) are learned incrementally by
+    `manage.py apply_feedback`, which publishes the result as a new model
+    version (ml/feedback.py). Rows are marked applied once that version is
+    activated.
+    """
+    LABEL_CHOICES = [
+        (0, "Negative"),
+        (1, "Positive"),
+    ]
+
+    text = models.TextField()
+    label = models.SmallIntegerField(choices=LABEL_CHOICES)
+    # Model version served when the feedback was sent
+    model_version = models.CharField(max_length=64)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+    # Authenticated user who sent it
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL,
+        null=True, related_name="sentiment_feedback"
+    )
+    # Model version that learned it, empty while pending
+    applied_version = models.CharField(max_length=64, blank=True, default="", db_index=True)
+
+    def __str__(self):
+        """
+        String representation of the feedback.
+        Useful for displaying entries in the Django admin.
+        """
+        return f"{self.label} {self.text[:50]}"
@@ -0,0 +1,187 @@
+"""
+Asynchronous, batched logging of the predictions served (ml.models.PredictionLog).
+
+Writing one row per request would add a database round-trip to every
+prediction. With ML_PREDICTION_LOG_ENABLED, the views hand their predictions
+to `prediction_log` instead: they are appended to an in-memory buffer and a
+background thread writes them with one `bulk_create` every
+ML_PREDICTION_LOG_BATCH_SIZE rows or ML_PREDICTION_LOG_FLUSH_MS milliseconds,
+whichever comes first.
+
+The buffer holds at most ML_PREDICTION_LOG_MAX_BUFFER rows, each with the
+first ML_PREDICTION_LOG_MAX_TEXT_CHARS characters of its text only (texts can
+reach ML_MAX_TEXT_CHARS): its memory is bounded by about MAX_BUFFER x
+MAX_TEXT_CHARS characters. When the database cannot keep up, new predictions
+are dropped (and counted) rather than growing the memory of the worker.
+Buffered rows are written when the process exits (atexit, and the gunicorn
+worker_exit hook).
+"""
+
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from utils.threads import ProcessThread
+
+
+logger = logging.getLogger(__name__)
+
+
+class PredictionLogWriter:
+    """
+    Bounded buffer of predictions flushed to the database by a background thread.
+
+    Enabled flag, batch size, flush interval and buffer size are read from the
+    settings on each call, like the prediction cache.
+    """
+
+    def __init__(self):
+        self._buffer = deque()
+        self._condition = threading.Condition()
+        self._writer = ProcessThread(self._run, "ml-prediction-log", self._condition)
+        self._closing = False
+        self._atexit_registered = False
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.flushes = 0
+
+    def _on_start(self, forked):
+        if forked:
+            # Rows inherited from the parent are its own to write
+            self._buffer.clear()
+        self._closing = False
+        if not self._atexit_registered:
+            atexit.register(self.close)
+            self._atexit_registered = True
+
+    def record(self, texts, predictions, version, endpoint):
+        """
+        Queue predictions for logging, without touching the database.
+
+        Args:
+            texts (list[str]): The raw texts, truncated to
+                ML_PREDICTION_LOG_MAX_TEXT_CHARS characters.
+            predictions (list[int]): Their predictions, in the same order.
+            version (str): The model version that scored them.
+            endpoint (str): Name of the endpoint that served them.
+        """
+        if not settings.ML_PREDICTION_LOG_ENABLED or not texts:
+            return
+        self._writer.ensure(self._on_start)
+        created_at = timezone.now()
+        max_chars = settings.ML_PREDICTION_LOG_MAX_TEXT_CHARS
+        rows = [
+            (text[:max_chars], prediction, version, endpoint, created_at)
+            for text, prediction in zip(texts, predictions)
+        ]
+
+        with self._condition:
+            room = max(0, settings.ML_PREDICTION_LOG_MAX_BUFFER - len(self._buffer))
+            self._buffer.extend(rows[:room])
+            self.dropped += len(rows) - min(room, len(rows))
+            if len(self._buffer) >= settings.ML_PREDICTION_LOG_BATCH_SIZE:
+                self._condition.notify()
+
+    def _take(self):
+        """Remove and return up to one batch of buffered rows (lock held)."""
+        batch_size = settings.ML_PREDICTION_LOG_BATCH_SIZE
+        return [self._buffer.popleft() for _ in range(min(batch_size, len(self._buffer)))]
+
+    def _write(self, rows):
+        from .models import PredictionLog
+
+        try:
+            PredictionLog.objects.bulk_create([
+                PredictionLog(text=text, prediction=prediction, model_version=version, endpoint=endpoint,
+                              created_at=created_at)
+                for text, prediction, version, endpoint, created_at in rows
+            ])
+        except Exception:
+            logger.exception("Could not write %d prediction log rows", len(rows))
+            with self._condition:
+                self.failed += len(rows)
+        else:
+            with self._condition:
+                self.written += len(rows)
+                self.flushes += 1
+
+    def flush(self):
+        """Write every buffered row now, in the calling thread."""
+        while True:
+            with self._condition:
+                rows = self._take()
+            if not rows:
+                return
+            self._write(rows)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                deadline = time.monotonic() + settings.ML_PREDICTION_LOG_FLUSH_MS / 1000
+                while not self._closing and len(self._buffer) < settings.ML_PREDICTION_LOG_BATCH_SIZE:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                closing = self._closing
+                rows = self._take()
+
+            if rows:
+                close_old_connections()
+                self._write(rows)
+            if closing:
+                with self._condition:
+                    if self._buffer:
+                        continue
+                connection.close()
+                return
+
+    def close(self, timeout=5.0):
+        """
+        Stop the background thread once the buffer is written.
+
+        Args:
+            timeout (float): Seconds to wait for the thread. Rows still
+                buffered afterwards are written in the calling thread.
+        """
+        if self._writer.is_running():
+            with self._condition:
+                self._closing = True
+                self._condition.notify()
+            self._writer.join(timeout)
+        if not self._writer.is_running():
+            self.flush()
+
+    def stats(self):
+        """
+        Return the logging counters of this process.
+
+        Returns:
+            dict: Whether logging is enabled, rows buffered, written, dropped
+            (buffer full) and failed (database error), and number of flushes.
+        """
+        with self._condition:
+            return {
+                "enabled": settings.ML_PREDICTION_LOG_ENABLED,
+                "buffered": len(self._buffer),
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "flushes": self.flushes,
+            }
+
+    def clear(self):
+        """Drop the buffered rows and reset the counters."""
+        with self._condition:
+            self._buffer.clear()
+            self.written = self.dropped = self.failed = self.flushes = 0
+
+
+prediction_log = PredictionLogWriter()
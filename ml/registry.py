@@ -0,0 +1,440 @@
+"""
+Versioned model registry with atomic hot reload.
+
+Layout of ML_MODEL_REGISTRY_DIR:
+    versions/<version>/manifest.json                      version, creation date, SHA-256 of every file
+    versions/<version>/sentiment_analysis_model.pkl
+    versions/<version>/sentiment_analysis_vectorizer.pkl
+    versions/<version>/linear/                            fused scorer artifact (ml/linear.py)
+    ACTIVE                                                {"version": ..., "previous": ...}
+
+Versions are immutable once published. Activating a version (or rolling back
+to the previous one) only rewrites the small ACTIVE file, atomically. Each
+process holds the bundle of artifacts it serves in `active_model`: requests
+grab the current bundle once and use it until they finish, while a background
+poller thread (every ML_MODEL_POLL_INTERVAL seconds) verifies and loads the
+newly active version and swaps the reference in a single assignment. In-flight requests therefore
+complete on the old version, new requests get the new one.
+
+When the registry holds no active version, the artifacts at the repository
+root (sentiment_analysis_*.pkl and ML_LINEAR_MODEL_DIR) are served as a
+"builtin-<checksum>" version.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+from utils.threads import ProcessThread
+from utils.utils import write_json_atomically
+
+from .linear import LinearSentimentScorer, export_linear_model
+
+
+logger = logging.getLogger(__name__)
+
+MODEL_FILENAME = "sentiment_analysis_model.pkl"
+VECTORIZER_FILENAME = "sentiment_analysis_vectorizer.pkl"
+LINEAR_DIRNAME = "linear"
+MANIFEST_FILENAME = "manifest.json"
+ACTIVE_FILENAME = "ACTIVE"
+
+# Artifacts served when the registry has no active version
+BUILTIN_DIR = os.path.join(os.path.dirname(__file__), '..')
+
+
+class RegistryError(Exception):
+    """Raised for unknown versions, corrupted artifacts or an empty history."""
+
+
+def file_sha256(path):
+    """Return the hex SHA-256 of a file, read in 1 MiB chunks."""
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _list_files(directory):
+    """Return the paths of every file under `directory`, relative to it, sorted."""
+    files = []
+    for root, _, names in os.walk(directory):
+        for name in names:
+            files.append(os.path.relpath(os.path.join(root, name), directory))
+    return sorted(files)
+
+
+class ModelBundle:
+    """
+    The artifacts of one model version, loaded lazily and at most once.
+
+    Attributes:
+        version (str): The version name.
+        model_path (str): Pickled logistic regression.
+        vectorizer_path (str): Pickled TF-IDF vectorizer.
+        linear_dir (str): Fused scorer artifact directory.
+        loaded_at (datetime): When the bundle became active in this process.
+    """
+
+    def __init__(self, version, model_path, vectorizer_path, linear_dir):
+        self.version = version
+        self.model_path = model_path
+        self.vectorizer_path = vectorizer_path
+        self.linear_dir = linear_dir
+        self.loaded_at = timezone.now()
+        self._lock = threading.Lock()
+        self._sklearn = None
+        self._linear = {}
+
+    def sklearn(self):
+        """
+        Return the pickled (vectorizer, model) pair, loading it on first use.
+
+        Returns:
+            tuple: (vectorizer, model)
+        """
+        if self._sklearn is None:
+            with self._lock:
+                if self._sklearn is None:
+                    with open(self.vectorizer_path, 'rb') as f:
+                        vectorizer = pickle.load(f)
+                    with open(self.model_path, 'rb') as f:
+                        model = pickle.load(f)
+                    self._sklearn = (vectorizer, model)
+        return self._sklearn
+
+    def linear(self, mmap=False):
+        """
+        Return the fused linear scorer, loading it on first use.
+
+        Args:
+            mmap (bool): Memory-map the arrays so forked workers share them.
+
+        Returns:
+            LinearSentimentScorer: The loaded scorer.
+        """
+        scorer = self._linear.get(mmap)
+        if scorer is None:
+            with self._lock:
+                scorer = self._linear.get(mmap)
+                if scorer is None:
+                    scorer = self._linear[mmap] = LinearSentimentScorer.load(self.linear_dir, mmap=mmap)
+        return scorer
+
+    def preload(self, engine, mmap=False):
+        """
+        Load the artifacts `engine` needs, so the first request does not pay for it.
+
+        Args:
+            engine (str): "sklearn" or "linear".
+            mmap (bool): Passed to `linear` for the linear engine.
+        """
+        if engine == "linear":
+            self.linear(mmap)
+        else:
+            self.sklearn()
+
+
+class ModelRegistry:
+    """
+    On-disk registry of immutable model versions and of the active one.
+
+    Args:
+        root (str): The registry directory (ML_MODEL_REGISTRY_DIR).
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.versions_dir = os.path.join(root, "versions")
+        self.active_path = os.path.join(root, ACTIVE_FILENAME)
+
+    def version_dir(self, version):
+        return os.path.join(self.versions_dir, version)
+
+    def manifest(self, version):
+        """
+        Return the manifest of a published version.
+
+        Raises:
+            RegistryError: If the version does not exist.
+        """
+        try:
+            with open(os.path.join(self.version_dir(version), MANIFEST_FILENAME), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise RegistryError(f"Unknown model version '{version}'")
+
+    def versions(self):
+        """Return the manifests of every published version, oldest first."""
+        if not os.path.isdir(self.versions_dir):
+            return []
+        manifests = [
+            self.manifest(name) for name in os.listdir(self.versions_dir)
+            if os.path.isfile(os.path.join(self.versions_dir, name, MANIFEST_FILENAME))
+        ]
+        return sorted(manifests, key=lambda manifest: manifest["created_at"])
+
+    def publish(self, model_path, vectorizer_path, version=None):
+        """
+        Publish a new immutable version from a pickled model and vectorizer.
+
+        The fused linear artifact is exported next to the pickles and every file
+        is checksummed in the manifest. The version directory is built aside and
+        moved into place in one rename, so a half-written version is never seen.
+
+        Args:
+            model_path (str): Pickled logistic regression.
+            vectorizer_path (str): Pickled TF-IDF vectorizer.
+            version (str): Version name, defaults to a timestamp plus a checksum.
+
+        Returns:
+            str: The published version name.
+
+        Raises:
+            RegistryError: If the version already exists.
+        """
+        os.makedirs(self.versions_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=self.versions_dir, prefix=".staging-")
+        try:
+            shutil.copyfile(model_path, os.path.join(staging, MODEL_FILENAME))
+            shutil.copyfile(vectorizer_path, os.path.join(staging, VECTORIZER_FILENAME))
+            with open(vectorizer_path, 'rb') as f:
+                vectorizer = pickle.load(f)
+            with open(model_path, 'rb') as f:
+                model = pickle.load(f)
+            export_linear_model(vectorizer, model, os.path.join(staging, LINEAR_DIRNAME))
+
+            files = {name: file_sha256(os.path.join(staging, name)) for name in _list_files(staging)}
+            if version is None:
+                digest = hashlib.sha256(json.dumps(files, sort_keys=True).encode()).hexdigest()[:8]
+                version = f"{timezone.now():%Y%m%d-%H%M%S}-{digest}"
+            if os.path.exists(self.version_dir(version)):
+                raise RegistryError(f"Model version '{version}' already exists")
+
+            manifest = {"version": version, "created_at": timezone.now().isoformat(), "files": files}
+            write_json_atomically(os.path.join(staging, MANIFEST_FILENAME), manifest)
+            os.chmod(staging, 0o755)
+            os.replace(staging, self.version_dir(version))
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        return version
+
+    def verify(self, version):
+        """
+        Check every file of a version against the checksums of its manifest.
+
+        Raises:
+            RegistryError: If a file is missing or its checksum differs.
+        """
+        directory = self.version_dir(version)
+        for name, checksum in self.manifest(version)["files"].items():
+            path = os.path.join(directory, name)
+            if not os.path.isfile(path) or file_sha256(path) != checksum:
+                raise RegistryError(f"Model version '{version}' is corrupted: {name} does not match its checksum")
+
+    def active(self):
+        """
+        Return the content of the ACTIVE file, or None when no version is active.
+
+        Returns:
+            dict | None: {"version": ..., "previous": ..., "activated_at": ...}
+        """
+        try:
+            with open(self.active_path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def activate(self, version):
+        """
+        Make a verified version the active one (atomic rename of ACTIVE).
+
+        Raises:
+            RegistryError: If the version is unknown or corrupted.
+        """
+        self.verify(version)
+        current = self.active()
+        previous = current["version"] if current else None
+        if previous == version:
+            previous = current.get("previous")
+        write_json_atomically(self.active_path, {
+            "version": version,
+            "previous": previous,
+            "activated_at": timezone.now().isoformat(),
+        })
+
+    def rollback(self):
+        """
+        Re-activate the previously active version.
+
+        Returns:
+            str: The version now active.
+
+        Raises:
+            RegistryError: If there is no previous version.
+        """
+        current = self.active()
+        if not current or not current.get("previous"):
+            raise RegistryError("No previous model version to roll back to")
+        self.activate(current["previous"])
+        return current["previous"]
+
+    def bundle(self, version):
+        """Return an unloaded `ModelBundle` for a published version."""
+        directory = self.version_dir(version)
+        return ModelBundle(
+            version=version,
+            model_path=os.path.join(directory, MODEL_FILENAME),
+            vectorizer_path=os.path.join(directory, VECTORIZER_FILENAME),
+            linear_dir=os.path.join(directory, LINEAR_DIRNAME),
+        )
+
+
+def builtin_bundle():
+    """
+    Return the bundle of the artifacts shipped at the repository root.
+
+    Its version is a checksum of the pickles and of the linear artifact.
+    """
+    model_path = os.path.join(BUILTIN_DIR, MODEL_FILENAME)
+    vectorizer_path = os.path.join(BUILTIN_DIR, VECTORIZER_FILENAME)
+    linear_dir = settings.ML_LINEAR_MODEL_DIR
+
+    sha = hashlib.sha256()
+    for path in [vectorizer_path, model_path] + [os.path.join(linear_dir, name) for name in _list_files(linear_dir)]:
+        sha.update(file_sha256(path).encode())
+    return ModelBundle(f"builtin-{sha.hexdigest()[:12]}", model_path, vectorizer_path, linear_dir)
+
+
+class ActiveModel:
+    """
+    The model bundle served by this process, hot-swapped when ACTIVE changes.
+
+    Requests never check the registry: a background poller thread (one per
+    process) does, every ML_MODEL_POLL_INTERVAL seconds, and swaps the
+    reference once the new version is verified and loaded. A version that
+    fails to verify or load is logged and the current bundle is kept; the
+    poller then retries less and less often (up to MAX_BACKOFF seconds).
+    """
+
+    # Longest wait between two checks after repeated failures, in seconds
+    MAX_BACKOFF = 300
+
+    def __init__(self):
+        self._bundle = None
+        # ACTIVE version the served bundle was loaded for (None = builtin)
+        self._served = None
+        self._lock = threading.Lock()
+        self._poller = ProcessThread(self._poll, "ml-model-poller")
+        self._failures = 0
+
+    def registry(self):
+        return ModelRegistry(settings.ML_MODEL_REGISTRY_DIR)
+
+    def get(self):
+        """
+        Return the bundle to use for one request.
+
+        Only the first call of a process loads a version inline; afterwards
+        this is an attribute read, plus a check that the poller runs. Callers must keep the returned bundle
+        for the whole request so that it completes on a single version even
+        if a reload happens meanwhile.
+        """
+        if self._bundle is None:
+            with self._lock:
+                if self._bundle is None:
+                    self._swap(self._target_version())
+        # Without polling, the version is read once at startup
+        if not self._poller.is_running() and settings.ML_MODEL_POLL_INTERVAL > 0:
+            self._poller.ensure(self._reset_failures)
+        return self._bundle
+
+    def _reset_failures(self, forked):
+        self._failures = 0
+
+    def _poll(self):
+        while True:
+            interval = settings.ML_MODEL_POLL_INTERVAL
+            if interval <= 0:
+                return
+            time.sleep(min(interval * 2 ** self._failures, self.MAX_BACKOFF))
+            self.check()
+
+    def check(self):
+        """
+        Load the active version if it changed, and swap it in (poller thread).
+
+        Returns:
+            bool: False if the active version could not be verified or loaded,
+            in which case the current bundle is still served.
+        """
+        try:
+            target = self._target_version()
+            if target == self._served and self._bundle is not None:
+                self._failures = 0
+                return True
+            with self._lock:
+                self._swap(target)
+        except Exception:
+            # Whatever is wrong with the new version (bad manifest, truncated
+            # or incompatible pickle), the poller must survive it
+            self._failures = min(self._failures + 1, 16)
+            logger.exception("Could not load the active model version, still serving %s",
+                             self._bundle.version if self._bundle else None)
+            return False
+        self._failures = 0
+        return True
+
+    def _target_version(self):
+        active = self.registry().active()
+        return active["version"] if active else None
+
+    def _swap(self, target):
+        if target:
+            self.registry().verify(target)
+            bundle = self.registry().bundle(target)
+        else:
+            bundle = builtin_bundle()
+        # Load before swapping, outside of any request: requests keep the
+        # previous bundle meanwhile. Workers scoring through the sidecar
+        # (ml/sidecar.py) only need the version name, and load the artifacts
+        # on a fallback only.
+        if not settings.ML_SIDECAR_ENABLED:
+            bundle.preload(settings.ML_SCORING_ENGINE, settings.ML_SHARED_ARTIFACTS)
+        self._bundle, self._served = bundle, target
+
+    def reload(self):
+        """
+        Load the active version now, whether or not it changed, and swap it in.
+
+        Returns:
+            ModelBundle: The bundle now served.
+
+        Raises:
+            RegistryError: If the active version is unknown or corrupted.
+        """
+        with self._lock:
+            self._swap(self._target_version())
+        return self._bundle
+
+    def status(self):
+        """Return the version served by this process and when it was loaded."""
+        bundle = self._bundle
+        if bundle is None:
+            return {"version": None, "loaded_at": None}
+        return {"version": bundle.version, "loaded_at": bundle.loaded_at.isoformat()}
+
+
+# Process-wide holder of the served bundle, used by ml.services
+active_model = ActiveModel()
@@ -0,0 +1,569 @@
+"""
+Scoring services for the ml app.
+
+Scores texts with the model version served by this process (ml.registry,
+loaded once per process or once in the gunicorn master, see
+`preload_artifacts`) and exposes the helpers used by the views to turn raw
+texts into predictions.
+
+Texts longer than ML_LONG_TEXT_CHARS are scored by overlapping windows of
+words instead (`predict_long_document`), so that their cost stays bounded.
+
+Two scoring engines are available, selected by the ML_SCORING_ENGINE setting:
+    - "sklearn": the pickled TF-IDF vectorizer and logistic regression
+    - "linear": the fused scorer of ml.linear, exported next to the pickles
+"""
+
+import asyncio
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from utils import clean_text, clean_texts, iter_clean_tokens
+from .cache import prediction_cache
+from .coalescer import BatchCoalescer
+from .linear import HashedVocabulary
+from .registry import active_model
+from .sidecar import SidecarUnavailable, sidecar_client
+
+
+def load_sklearn_artifacts():
+    """
+    Return the pickled TF-IDF vectorizer and logistic regression of the served
+    model version, loading them on first use.
+
+    Returns:
+        tuple: (vectorizer, model)
+    """
+    return active_model.get().sklearn()
+
+
+def current_model_version():
+    """
+    Return the model version served by this process.
+
+    The version is part of every prediction cache key and is reported in the
+    X-Model-Version header of the prediction responses.
+
+    Returns:
+        str: The model version.
+    """
+    return active_model.get().version
+
+
+def preload_artifacts():
+    """
+    Load the artifacts of the active model version for the configured scoring
+    engine in the current process.
+
+    Called by the gunicorn master (see gunicorn.conf.py) before workers are
+    forked, so that every worker inherits the loaded artifacts instead of
+    loading its own copy on its first request.
+    """
+    active_model.get()
+
+
+def _predict_cleaned(cleaned_texts, bundle):
+    """
+    Predict already cleaned texts with the configured scoring engine.
+
+    Args:
+        cleaned_texts (list[str]): Texts returned by `clean_text`.
+        bundle (ModelBundle): The model version to score with.
+
+    Returns:
+        list[int]: One prediction per text, in input order.
+
+    Raises:
+        ImproperlyConfigured: If ML_SCORING_ENGINE is not a known engine.
+    """
+    engine = settings.ML_SCORING_ENGINE
+
+    if engine == "linear":
+        return bundle.linear(settings.ML_SHARED_ARTIFACTS).predict_many(cleaned_texts)
+
+    if engine == "sklearn":
+        vectorizer, model = bundle.sklearn()
+        return [int(prediction) for prediction in model.predict(vectorizer.transform(cleaned_texts))]
+
+    raise ImproperlyConfigured(f"Unknown ML_SCORING_ENGINE '{engine}' (expected 'sklearn' or 'linear')")
+
+
+def _predict_coalesced_batch(items):
+    """
+    Score a batch collected by the coalescer.
+
+    Args:
+        items (list[tuple[ModelBundle, str]]): (bundle, cleaned text) pairs. A
+            batch collected during a hot reload may mix two model versions.
+
+    Returns:
+        list[int]: One prediction per item, in input order.
+    """
+    positions = {}
+    for i, (bundle, _) in enumerate(items):
+        positions.setdefault(bundle, []).append(i)
+
+    predictions = [None] * len(items)
+    for bundle, indexes in positions.items():
+        scored = _predict_cleaned([items[i][1] for i in indexes], bundle)
+        for i, prediction in zip(indexes, scored):
+            predictions[i] = prediction
+    return predictions
+
+
+# How long a request waits for the coalescer before scoring its texts itself,
+# in coalescing windows, with a floor in seconds
+COALESCE_TIMEOUT_WINDOWS = 50
+COALESCE_MIN_TIMEOUT = 0.1
+
+
+@lru_cache(maxsize=None)
+def get_coalescer():
+    """
+    Return the process-wide coalescer of single-text predictions.
+
+    Returns:
+        BatchCoalescer: Scores with the configured engine, using the
+        ML_COALESCE_WINDOW_MS / ML_COALESCE_MAX_BATCH settings.
+    """
+    return BatchCoalescer(
+        _predict_coalesced_batch,
+        window=settings.ML_COALESCE_WINDOW_MS / 1000,
+        max_batch=settings.ML_COALESCE_MAX_BATCH,
+    )
+
+
+def _predict_coalesced(cleaned_texts, bundle):
+    """
+    Predict cleaned texts through the coalescer, batched with concurrent requests.
+
+    Texts still waiting COALESCE_TIMEOUT_WINDOWS coalescing windows (and at
+    least COALESCE_MIN_TIMEOUT seconds) after submission are scored in the
+    calling thread instead.
+
+    Args:
+        cleaned_texts (list[str]): Texts returned by `clean_text`.
+        bundle (ModelBundle): The model version to score with.
+
+    Returns:
+        list[int]: One prediction per text, in input order.
+    """
+    coalescer = get_coalescer()
+    futures = [coalescer.submit((bundle, cleaned)) for cleaned in cleaned_texts]
+    deadline = time.monotonic() + max(COALESCE_MIN_TIMEOUT, COALESCE_TIMEOUT_WINDOWS * coalescer.window)
+    predictions = []
+    for i, future in enumerate(futures):
+        try:
+            predictions.append(future.result(timeout=max(0, deadline - time.monotonic())))
+        except FutureTimeoutError:
+            # Stuck or overloaded coalescer: score the rest in this thread.
+            # Its late results are dropped.
+            coalescer.fallback()
+            return predictions + _predict_cleaned(cleaned_texts[i:], bundle)
+    return predictions
+
+
+def _predict_sidecar(cleaned_texts, bundle):
+    """
+    Predict cleaned texts in the inference sidecar (ml/sidecar.py), in-process
+    when it is unavailable or too slow.
+
+    Args:
+        cleaned_texts (list[str]): Texts returned by `clean_text`.
+        bundle (ModelBundle): The model version to score with.
+
+    Returns:
+        list[int]: One prediction per text, in input order.
+    """
+    try:
+        return sidecar_client.predict(cleaned_texts, bundle.version)
+    except SidecarUnavailable:
+        return _predict_cleaned(cleaned_texts, bundle)
+
+
+def _predictor():
+    """Return the function scoring cache misses: sidecar, coalescer or direct."""
+    if settings.ML_SIDECAR_ENABLED:
+        return _predict_sidecar
+    if settings.ML_COALESCE_ENABLED:
+        return _predict_coalesced
+    return _predict_cleaned
+
+
+def _predict_cleaned_cached(cleaned_texts, bundle, predict=_predict_cleaned):
+    """
+    Predict distinct cleaned texts, going through the prediction cache.
+
+    Args:
+        cleaned_texts (list[str]): Distinct texts returned by `clean_text`.
+        bundle (ModelBundle): The model version to score with.
+        predict (callable): Scores the cache misses.
+
+    Returns:
+        list[int]: One prediction per text, in input order.
+    """
+    predictions = prediction_cache.get_many(cleaned_texts, bundle.version)
+
+    missing = [cleaned for cleaned in cleaned_texts if cleaned not in predictions]
+    if missing:
+        fresh = dict(zip(missing, predict(missing, bundle)))
+        prediction_cache.set_many(fresh, bundle.version)
+        predictions.update(fresh)
+
+    return [predictions[cleaned] for cleaned in cleaned_texts]
+
+
+def predict_sentiment(text, bundle=None):
+    """
+    Predict the sentiment of a single text.
+
+    With ML_COALESCE_ENABLED, a cache miss is scored in the same batch as the
+    texts other threads of the worker submit at the same moment. With
+    ML_SIDECAR_ENABLED, it is scored by the inference sidecar.
+
+    Args:
+        text (str): The raw input text.
+        bundle (ModelBundle): The model version to score with, defaults to
+            the one currently served.
+
+    Returns:
+        int: 0 for negative, 1 for positive.
+    """
+    bundle = bundle or active_model.get()
+    return _predict_cleaned_cached([clean_text(text)], bundle, predict=_predictor())[0]
+
+
+def _explain_cleaned(cleaned, top_k, bundle):
+    """
+    Return the decision value, class probabilities and top contributing n-grams
+    of a cleaned text with the configured scoring engine.
+
+    Args:
+        cleaned (str): A text returned by `clean_text`.
+        top_k (int): Number of n-grams to return.
+        bundle (ModelBundle): The model version to score with.
+
+    Returns:
+        tuple: (decision value, classes, probabilities, [(n-gram, contribution), ...])
+    """
+    if settings.ML_SCORING_ENGINE == "linear":
+        scorer = bundle.linear(settings.ML_SHARED_ARTIFACTS)
+        decision, top = scorer.explain(cleaned, top_k)
+        positive = 1 / (1 + math.exp(-decision))
+        return decision, scorer.classes, [1 - positive, positive], top
+
+    vectorizer, model = bundle.sklearn()
+    row = vectorizer.transform([cleaned])
+
+    # Only the non-zeros of the sparse row are visited: cost follows the text length
+    contributions = row.data * model.coef_[0][row.indices]
+    decision = float(contributions.sum()) + float(model.intercept_[0])
+    probabilities = model.predict_proba(row)[0].tolist()
+
+    grams = vectorizer.build_analyzer()(cleaned)
+    if hasattr(vectorizer, "vocabulary_"):
+        indexes = [vectorizer.vocabulary_.get(gram, -1) for gram in grams]
+    else:
+        # HashingVectorizer (ml/streaming.py): the feature index is the n-gram hash
+        indexes = HashedVocabulary(vectorizer.n_features).lookup(grams).tolist()
+    terms = {index: gram for index, gram in zip(indexes, grams) if index >= 0}
+    order = np.argsort(-np.abs(contributions), kind="stable")[:top_k]
+    top = [(terms[row.indices[i]], float(contributions[i])) for i in order]
+    return decision, [int(label) for label in model.classes_], probabilities, top
+
+
+def explain_sentiment(text, top_k=5, bundle=None):
+    """
+    Predict the sentiment of a text with its class probabilities and the n-grams
+    that contributed the most (TF-IDF weight x coefficient).
+
+    Explanations bypass the prediction cache.
+
+    Args:
+        text (str): The raw input text.
+        top_k (int): Number of n-grams to return.
+        bundle (ModelBundle): The model version to score with, defaults to
+            the one currently served.
+
+    Returns:
+        dict: prediction, probabilities (class label -> probability) and
+        top_ngrams (list of {"ngram", "contribution"}, largest |contribution| first).
+    """
+    decision, classes, probabilities, top = _explain_cleaned(clean_text(text), top_k, bundle or active_model.get())
+    return {
+        "prediction": classes[1] if decision > 0 else classes[0],
+        "probabilities": {str(label): probability for label, probability in zip(classes, probabilities)},
+        "top_ngrams": [{"ngram": gram, "contribution": contribution} for gram, contribution in top],
+    }
+
+
+def predict_sentiments(texts, bundle=None):
+    """
+    Predict the sentiment of several texts in a single vectorization pass.
+
+    Texts are cleaned first and identical cleaned texts are scored only once,
+    so the sparse matrix handed to the model holds one row per distinct text
+    that is not already in the prediction cache. With ML_SIDECAR_ENABLED,
+    that matrix is built and scored by the inference sidecar. Texts longer
+    than ML_LONG_TEXT_CHARS are scored by windows (`predict_long_document`),
+    like on the single-text endpoint.
+
+    Args:
+        texts (list[str]): The raw input texts.
+        bundle (ModelBundle): The model version to score with, defaults to
+            the one currently served.
+
+    Returns:
+        list[int]: One prediction per input text, in input order.
+    """
+    bundle = bundle or active_model.get()
+    short = [i for i, text in enumerate(texts) if len(text) <= settings.ML_LONG_TEXT_CHARS]
+    cleaned_texts = clean_texts([texts[i] for i in short])
+
+    # Map every distinct cleaned text to its row in the batch matrix
+    rows = {}
+    for cleaned in cleaned_texts:
+        rows.setdefault(cleaned, len(rows))
+
+    results = [None] * len(texts)
+    if rows:
+        predict = _predict_sidecar if settings.ML_SIDECAR_ENABLED else _predict_cleaned
+        predictions = _predict_cleaned_cached(list(rows), bundle, predict=predict)
+        for i, cleaned in zip(short, cleaned_texts):
+            results[i] = predictions[rows[cleaned]]
+    for i, text in enumerate(texts):
+        if results[i] is None:
+            results[i] = predict_long_document(text, bundle)["prediction"]
+    return results
+
+
+def _score_cleaned(cleaned_texts, bundle):
+    """
+    Return the positive class probability of already cleaned texts with the
+    configured scoring engine.
+
+    Args:
+        cleaned_texts (list[str]): Texts returned by `clean_text`.
+        bundle (ModelBundle): The model version to score with.
+
+    Returns:
+        numpy.ndarray: One probability per text, in input order.
+
+    Raises:
+        ImproperlyConfigured: If ML_SCORING_ENGINE is not a known engine.
+    """
+    engine = settings.ML_SCORING_ENGINE
+
+    if engine == "linear":
+        scorer = bundle.linear(settings.ML_SHARED_ARTIFACTS)
+        decisions = np.fromiter((scorer.decision_function(text) for text in cleaned_texts), dtype=np.float64,
+                                count=len(cleaned_texts))
+        return 1 / (1 + np.exp(-decisions))
+
+    if engine == "sklearn":
+        vectorizer, model = bundle.sklearn()
+        return model.predict_proba(vectorizer.transform(cleaned_texts))[:, 1]
+
+    raise ImproperlyConfigured(f"Unknown ML_SCORING_ENGINE '{engine}' (expected 'sklearn' or 'linear')")
+
+
+def _score_sidecar(cleaned_texts, bundle):
+    """
+    Return the positive class probability of cleaned texts, computed in the
+    inference sidecar (ml/sidecar.py), in-process when it is unavailable or
+    too slow.
+
+    Args:
+        cleaned_texts (list[str]): Texts returned by `clean_text`.
+        bundle (ModelBundle): The model version to score with.
+
+    Returns:
+        numpy.ndarray: One probability per text, in input order.
+    """
+    try:
+        return np.asarray(sidecar_client.score(cleaned_texts, bundle.version), dtype=np.float64)
+    except SidecarUnavailable:
+        return _score_cleaned(cleaned_texts, bundle)
+
+
+def score_sentiments(texts, bundle=None):
+    """
+    Compute the probability that each text is positive, in a single
+    vectorization pass.
+
+    Identical cleaned texts are scored once. Texts longer than
+    ML_LONG_TEXT_CHARS are scored by windows (`predict_long_document`), so
+    that their cost stays bounded. Scores bypass the prediction cache, which
+    only holds labels.
+
+    Args:
+        texts (list[str]): The raw input texts.
+        bundle (ModelBundle): The model version to score with, defaults to
+            the one currently served.
+
+    Returns:
+        list[float]: One probability (0 to 1) per input text, in input order.
+    """
+    bundle = bundle or active_model.get()
+    short = [i for i, text in enumerate(texts) if len(text) <= settings.ML_LONG_TEXT_CHARS]
+    cleaned_texts = clean_texts([texts[i] for i in short])
+
+    rows = {}
+    for cleaned in cleaned_texts:
+        rows.setdefault(cleaned, len(rows))
+
+    results = [None] * len(texts)
+    if rows:
+        score = _score_sidecar if settings.ML_SIDECAR_ENABLED else _score_cleaned
+        scores = score(list(rows), bundle)
+        for i, cleaned in zip(short, cleaned_texts):
+            results[i] = float(scores[rows[cleaned]])
+    for i, text in enumerate(texts):
+        if results[i] is None:
+            results[i] = predict_long_document(text, bundle)["score"]
+    return results
+
+
+# Windows scored in one vectorization pass by `predict_long_document`
+_WINDOW_BATCH_SIZE = 64
+
+
+def _iter_windows(tokens, size, overlap):
+    """
+    Group a stream of words into windows of `size` words, consecutive windows
+    sharing `overlap` words.
+
+    The last window is only yielded when it holds words no previous window
+    covered. A text shorter than `size` words is one window.
+
+    Yields:
+        list[str]: The words of each window.
+    """
+    window, fresh = [], 0
+    for token in tokens:
+        window.append(token)
+        fresh += 1
+        if len(window) == size:
+            yield window
+            window, fresh = window[size - overlap:], 0
+    if fresh:
+        yield window
+
+
+def predict_long_document(text, bundle=None, with_windows=False):
+    """
+    Predict the sentiment of a long text from overlapping windows of words.
+
+    The text is cleaned as a stream of words (`iter_clean_tokens`) and cut
+    into windows of ML_WINDOW_TOKENS words overlapping by ML_WINDOW_OVERLAP,
+    so that the n-grams across window boundaries are kept. Windows are scored
+    in batches; the document score is the mean of the window probabilities,
+    weighted by their number of words. Memory and per-window cost are bounded
+    whatever the text length, the total cost grows linearly with it.
+
+    Args:
+        text (str): The raw input text.
+        bundle (ModelBundle): The model version to score with, defaults to
+            the one currently served.
+        with_windows (bool): Also return the probability of every window.
+
+    Returns:
+        dict: prediction (0 or 1), score (probability of being positive),
+        number of windows and, with `with_windows`, window_scores.
+
+    Raises:
+        ImproperlyConfigured: If ML_WINDOW_OVERLAP is not smaller than ML_WINDOW_TOKENS.
+    """
+    size, overlap = settings.ML_WINDOW_TOKENS, settings.ML_WINDOW_OVERLAP
+    if not 0 <= overlap < size:
+        raise ImproperlyConfigured("ML_WINDOW_OVERLAP must be between 0 and ML_WINDOW_TOKENS - 1")
+    bundle = bundle or active_model.get()
+    score = _score_sidecar if settings.ML_SIDECAR_ENABLED else _score_cleaned
+
+    scores, weights, batch = [], [], []
+    for window in _iter_windows(iter_clean_tokens(text), size, overlap):
+        batch.append(" ".join(window))
+        weights.append(len(window))
+        if len(batch) >= _WINDOW_BATCH_SIZE:
+            scores.extend(score(batch, bundle).tolist())
+            batch = []
+    if batch or not weights:
+        # An empty cleaned text is scored like the short-text path does
+        scores.extend(score(batch or [""], bundle).tolist())
+        weights = weights or [1]
+
+    score = float(np.average(scores, weights=weights))
+    result = {"prediction": int(score > 0.5), "score": score, "windows": len(scores)}
+    if with_windows:
+        result["window_scores"] = scores
+    return result
+
+
+@lru_cache(maxsize=None)
+def get_scoring_executor():
+    """
+    Return the bounded thread pool used to score texts from async views.
+
+    Returns:
+        ThreadPoolExecutor: At most ML_ASYNC_MAX_WORKERS scoring threads.
+    """
+    return ThreadPoolExecutor(max_workers=settings.ML_ASYNC_MAX_WORKERS, thread_name_prefix="ml-scoring")
+
+
+async def apredict_sentiment(text, bundle=None):
+    """
+    Async variant of `predict_sentiment`.
+
+    The CPU-bound cleaning and scoring run in the bounded scoring executor,
+    so the event loop keeps serving other (possibly slow) clients meanwhile.
+
+    Args:
+        text (str): The raw input text.
+        bundle (ModelBundle): The model version to score with, defaults to
+            the one currently served.
+
+    Returns:
+        int: 0 for negative, 1 for positive.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_scoring_executor(), predict_sentiment, text, bundle)
+
+
+async def apredict_long_document(text, bundle=None, with_windows=False):
+    """
+    Async variant of `predict_long_document`, run in the bounded scoring executor.
+
+    Args:
+        text (str): The raw input text.
+        bundle (ModelBundle): The model version to score with, defaults to
+            the one currently served.
+        with_windows (bool): Also return the probability of every window.
+
+    Returns:
+        dict: See `predict_long_document`.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_scoring_executor(), predict_long_document, text, bundle, with_windows)
+
+
+async def aexplain_sentiment(text, top_k=5, bundle=None):
+    """
+    Async variant of `explain_sentiment`, run in the bounded scoring executor.
+
+    Args:
+        text (str): The raw input text.
+        top_k (int): Number of n-grams to return.
+        bundle (ModelBundle): The model version to score with, defaults to
+            the one currently served.
+
+    Returns:
+        dict: See `explain_sentiment`.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_scoring_executor(), explain_sentiment, text, top_k, bundle)
@@ -0,0 +1,271 @@
+"""
+Inference sidecar: one process scoring for every web worker over a Unix socket.
+
+By default each gunicorn worker loads its own vectorizer and model and scores
+in the request thread. With ML_SIDECAR_ENABLED, the workers send their cleaned
+texts to a single long-lived process (`manage.py ml_sidecar`) listening on
+ML_SIDECAR_SOCKET instead:
+    - only the sidecar holds the artifacts, the workers do not load them
+      (except to explain a prediction, see below, or on a fallback)
+    - requests of all the workers are scored together: every connection
+      submits its texts to the coalescer of the sidecar (ml/coalescer.py,
+      ML_COALESCE_WINDOW_MS / ML_COALESCE_MAX_BATCH), which batches them
+
+Messages are length-prefixed JSON in both directions:
+    request:  {"version": "<model version>", "texts": ["cleaned text", ...]}
+              with "scores": true for probabilities instead of labels
+    response: {"version": "<model version>", "predictions": [1, 0, ...]}
+              or {"version": ..., "scores": [0.93, 0.12, ...]}
+              or {"version": ..., "error": "..."}
+
+Labels are batched by the coalescer; probabilities (article scores, long
+documents scored by windows) are computed per request. Explained predictions
+("explain": true) need the contribution of every n-gram and are the one path
+still scored in the worker: its first explanation loads the artifacts there.
+
+A worker keeps one connection per thread. When the sidecar is not running,
+does not answer within ML_SIDECAR_TIMEOUT_MS or serves another model version
+(during a hot reload), `SidecarUnavailable` is raised and ml.services scores
+the texts in-process: a slow or dead sidecar never fails a request.
+"""
+
+import json
+import logging
+import os
+import socket
+import socketserver
+import struct
+import threading
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Big-endian unsigned length of the JSON message that follows
+_HEADER = struct.Struct(">I")
+
+# Largest message accepted, request or response
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+
+
+class SidecarUnavailable(Exception):
+    """Raised when the sidecar cannot score a request; callers score in-process."""
+
+
+def _send(sock, data):
+    payload = json.dumps(data).encode()
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def _recv_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Connection closed by the peer")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _recv(sock):
+    """Return the next message of a connection, None when it is closed cleanly."""
+    header = sock.recv(_HEADER.size, socket.MSG_WAITALL)
+    if not header:
+        return None
+    if len(header) < _HEADER.size:
+        header += _recv_exactly(sock, _HEADER.size - len(header))
+    (size,) = _HEADER.unpack(header)
+    if size > MAX_MESSAGE_BYTES:
+        raise ValueError(f"Message of {size} bytes exceeds {MAX_MESSAGE_BYTES}")
+    return json.loads(_recv_exactly(sock, size))
+
+
+class SidecarClient:
+    """
+    Connections of the current process to the sidecar, one per thread.
+
+    The socket path and the timeout are read from the settings on each call.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.texts = 0
+        self.fallbacks = 0
+
+    def _connection(self):
+        sock = getattr(self._local, "sock", None)
+        # Connections inherited through a fork belong to the parent
+        if sock is not None and self._local.pid == os.getpid():
+            return sock
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(settings.ML_SIDECAR_TIMEOUT_MS / 1000)
+        try:
+            sock.connect(settings.ML_SIDECAR_SOCKET)
+        except OSError:
+            sock.close()
+            raise
+        self._local.sock, self._local.pid = sock, os.getpid()
+        return sock
+
+    def _disconnect(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None and self._local.pid == os.getpid():
+            sock.close()
+        self._local.sock = None
+
+    def predict(self, cleaned_texts, version):
+        """
+        Score cleaned texts in the sidecar.
+
+        Args:
+            cleaned_texts (list[str]): Texts returned by `clean_text`.
+            version (str): Model version the caller expects.
+
+        Returns:
+            list[int]: One prediction per text, in input order.
+
+        Raises:
+            SidecarUnavailable: If the sidecar is not reachable, times out,
+                fails or serves another model version.
+        """
+        return self._call({"version": version, "texts": cleaned_texts}, "predictions")
+
+    def score(self, cleaned_texts, version):
+        """
+        Return the positive class probability of cleaned texts, computed in the sidecar.
+
+        Args:
+            cleaned_texts (list[str]): Texts returned by `clean_text`.
+            version (str): Model version the caller expects.
+
+        Returns:
+            list[float]: One probability per text, in input order.
+
+        Raises:
+            SidecarUnavailable: Same cases as `predict`.
+        """
+        return self._call({"version": version, "texts": cleaned_texts, "scores": True}, "scores")
+
+    def _call(self, request, field):
+        version, cleaned_texts = request["version"], request["texts"]
+        try:
+            sock = self._connection()
+            _send(sock, request)
+            response = _recv(sock)
+            if response is None:
+                raise ConnectionError("Connection closed by the sidecar")
+        except (OSError, ValueError) as e:
+            # A timed out connection may still receive the late answer: drop it
+            self._disconnect()
+            self._fallback()
+            raise SidecarUnavailable(str(e)) from e
+
+        if "error" in response or response.get("version") != version:
+            self._fallback()
+            raise SidecarUnavailable(response.get("error") or f"Sidecar serves version {response.get('version')}")
+        with self._lock:
+            self.requests += 1
+            self.texts += len(cleaned_texts)
+        return response[field]
+
+    def _fallback(self):
+        with self._lock:
+            self.fallbacks += 1
+
+    def stats(self):
+        """
+        Return the sidecar counters of this process.
+
+        Returns:
+            dict: Whether the sidecar is enabled, its socket, requests and texts
+            scored by it, and requests scored in-process instead.
+        """
+        with self._lock:
+            return {
+                "enabled": settings.ML_SIDECAR_ENABLED,
+                "socket": settings.ML_SIDECAR_SOCKET,
+                "requests": self.requests,
+                "texts": self.texts,
+                "fallbacks": self.fallbacks,
+            }
+
+    def reset(self):
+        """Close the connection of this thread and reset the counters (tests)."""
+        self._disconnect()
+        with self._lock:
+            self.requests = self.texts = self.fallbacks = 0
+
+
+sidecar_client = SidecarClient()
+
+
+class _SidecarHandler(socketserver.BaseRequestHandler):
+    """Serve the requests of one worker connection until it closes."""
+
+    def handle(self):
+        from .services import _predict_coalesced, _score_cleaned
+
+        while True:
+            try:
+                request = _recv(self.request)
+            except (OSError, ValueError):
+                return
+            if request is None:
+                return
+
+            bundle = self.server.model.get()
+            if request.get("version") != bundle.version:
+                response = {"version": bundle.version, "error": "Model version mismatch"}
+            else:
+                try:
+                    if request.get("scores"):
+                        response = {
+                            "version": bundle.version,
+                            "scores": _score_cleaned(request["texts"], bundle).tolist(),
+                        }
+                    else:
+                        response = {
+                            "version": bundle.version,
+                            "predictions": _predict_coalesced(request["texts"], bundle),
+                        }
+                except Exception as e:
+                    logger.exception("Sidecar scoring failed")
+                    response = {"version": bundle.version, "error": str(e)}
+            try:
+                _send(self.request, response)
+            except OSError:
+                return
+
+
+class SidecarServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Unix socket server scoring the texts of every connected worker.
+
+    One thread per connection; their texts are batched by the process-wide
+    coalescer (ml.services.get_coalescer).
+
+    Args:
+        path (str): Socket path. A stale socket file left by a previous run is
+            replaced.
+        model (ActiveModel): Source of the served bundle, defaults to the
+            process-wide `active_model`.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path, model=None):
+        from .registry import active_model
+
+        if os.path.exists(path):
+            os.unlink(path)
+        self.model = model or active_model
+        super().__init__(path, _SidecarHandler)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
@@ -0,0 +1,168 @@
+"""
+Out-of-core training of the sentiment model (train_model.py --streaming).
+
+The in-memory pipeline holds the whole corpus and its TF-IDF matrix, which
+caps the dataset size. The streaming trainer never does:
+    1. the CSV is read row by row (csv module, no DataFrame), each chunk of
+       rows is cleaned and appended to a spool file of "label<TAB>cleaned
+       text" lines (see `spool_csv`)
+    2. every epoch visits the spooled chunks in a random order, mixing a few
+       of them at a time into a shuffled batch
+    3. each batch is vectorized with a stateless HashingVectorizer and fed to
+       an SGD logistic regression through `partial_fit`
+
+Peak memory is bounded by the batch (chunk_size x mix rows) and by the
+n_features coefficients, whatever the number of rows. The hashing vectorizer
+has no vocabulary to store: the saved pickles (and the linear artifact, see
+ml.linear.HashedVocabulary) are served by ml.services like the TF-IDF ones.
+"""
+
+import csv
+import os
+import time
+
+import numpy as np
+
+from utils import clean_texts
+
+
+# One row in HOLDOUT_EVERY is kept out of training to evaluate the model
+HOLDOUT_EVERY = 10
+
+
+def _read_csv_chunks(csv_path, chunk_size):
+    """Yield lists of (comment, label) of at most `chunk_size` complete rows."""
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        rows = []
+        for row in csv.DictReader(f):
+            comment, label = row.get("comment"), row.get("label")
+            if comment and label:
+                rows.append((comment, int(float(label))))
+            if len(rows) >= chunk_size:
+                yield rows
+                rows = []
+        if rows:
+            yield rows
+
+
+def spool_csv(csv_path, spool_path, chunk_size=50000):
+    """
+    Clean a labelled CSV chunk by chunk into a spool file.
+
+    Rows with no comment or no label are skipped, like the `dropna` of the
+    in-memory pipeline.
+
+    Args:
+        csv_path (str): CSV with "comment" and "label" columns.
+        spool_path (str): Output file, one "label<TAB>cleaned text" line per row.
+        chunk_size (int): Rows read from the CSV at a time.
+
+    Returns:
+        list[tuple[int, int, int]]: (byte offset, byte length, first row number)
+        of every spooled chunk.
+    """
+    chunks = []
+    rows = 0
+    with open(spool_path, "wb") as spool:
+        for chunk in _read_csv_chunks(csv_path, chunk_size):
+            texts = clean_texts([comment for comment, _ in chunk])
+            data = "".join(f"{label}\t{text}\n" for (_, label), text in zip(chunk, texts)).encode("utf-8")
+            chunks.append((spool.tell(), len(data), rows))
+            spool.write(data)
+            rows += len(texts)
+    return chunks
+
+
+def read_chunk(spool, chunk):
+    """
+    Read one spooled chunk.
+
+    Args:
+        spool (file): The spool file, opened in binary mode.
+        chunk (tuple): An entry returned by `spool_csv`.
+
+    Returns:
+        tuple[list[str], numpy.ndarray, numpy.ndarray]: cleaned texts, labels and
+        whether each row belongs to the holdout set.
+    """
+    offset, length, first_row = chunk
+    spool.seek(offset)
+    lines = spool.read(length).decode("utf-8").splitlines()
+    labels = np.fromiter((int(line.partition("\t")[0]) for line in lines), dtype=np.int8, count=len(lines))
+    texts = [line.partition("\t")[2] for line in lines]
+    holdout = (np.arange(first_row, first_row + len(lines)) % HOLDOUT_EVERY) == 0
+    return texts, labels, holdout
+
+
+def train_streaming(csv_path, work_dir, chunk_size=50000, mix=4, epochs=3, n_features=2 ** 20,
+                    ngram_range=(1, 2), alpha=1e-6, seed=42, log=print):
+    """
+    Train a hashing vectorizer + SGD logistic regression without loading the corpus.
+
+    Args:
+        csv_path (str): CSV with "comment" and "label" columns.
+        work_dir (str): Directory of the spool file.
+        chunk_size (int): Rows read, cleaned and spooled at a time.
+        mix (int): Spooled chunks shuffled together into one training batch.
+        epochs (int): Passes over the training rows.
+        n_features (int): Hashing space size (number of coefficients).
+        ngram_range (tuple[int, int]): Word n-grams hashed.
+        alpha (float): L2 regularization of the SGD classifier.
+        seed (int): Seed of the chunk order and of the shuffles.
+        log (callable): Progress output.
+
+    Returns:
+        tuple: (vectorizer, model, metrics) where metrics holds the holdout
+        accuracy, the number of training/holdout rows and the stage timings.
+    """
+    from sklearn.feature_extraction.text import HashingVectorizer
+    from sklearn.linear_model import SGDClassifier
+
+    os.makedirs(work_dir, exist_ok=True)
+    spool_path = os.path.join(work_dir, "streaming_spool.tsv")
+    timings = {}
+
+    started = time.perf_counter()
+    chunks = spool_csv(csv_path, spool_path, chunk_size)
+    timings["spool"] = time.perf_counter() - started
+
+    vectorizer = HashingVectorizer(n_features=n_features, ngram_range=tuple(ngram_range), alternate_sign=False)
+    model = SGDClassifier(loss="log_loss", alpha=alpha, random_state=seed)
+    rng = np.random.default_rng(seed)
+    counts = {"train_rows": 0, "holdout_rows": 0}
+
+    started = time.perf_counter()
+    with open(spool_path, "rb") as spool:
+        for epoch in range(epochs):
+            order = rng.permutation(len(chunks))
+            for start in range(0, len(order), mix):
+                texts, labels = [], []
+                for i in order[start:start + mix]:
+                    chunk_texts, chunk_labels, holdout = read_chunk(spool, chunks[i])
+                    texts.extend(text for text, held in zip(chunk_texts, holdout) if not held)
+                    labels.append(chunk_labels[~holdout])
+                if not texts:
+                    continue
+                labels = np.concatenate(labels)
+                shuffle = rng.permutation(len(texts))
+                model.partial_fit(
+                    vectorizer.transform([texts[i] for i in shuffle]), labels[shuffle], classes=[0, 1],
+                )
+                if epoch == 0:
+                    counts["train_rows"] += len(texts)
+            log(f"   epoch {epoch + 1}/{epochs} done")
+        timings["train"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        correct = 0
+        for chunk in chunks:
+            texts, labels, holdout = read_chunk(spool, chunk)
+            held_texts = [text for text, held in zip(texts, holdout) if held]
+            if held_texts:
+                correct += int((model.predict(vectorizer.transform(held_texts)) == labels[holdout]).sum())
+                counts["holdout_rows"] += len(held_texts)
+        timings["evaluate"] = time.perf_counter() - started
+
+    os.remove(spool_path)
+    accuracy = correct / counts["holdout_rows"] if counts["holdout_rows"] else None
+    return vectorizer, model, {"accuracy": accuracy, **counts, "timings": timings}
@@ -0,0 +1,214 @@
+"""
+Model selection sweep over vectorizer and classifier settings (train_model.py --sweep).
+
+Every configuration of the grid is trained on the same split and measured on
+what matters in production as well as on quality:
+    - accuracy and ROC-AUC on the test set
+    - size on disk of the pickles and of the fused linear artifact
+    - memory allocated by loading the pickles
+    - p50/p99 latency of one single-text prediction, for both scoring engines
+
+Configurations that no other one beats on every axis at once (accuracy,
+p99 latency, artifact size, loaded memory) are flagged as Pareto-optimal in
+the JSON report.
+"""
+
+import itertools
+import json
+import os
+import pickle
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from .linear import LinearSentimentScorer, export_linear_model
+
+
+DEFAULT_GRID = {
+    "max_features": [5000, 20000, 50000],
+    "ngram_range": [[1, 1], [1, 2]],
+    "min_df": [5],
+    "C": [1.0],
+}
+
+# Vectorizer options of a configuration, the other keys go to the classifier
+VECTORIZER_KEYS = ("max_features", "ngram_range", "min_df", "max_df")
+
+
+def expand_grid(grid):
+    """
+    Return every configuration of a grid, vectorizer settings varying slowest.
+
+    Args:
+        grid (dict[str, list]): Values to try for each setting.
+
+    Returns:
+        list[dict]: One dict per combination.
+    """
+    keys = sorted(grid, key=lambda key: (key not in VECTORIZER_KEYS, key))
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+
+
+def percentile(values, p):
+    """Return the `p` percentile (0-100) of `values`, in milliseconds rounded to the µs."""
+    return round(float(np.percentile(values, p)) * 1000, 3)
+
+
+def _latencies(predict, texts):
+    for text in texts[:10]:
+        predict(text)  # warm-up, out of the measure
+    timings = []
+    for text in texts:
+        started = time.perf_counter()
+        predict(text)
+        timings.append(time.perf_counter() - started)
+    return {"p50_ms": percentile(timings, 50), "p99_ms": percentile(timings, 99)}
+
+
+def _directory_size(directory):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(directory) for name in names)
+
+
+def _loaded_memory(vectorizer_path, model_path):
+    """Bytes still allocated after unpickling the vectorizer and the model."""
+    tracemalloc.start()
+    with open(vectorizer_path, "rb") as f:
+        vectorizer = pickle.load(f)
+    with open(model_path, "rb") as f:
+        model = pickle.load(f)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del vectorizer, model
+    return current
+
+
+def evaluate(vectorizer, model, X_test_vect, y_test, latency_texts):
+    """
+    Measure a fitted vectorizer + classifier.
+
+    Args:
+        vectorizer (TfidfVectorizer): The fitted vectorizer.
+        model (LogisticRegression): The fitted classifier.
+        X_test_vect (scipy.sparse.csr_matrix): The vectorized test set.
+        y_test (array-like): The test labels.
+        latency_texts (list[str]): Cleaned texts predicted one at a time.
+
+    Returns:
+        dict: Quality, size, memory and latency metrics.
+    """
+    from sklearn.metrics import accuracy_score, roc_auc_score
+
+    metrics = {
+        "accuracy": round(float(accuracy_score(y_test, model.predict(X_test_vect))), 4),
+        "roc_auc": round(float(roc_auc_score(y_test, model.decision_function(X_test_vect))), 4),
+        "features": len(vectorizer.vocabulary_),
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        vectorizer_path = os.path.join(directory, "vectorizer.pkl")
+        model_path = os.path.join(directory, "model.pkl")
+        with open(vectorizer_path, "wb") as f:
+            pickle.dump(vectorizer, f)
+        with open(model_path, "wb") as f:
+            pickle.dump(model, f)
+        linear_dir = os.path.join(directory, "linear")
+        export_linear_model(vectorizer, model, linear_dir)
+
+        metrics["pickle_bytes"] = os.path.getsize(vectorizer_path) + os.path.getsize(model_path)
+        metrics["linear_bytes"] = _directory_size(linear_dir)
+        metrics["loaded_memory_bytes"] = _loaded_memory(vectorizer_path, model_path)
+        scorer = LinearSentimentScorer.load(linear_dir)
+
+    metrics["sklearn_latency"] = _latencies(lambda text: model.predict(vectorizer.transform([text])), latency_texts)
+    metrics["linear_latency"] = _latencies(scorer.predict, latency_texts)
+    return metrics
+
+
+def pareto_front(results):
+    """
+    Return the indexes of the results no other result dominates.
+
+    A result dominates another when it is at least as good on accuracy,
+    sklearn p99 latency, pickle size and loaded memory, and strictly better
+    on one of them.
+    """
+    def axes(result):
+        metrics = result["metrics"]
+        return (
+            -metrics["accuracy"],
+            metrics["sklearn_latency"]["p99_ms"],
+            metrics["pickle_bytes"],
+            metrics["loaded_memory_bytes"],
+        )
+
+    points = [axes(result) for result in results]
+    return [
+        i for i, point in enumerate(points)
+        if not any(
+            all(a <= b for a, b in zip(other, point)) and other != point
+            for other in points
+        )
+    ]
+
+
+def run_sweep(X_train, X_test, y_train, y_test, grid=None, latency_samples=500, log=print):
+    """
+    Train and measure every configuration of `grid`.
+
+    The vectorizer is fitted once per distinct vectorizer setting and shared
+    by the classifier settings that follow it.
+
+    Args:
+        X_train, X_test (list[str]): Cleaned texts.
+        y_train, y_test (array-like): Labels.
+        grid (dict[str, list]): Settings to try, `DEFAULT_GRID` by default.
+        latency_samples (int): Test texts timed one by one for the latency.
+        log (callable): Progress output.
+
+    Returns:
+        list[dict]: One {"config", "metrics", "pareto"} entry per configuration.
+    """
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+
+    latency_texts = list(X_test[:latency_samples])
+    results = []
+    fitted = None
+
+    for config in expand_grid(grid or DEFAULT_GRID):
+        vectorizer_config = {key: config[key] for key in VECTORIZER_KEYS if key in config}
+        if fitted is None or fitted[0] != vectorizer_config:
+            started = time.perf_counter()
+            options = dict(vectorizer_config)
+            if "ngram_range" in options:
+                options["ngram_range"] = tuple(options["ngram_range"])
+            vectorizer = TfidfVectorizer(**options)
+            X_train_vect = vectorizer.fit_transform(X_train)
+            X_test_vect = vectorizer.transform(X_test)
+            fitted = (vectorizer_config, vectorizer, X_train_vect, X_test_vect, time.perf_counter() - started)
+        _, vectorizer, X_train_vect, X_test_vect, vectorize_seconds = fitted
+
+        classifier_config = {key: value for key, value in config.items() if key not in VECTORIZER_KEYS}
+        started = time.perf_counter()
+        model = LogisticRegression(max_iter=50000, solver="saga", **classifier_config)
+        model.fit(X_train_vect, y_train)
+        train_seconds = time.perf_counter() - started
+
+        metrics = evaluate(vectorizer, model, X_test_vect, y_test, latency_texts)
+        metrics["vectorize_seconds"] = round(vectorize_seconds, 3)
+        metrics["train_seconds"] = round(train_seconds, 3)
+        results.append({"config": config, "metrics": metrics, "pareto": False})
+        log(f"   {json.dumps(config)}: accuracy {metrics['accuracy']}, "
+            f"p99 {metrics['sklearn_latency']['p99_ms']} ms, {metrics['pickle_bytes'] / 1024:.0f} KiB")
+
+    for i in pareto_front(results):
+        results[i]["pareto"] = True
+    return results
+
+
+def write_report(path, results, **context):
+    """Write the sweep results and their context (dataset checksum, sizes...) as JSON."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({**context, "results": results}, f, indent=2)
@@ -0,0 +1,27 @@
+import pytest
+from rest_framework.test import APIClient
+
+
+@pytest.fixture
+def api_client():
+    """Return an unauthenticated API client."""
+    return APIClient()
+
+
+@pytest.fixture(autouse=True)
+def empty_prediction_cache():
+    """Start every test with an empty prediction cache and fresh counters."""
+    from ml.cache import prediction_cache
+
+    prediction_cache.clear()
+    yield
+    prediction_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def fresh_ml_budget():
+    """Start every test with the full ML throttle budget (THROTTLE_ML)."""
+    from django.core.cache import cache
+
+    cache.clear()
+    yield
@@ -0,0 +1,317 @@
+import json
+
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+
+# ============================
+# SINGLE PREDICTION
+# ============================
+
+def test_sentiment_analysis_returns_prediction(api_client):
+    """A valid text is scored and the prediction is 0 or 1."""
+    url = reverse("sentiment-analysis")
+    response = api_client.post(url, {"text": "Super article, j'adore !"}, format="json")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["prediction"] in (0, 1)
+
+
+def test_sentiment_analysis_rejects_empty_text(api_client):
+    """An empty text returns a 400 error."""
+    url = reverse("sentiment-analysis")
+    response = api_client.post(url, {"text": ""}, format="json")
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_sentiment_analysis_only_accepts_post(api_client):
+    """GET requests are not allowed on the prediction endpoint."""
+    url = reverse("sentiment-analysis")
+    response = api_client.get(url)
+
+    assert response.status_code == status.HTTP_405_METHOD_NOT_ALLOWED
+
+
+# ============================
+# BATCH PREDICTION
+# ============================
+
+def test_batch_matches_single_predictions(api_client, settings):
+    """Batch predictions are returned in input order and match the single endpoint, long texts included."""
+    settings.ML_LONG_TEXT_CHARS = 500
+    # Scored by windows (1), a single pass over the whole text would predict 0
+    long_text = "Super article, j'adore ! " * 49 + "Nul, une perte de temps, horrible. " * 22
+    texts = ["Super article, j'adore !", "Nul, une perte de temps.", "Super article, j'adore !", long_text]
+
+    url = reverse("sentiment-analysis-batch")
+    response = api_client.post(url, {"texts": texts}, format="json")
+
+    assert response.status_code == status.HTTP_200_OK
+    single_url = reverse("sentiment-analysis")
+    expected = [
+        {"prediction": api_client.post(single_url, {"text": text}, format="json").json()["prediction"]}
+        for text in texts
+    ]
+    assert response.json()["results"] == expected
+
+
+def test_batch_reports_per_item_errors(api_client):
+    """Invalid items get their own error entry without failing the whole batch."""
+    url = reverse("sentiment-analysis-batch")
+    response = api_client.post(url, {"texts": ["Très bien", "", 42]}, format="json")
+
+    assert response.status_code == status.HTTP_200_OK
+    results = response.json()["results"]
+    assert "prediction" in results[0]
+    assert "error" in results[1]
+    assert "error" in results[2]
+
+
+def test_batch_requires_texts_list(api_client):
+    """A missing or non-list 'texts' field returns a 400 error."""
+    url = reverse("sentiment-analysis-batch")
+
+    assert api_client.post(url, {}, format="json").status_code == status.HTTP_400_BAD_REQUEST
+    assert api_client.post(url, {"texts": "abc"}, format="json").status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_batch_enforces_max_size(api_client, settings):
+    """Batches larger than ML_BATCH_MAX_SIZE are rejected."""
+    settings.ML_BATCH_MAX_SIZE = 2
+    url = reverse("sentiment-analysis-batch")
+    response = api_client.post(url, {"texts": ["a", "b", "c"]}, format="json")
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+# ============================
+# STREAMING PREDICTION
+# ============================
+
+def post_ndjson(api_client, body):
+    """POST an NDJSON body to the streaming endpoint and return the response."""
+    url = reverse("sentiment-analysis-stream")
+    return api_client.generic("POST", url, body, content_type="application/x-ndjson")
+
+
+def read_ndjson(response):
+    return [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+
+
+def test_stream_matches_batch_predictions(api_client):
+    """Streamed results are in input order, keep their id and match the batch endpoint."""
+    texts = ["Super article, j'adore !", "Nul, une perte de temps.", "Super article, j'adore !"]
+    body = "".join(json.dumps({"id": i, "text": text}) + "\n" for i, text in enumerate(texts))
+    response = post_ndjson(api_client, body)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response["Content-Type"] == "application/x-ndjson"
+    batch = api_client.post(reverse("sentiment-analysis-batch"), {"texts": texts}, format="json").json()
+    assert read_ndjson(response) == [dict(result, id=i) for i, result in enumerate(batch["results"])]
+
+
+def test_stream_reports_per_line_errors(api_client, settings):
+    """Invalid lines get an error result, blank lines are ignored and long lines are rejected."""
+    settings.ML_STREAM_MAX_LINE_BYTES = 64
+    body = '"Super"\n\nnot json\n{"text": ""}\n"' + "a" * 100 + '"\n"Nul"'
+    results = read_ndjson(post_ndjson(api_client, body))
+
+    assert [list(result) for result in results] == [["prediction"], ["error"], ["error"], ["error"], ["prediction"]]
+
+
+def test_stream_scores_by_chunks(api_client, settings):
+    """The response is produced one chunk of ML_STREAM_CHUNK_SIZE texts at a time."""
+    settings.ML_STREAM_CHUNK_SIZE = 2
+    response = post_ndjson(api_client, '"un"\n"deux"\n"trois"\n"quatre"\n"cinq"\n')
+
+    chunks = list(response.streaming_content)
+    assert [chunk.count(b"\n") for chunk in chunks] == [2, 2, 1]
+
+
+def test_stream_accepts_payloads_above_the_upload_limit(api_client, settings):
+    """The body is never loaded at once, so DATA_UPLOAD_MAX_MEMORY_SIZE does not apply."""
+    settings.DATA_UPLOAD_MAX_MEMORY_SIZE = 1024
+    response = post_ndjson(api_client, '"Super article, j\'adore !"\n' * 200)
+
+    assert len(read_ndjson(response)) == 200
+
+
+# ============================
+# ASYNC PREDICTION (ASGI)
+# ============================
+
+def test_async_view_matches_sync_view(api_client):
+    """The async variant returns the same prediction as the sync view."""
+    text = "Nul, une perte de temps."
+    expected = api_client.post(reverse("sentiment-analysis"), {"text": text}, format="json").json()
+    response = api_client.post(reverse("sentiment-analysis-async"), {"text": text}, format="json")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == expected
+
+
+def test_async_view_explains(api_client):
+    """The async variant honours 'explain' and validates top_k like the sync view."""
+    body = {"text": "Super article, vraiment très bien écrit", "explain": True, "top_k": 3}
+    expected = api_client.post(reverse("sentiment-analysis"), body, format="json").json()
+    response = api_client.post(reverse("sentiment-analysis-async"), body, format="json")
+    invalid = api_client.post(reverse("sentiment-analysis-async"), {**body, "top_k": 0}, format="json")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == expected
+    assert invalid.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_async_view_through_asgi_client():
+    """The async view is served natively by Django's async request handler."""
+    from asgiref.sync import async_to_sync
+    from django.test import AsyncClient
+
+    async def post():
+        return await AsyncClient().post(
+            reverse("sentiment-analysis-async"), {"text": ""}, content_type="application/json"
+        )
+
+    response = async_to_sync(post)()
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_asgi_application_loads():
+    """The ASGI entry point points at real settings and exposes an application."""
+    from weeb_api.asgi import application
+
+    assert callable(application)
+
+
+# ============================
+# EXPLAINED PREDICTION
+# ============================
+
+@pytest.mark.parametrize("engine", ["sklearn", "linear"])
+def test_explain_returns_probabilities_and_top_ngrams(api_client, settings, engine):
+    """With 'explain', the response carries probabilities and the top contributing n-grams."""
+    settings.ML_SCORING_ENGINE = engine
+    url = reverse("sentiment-analysis")
+    text = "Super article, vraiment très bien écrit mais un peu long"
+    plain = api_client.post(url, {"text": text}, format="json").json()
+    response = api_client.post(url, {"text": text, "explain": True, "top_k": 3}, format="json")
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["prediction"] == plain["prediction"]
+    assert sum(data["probabilities"].values()) == pytest.approx(1)
+    assert (data["probabilities"]["1"] > 0.5) == (data["prediction"] == 1)
+    assert len(data["top_ngrams"]) == 3
+    magnitudes = [abs(item["contribution"]) for item in data["top_ngrams"]]
+    assert magnitudes == sorted(magnitudes, reverse=True)
+
+
+def test_explain_engines_agree(api_client, settings):
+    """Both scoring engines explain a text identically."""
+    url = reverse("sentiment-analysis")
+    body = {"text": "Nul, une perte de temps, pas content du tout", "explain": True, "top_k": 10}
+
+    settings.ML_SCORING_ENGINE = "sklearn"
+    sklearn_data = api_client.post(url, body, format="json").json()
+    settings.ML_SCORING_ENGINE = "linear"
+    linear_data = api_client.post(url, body, format="json").json()
+
+    assert [item["ngram"] for item in sklearn_data["top_ngrams"]] == [item["ngram"] for item in linear_data["top_ngrams"]]
+    assert linear_data["probabilities"]["1"] == pytest.approx(sklearn_data["probabilities"]["1"])
+
+
+@pytest.mark.parametrize("top_k", [0, 51, True, 2.0, "3"])
+@pytest.mark.parametrize("url_name", ["sentiment-analysis", "sentiment-analysis-async"])
+def test_explain_rejects_invalid_top_k(api_client, url_name, top_k):
+    """A top_k that is not an integer between 1 and 50 (booleans included) returns a 400 error."""
+    url = reverse(url_name)
+    response = api_client.post(url, {"text": "Super", "explain": True, "top_k": top_k}, format="json")
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+# ============================
+# LONG DOCUMENTS
+# ============================
+
+@pytest.fixture
+def small_windows(settings):
+    """Make a few sentences a long text, scored by windows of 8 words overlapping by 2."""
+    settings.ML_LONG_TEXT_CHARS = 100
+    settings.ML_WINDOW_TOKENS = 8
+    settings.ML_WINDOW_OVERLAP = 2
+
+
+LONG_TEXT = " ".join(["Super article, j'adore, je recommande à tout le monde !"] * 5 + ["Nul, une perte de temps."] * 2)
+
+
+def test_windows_cover_every_word_with_overlap():
+    """Consecutive windows share `overlap` words and no trailing window repeats covered words."""
+    from ml.services import _iter_windows
+
+    words = [str(i) for i in range(20)]
+    windows = list(_iter_windows(iter(words), 8, 2))
+
+    assert windows == [words[0:8], words[6:14], words[12:20]]
+    assert list(_iter_windows(iter(words[:14]), 8, 2)) == [words[0:8], words[6:14]]
+    assert list(_iter_windows(iter(words[:3]), 8, 2)) == [words[0:3]]
+
+
+def test_short_document_is_one_window(settings):
+    """A text shorter than a window gets the probability of the one-piece path."""
+    from ml.services import predict_long_document, score_sentiments
+
+    result = predict_long_document("Super article, j'adore !")
+
+    assert result["windows"] == 1
+    assert result["score"] == pytest.approx(score_sentiments(["Super article, j'adore !"])[0])
+
+
+@pytest.mark.usefixtures("small_windows")
+def test_long_text_is_scored_by_windows(api_client):
+    """Long texts get a document score aggregated from their window scores."""
+    url = reverse("sentiment-analysis")
+    response = api_client.post(url, {"text": LONG_TEXT, "windows": True}, format="json")
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["windows"] == len(data["window_scores"]) > 1
+    assert min(data["window_scores"]) <= data["score"] <= max(data["window_scores"])
+    assert data["prediction"] == int(data["score"] > 0.5)
+    assert "X-Model-Version" in response
+
+    without_windows = api_client.post(url, {"text": LONG_TEXT}, format="json").json()
+    assert "window_scores" not in without_windows
+    assert without_windows["score"] == pytest.approx(data["score"])
+
+
+@pytest.mark.usefixtures("small_windows")
+def test_long_text_async_view_matches_sync_view(api_client):
+    """The async view scores long texts by windows too."""
+    sync = api_client.post(reverse("sentiment-analysis"), {"text": LONG_TEXT}, format="json").json()
+    response = api_client.post(reverse("sentiment-analysis-async"), {"text": LONG_TEXT}, format="json")
+
+    assert response.json() == sync
+
+
+@pytest.mark.usefixtures("small_windows")
+def test_long_text_cannot_be_explained(api_client):
+    """Explanations are limited to texts scored in one piece."""
+    response = api_client.post(reverse("sentiment-analysis"), {"text": LONG_TEXT, "explain": True}, format="json")
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_text_over_the_cap_is_rejected(api_client, settings):
+    """Texts longer than ML_MAX_TEXT_CHARS are refused before any cleaning."""
+    settings.ML_MAX_TEXT_CHARS = 50
+    response = api_client.post(reverse("sentiment-analysis"), {"text": LONG_TEXT}, format="json")
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+    response = api_client.post(reverse("sentiment-analysis-batch"), {"texts": ["Super", LONG_TEXT]}, format="json")
+    results = response.json()["results"]
+    assert "prediction" in results[0]
+    assert "trop long" in results[1]["error"]
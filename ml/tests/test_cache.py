@@ -0,0 +1,86 @@
+from django.urls import reverse
+from rest_framework import status
+
+from ml.cache import prediction_cache
+from ml import services
+
+
+def test_repeated_text_hits_the_cache(api_client):
+    """The second prediction of the same cleaned text is served by the cache."""
+    url = reverse("sentiment-analysis")
+    first = api_client.post(url, {"text": "Super !"}, format="json").json()
+    second = api_client.post(url, {"text": "super"}, format="json").json()
+
+    assert first == second
+    stats = prediction_cache.stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 1
+
+
+def test_cache_is_bounded(settings):
+    """The LRU never holds more than ML_PREDICTION_CACHE_SIZE entries."""
+    settings.ML_PREDICTION_CACHE_SIZE = 2
+    services.predict_sentiments(["un", "deux", "trois"])
+
+    stats = prediction_cache.stats()
+    assert stats["size"] == 2
+    assert stats["evictions"] == 1
+
+
+def test_cache_entries_expire(settings):
+    """Entries older than ML_PREDICTION_CACHE_TTL are not served."""
+    settings.ML_PREDICTION_CACHE_TTL = 0
+    services.predict_sentiment("Super")
+    services.predict_sentiment("Super")
+
+    assert prediction_cache.stats()["hits"] == 0
+
+
+def test_new_model_version_invalidates_entries():
+    """Entries of a previous model version are never returned."""
+    prediction_cache.set_many({"super": 0}, version="old")
+
+    assert prediction_cache.get_many(["super"], version="old") == {"super": 0}
+    assert prediction_cache.get_many(["super"], version="new") == {}
+
+
+def test_interleaved_versions_keep_their_entries():
+    """During a hot reload, lookups of the new version do not evict the old one's entries."""
+    prediction_cache.set_many({"super": 1}, version="old")
+    prediction_cache.set_many({"nul": 0}, version="new")
+
+    assert prediction_cache.get_many(["super"], version="old") == {"super": 1}
+    assert prediction_cache.get_many(["nul"], version="new") == {"nul": 0}
+    assert prediction_cache.stats()["size"] == 2
+
+
+def test_shared_backend_is_used(settings):
+    """With a shared backend, a prediction computed elsewhere is reused."""
+    from django.core.cache import caches
+
+    settings.ML_PREDICTION_CACHE_BACKEND = "default"
+    version = services.current_model_version()
+    caches["default"].set(prediction_cache.make_key("super", version), 0)
+
+    assert services.predict_sentiment("Super") == 0
+    assert prediction_cache.stats()["hits"] == 1
+    caches["default"].clear()
+
+
+def test_cache_can_be_disabled(settings):
+    """ML_PREDICTION_CACHE_SIZE = 0 disables the cache."""
+    settings.ML_PREDICTION_CACHE_SIZE = 0
+    services.predict_sentiment("Super")
+    services.predict_sentiment("Super")
+
+    assert prediction_cache.stats()["size"] == 0
+    assert prediction_cache.stats()["hits"] == 0
+
+
+def test_monitoring_exposes_cache_counters(api_client):
+    """The monitoring app exposes the cache counters."""
+    services.predict_sentiment("Super")
+    response = api_client.get(reverse("ml_stats"))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["prediction_cache"]["misses"] == 1
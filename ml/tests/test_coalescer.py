@@ -0,0 +1,95 @@
+import threading
+
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from ml import services
+from ml.coalescer import BatchCoalescer
+
+
+def test_concurrent_submissions_are_batched():
+    """Texts submitted within the window are scored together, each caller gets its own result."""
+    batches = []
+
+    def score_batch(texts):
+        batches.append(list(texts))
+        return [len(text) for text in texts]
+
+    coalescer = BatchCoalescer(score_batch, window=0.2, max_batch=8)
+    barrier = threading.Barrier(8)
+    results = {}
+
+    def call(i):
+        barrier.wait()
+        results[i] = coalescer.submit("x" * i).result(timeout=5)
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {i: i for i in range(8)}
+    assert len(batches) < 8
+    stats = coalescer.stats()
+    assert stats["items"] == 8
+    assert stats["max_batch_size"] > 1
+    assert stats["queue_delay_ms"]["max"] is not None
+
+
+def test_max_batch_bounds_batch_size():
+    """No batch holds more than max_batch texts."""
+    coalescer = BatchCoalescer(lambda texts: [0] * len(texts), window=0.2, max_batch=3)
+    futures = [coalescer.submit(str(i)) for i in range(7)]
+
+    assert [future.result(timeout=5) for future in futures] == [0] * 7
+    assert coalescer.stats()["max_batch_size"] <= 3
+
+
+def test_scoring_errors_reach_every_caller():
+    """An exception raised while scoring is propagated to all callers of the batch."""
+    def score_batch(texts):
+        raise ValueError("boom")
+
+    coalescer = BatchCoalescer(score_batch, window=0.001)
+
+    with pytest.raises(ValueError):
+        coalescer.submit("text").result(timeout=5)
+
+
+def test_view_with_coalescing_enabled(api_client, settings):
+    """Coalesced predictions are identical to direct ones and show up in monitoring."""
+    url = reverse("sentiment-analysis")
+    expected = api_client.post(url, {"text": "Nul, une perte de temps."}, format="json").json()
+
+    settings.ML_COALESCE_ENABLED = True
+    services.prediction_cache.clear()
+    response = api_client.post(url, {"text": "Nul, une perte de temps."}, format="json")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == expected
+    assert api_client.get(reverse("ml_stats")).json()["coalescer"]["items"] >= 1
+
+
+def test_stuck_coalescer_falls_back_to_in_thread_scoring(monkeypatch):
+    """A caller waits a bounded time, then scores its texts itself."""
+    from ml.registry import active_model
+
+    release = threading.Event()
+
+    def score_batch(items):
+        release.wait(5)
+        return [0] * len(items)
+
+    coalescer = BatchCoalescer(score_batch, window=0.001)
+    monkeypatch.setattr(services, "get_coalescer", lambda: coalescer)
+    monkeypatch.setattr(services, "COALESCE_MIN_TIMEOUT", 0.05)
+    bundle = active_model.get()
+    cleaned = ["super article", "nul perte temps"]
+
+    try:
+        assert services._predict_coalesced(cleaned, bundle) == services._predict_cleaned(cleaned, bundle)
+    finally:
+        release.set()
+    assert coalescer.stats()["fallbacks"] == 1
@@ -0,0 +1,104 @@
+import pytest
+
+from ml import dataset
+from ml.registry import file_sha256
+from utils import clean_text, clean_texts
+
+
+CSV = 'comment,label\n"Super article, j\'adore ! https://t.co/x",1\nNul @bob,0\n,1\n"Bof... 10/10",0\n'
+
+
+@pytest.fixture
+def downloads():
+    """Record the downloads and write CSV to the target path."""
+    calls = []
+
+    def download(file_id, path):
+        calls.append(file_id)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(CSV)
+
+    download.calls = calls
+    return download
+
+
+def test_second_run_skips_download_and_cleaning(tmp_path, downloads, monkeypatch):
+    """The cleaned corpus is built once, then served from the cache."""
+    texts, labels, info = dataset.load_clean_corpus(str(tmp_path), download=downloads)
+
+    assert texts == [clean_text("Super article, j'adore ! https://t.co/x"), clean_text("Nul @bob"), clean_text("Bof... 10/10")]
+    assert labels.tolist() == [1, 0, 0]
+    assert info["downloaded"] and info["cleaned"]
+
+    monkeypatch.setattr(dataset, "_clean_raw_dataset", lambda *args: pytest.fail("cleaned again"))
+    cached_texts, cached_labels, info = dataset.load_clean_corpus(str(tmp_path), download=downloads)
+
+    assert (cached_texts, cached_labels.tolist()) == (texts, labels.tolist())
+    assert not info["downloaded"] and not info["cleaned"]
+    assert len(downloads.calls) == 1
+
+
+def test_download_must_match_the_expected_checksum(tmp_path, downloads):
+    """A download with another checksum is rejected and not cached."""
+    with pytest.raises(dataset.DatasetError):
+        dataset.fetch_raw_dataset(str(tmp_path), sha256="0" * 64, download=downloads)
+    assert not list((tmp_path / "raw").iterdir())
+
+
+def test_raw_file_is_content_addressed(tmp_path, downloads):
+    """The raw CSV is stored under its checksum and reused for that checksum."""
+    path, checksum = dataset.fetch_raw_dataset(str(tmp_path), download=downloads)
+
+    assert path.endswith(f"{checksum}.csv") and file_sha256(path) == checksum
+    assert dataset.fetch_raw_dataset(str(tmp_path / "other"), download=downloads)[1] == checksum
+    assert dataset.fetch_raw_dataset(str(tmp_path), sha256=checksum, download=downloads) == (path, checksum)
+    assert len(downloads.calls) == 2
+
+
+def test_refresh_downloads_an_updated_file(tmp_path, downloads):
+    """The cached file is trusted until a refresh downloads the updated one."""
+    path, checksum = dataset.fetch_raw_dataset(str(tmp_path), download=downloads)
+
+    def updated(file_id, target):
+        with open(target, "w", encoding="utf-8") as f:
+            f.write(CSV + "Encore mieux,1\n")
+
+    assert dataset.fetch_raw_dataset(str(tmp_path), download=updated) == (path, checksum)
+    new_path, new_checksum = dataset.fetch_raw_dataset(str(tmp_path), download=updated, refresh=True)
+
+    assert new_checksum != checksum and file_sha256(new_path) == new_checksum
+    assert dataset.fetch_raw_dataset(str(tmp_path), download=downloads) == (new_path, new_checksum)
+
+
+def test_cleaning_code_change_invalidates_the_corpus(tmp_path, downloads, monkeypatch):
+    """A new cleaning fingerprint rebuilds the corpus without downloading again."""
+    dataset.load_clean_corpus(str(tmp_path), download=downloads)
+    monkeypatch.setattr(dataset, "CLEANING_FORMAT_VERSION", dataset.CLEANING_FORMAT_VERSION + 1)
+
+    _, _, info = dataset.load_clean_corpus(str(tmp_path), download=downloads)
+    assert info["cleaned"] and not info["downloaded"]
+
+
+def test_empty_corpus_round_trip(tmp_path):
+    """Empty corpora and empty texts survive the columnar format."""
+    for texts in ([], [""], ["a", "", "b c"]):
+        dataset.save_corpus(tmp_path / "corpus.npz", texts, [0] * len(texts))
+        assert dataset.load_corpus(tmp_path / "corpus.npz")[0] == texts
+
+
+def test_parallel_cleaning_matches_clean_texts():
+    """Chunks cleaned in worker processes come back complete and in order."""
+    texts = [f"Super @bob #{i} https://t.co/{i} ÇA VA ?" for i in range(50)]
+
+    assert dataset.parallel_clean_texts(texts, workers=2, chunk_size=7) == clean_texts(texts)
+
+
+def test_parallel_transform_matches_transform():
+    """Stacked chunk matrices equal a single transform."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    texts = [f"super article {i % 7} vraiment top" if i % 2 else f"nul bof {i % 5}" for i in range(40)]
+    vectorizer = TfidfVectorizer(ngram_range=(1, 2)).fit(texts)
+
+    expected = vectorizer.transform(texts)
+    assert (dataset.parallel_transform(vectorizer, texts, workers=2, chunk_size=9) != expected).nnz == 0
@@ -0,0 +1,156 @@
+import copy
+import json
+
+import numpy as np
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+
+from ml.drift import CountMinSketch, DriftSketch, drift_monitor
+from ml.models import DriftSnapshot
+from ml.registry import active_model
+
+
+@pytest.fixture(autouse=True)
+def drift_settings(settings):
+    """Sketch every text, never save in the background."""
+    settings.ML_DRIFT_ENABLED = True
+    settings.ML_DRIFT_SAMPLE_EVERY = 1
+    settings.ML_DRIFT_FLUSH_SECONDS = 0
+    drift_monitor.reset()
+    yield
+    drift_monitor.reset()
+
+
+def test_count_min_sketch_never_undercounts():
+    """Estimates are at least the true counts, and merged sketches add up."""
+    left, right = CountMinSketch(), CountMinSketch()
+    counts = {f"token{i}": i % 7 + 1 for i in range(3000)}
+    for token, count in counts.items():
+        (left if count % 2 else right).add(token, count)
+    left.merge(right)
+
+    assert all(left.estimate(token) >= count for token, count in counts.items())
+    assert left.table.sum() == sum(counts.values()) * left.table.shape[0]
+
+
+def test_sketch_tracks_oov_rate_predictions_and_top_unseen_tokens():
+    """Unknown tokens are counted and the most frequent ones are reported."""
+    sketch = DriftSketch(top_k=2)
+    sketch.add(20, ["super", "zzgloubi", "zzgloubi"], [True, False, False], 1)
+    sketch.add(5000, ["nul", "zzboulga"], [True, False], 0, score=0.2)
+    for i in range(200):
+        sketch.add(10, [f"rare{i}"], [False], 1)
+
+    summary = sketch.summary()
+    assert summary["texts"] == 202
+    assert summary["oov_rate"] == pytest.approx(203 / 205, abs=1e-4)
+    assert summary["predictions"]["1"]["count"] == 201
+    assert summary["top_unseen_tokens"][0] == {"token": "zzgloubi", "count": 2}
+    assert summary["length_chars"]["<=4096"] == 0 and summary["length_chars"]["<=16384"] == 1
+    assert sum(summary["score_histogram"].values()) == 1
+    assert len(sketch.candidates) <= 4 * sketch.top_k
+
+
+def test_sketches_merge_like_one_sketch():
+    """Merging the sketches of two workers equals sketching all their texts at once."""
+    rows = [(len(text), text.split(), [len(word) > 3 for word in text.split()], i % 2)
+            for i, text in enumerate(["un deux trois", "quatre cinq", "six sept huit neuf", "dix"] * 5)]
+    whole, left, right = DriftSketch(), DriftSketch(), DriftSketch()
+    for i, row in enumerate(rows):
+        whole.add(*row)
+        (left if i % 3 else right).add(*row)
+    left.merge(right)
+
+    assert left.summary() == whole.summary()
+    assert np.array_equal(left.unseen.table, whole.unseen.table)
+
+
+def test_sketch_round_trips_through_json():
+    """Snapshots are stored as JSON and restored identically."""
+    sketch = DriftSketch()
+    sketch.add(12, ["super", "inconnu"], [True, False], 1, score=0.9)
+
+    restored = DriftSketch.from_dict(json.loads(json.dumps(sketch.to_dict())))
+
+    assert restored.summary() == sketch.summary()
+
+
+def test_observe_uses_the_model_vocabulary():
+    """Tokens are checked against the vocabulary of the model that scored the text."""
+    drift_monitor.observe(["Super article zzgloubiboulga !"], [1], active_model.get())
+
+    summary, _ = drift_monitor.pending()
+    summary = summary.summary()
+    assert summary["texts"] == 1
+    assert summary["oov_rate"] == pytest.approx(1 / 3, abs=1e-4)
+    assert summary["top_unseen_tokens"] == [{"token": "zzgloubiboulga", "count": 1}]
+
+
+def test_sampling_sketches_one_text_in_n(settings):
+    """ML_DRIFT_SAMPLE_EVERY keeps the cost proportional to the sampled texts."""
+    settings.ML_DRIFT_SAMPLE_EVERY = 4
+    drift_monitor.observe(["Super"] * 10, [1] * 10, active_model.get())
+
+    assert drift_monitor.pending()[0].texts == 2
+
+
+@pytest.mark.django_db
+def test_observe_stays_off_the_database_and_the_tokenizer(django_assert_num_queries, monkeypatch):
+    """Requests only queue their texts, even when the model version changes."""
+    # Drained by the test itself, not by the background thread
+    monkeypatch.setattr(drift_monitor, "_ensure_thread", lambda: None)
+    bundle = active_model.get()
+    other = copy.copy(bundle)
+    other.version = "other-version"
+
+    with django_assert_num_queries(0):
+        drift_monitor.observe(["Super article !"], [1], bundle)
+        drift_monitor.observe(["Nul."], [0], other)
+    assert drift_monitor.pending()[0].texts == 1  # the first sketch was closed by the version change
+
+    drift_monitor.flush()
+    assert sorted(DriftSnapshot.objects.values_list("model_version", flat=True)) == sorted([bundle.version, "other-version"])
+
+
+@pytest.fixture
+def admin_client(api_client, db):
+    """Return an API client authenticated as a staff user."""
+    admin = get_user_model().objects.create_user(
+        email="admin@example.com", password="strong-password", first_name="Ad", last_name="Min",
+        is_staff=True, is_active=True,
+    )
+    api_client.force_authenticate(user=admin)
+    return api_client
+
+
+@pytest.mark.django_db
+def test_monitoring_merges_saved_and_pending_sketches(admin_client):
+    """The drift endpoint adds the snapshots of every worker to the unsaved sketch."""
+    api_client = admin_client
+    url = reverse("sentiment-analysis-batch")
+    api_client.post(url, {"texts": ["Super article !", "Nul."]}, format="json")
+    drift_monitor.flush()
+    api_client.post(url, {"texts": ["Très bien zzgloubi"]}, format="json")
+
+    assert DriftSnapshot.objects.count() == 1
+    response = api_client.get(reverse("drift_stats"), {"minutes": 5})
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["texts"] == 3
+    assert data["snapshots"] == 1
+    assert data["model_versions"] == [active_model.get().version]
+    assert data["top_unseen_tokens"] == [{"token": "zzgloubi", "count": 1}]
+
+
+def test_monitoring_rejects_invalid_window(admin_client):
+    """The time window must be a positive number of minutes."""
+    assert admin_client.get(reverse("drift_stats"), {"minutes": "abc"}).status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_monitoring_is_reserved_to_admins(api_client):
+    """Unseen tokens are words sent by users: anonymous clients get no access."""
+    assert api_client.get(reverse("drift_stats")).status_code == status.HTTP_401_UNAUTHORIZED
@@ -0,0 +1,115 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+
+from ml.feedback import incremental_update
+from ml.models import SentimentFeedback
+from ml.registry import ModelRegistry, active_model, builtin_bundle
+from ml.services import predict_sentiment
+
+
+TEXT = "Super article, j'adore !"
+
+
+@pytest.fixture
+def registry(settings, tmp_path):
+    """An empty registry, restoring the bundle served by the process afterwards."""
+    settings.ML_MODEL_REGISTRY_DIR = str(tmp_path / "registry")
+    state = (active_model._bundle, active_model._served)
+    yield ModelRegistry(settings.ML_MODEL_REGISTRY_DIR)
+    active_model._bundle, active_model._served = state
+
+
+@pytest.fixture
+def user(db):
+    return get_user_model().objects.create_user(
+        email="feedback@example.com", password="strong-password", first_name="Feed", last_name="Back",
+        is_active=True,
+    )
+
+
+@pytest.fixture
+def authenticated_client(api_client, user):
+    api_client.force_authenticate(user=user)
+    return api_client
+
+
+@pytest.mark.django_db
+def test_feedback_is_stored(authenticated_client, user):
+    """A labelled text is stored as pending feedback with the version served and its sender."""
+    url = reverse("sentiment-analysis-feedback")
+    response = authenticated_client.post(url, {"text": TEXT, "label": 0}, format="json")
+
+    assert response.status_code == status.HTTP_201_CREATED
+    feedback = SentimentFeedback.objects.get(id=response.json()["id"])
+    assert (feedback.text, feedback.label, feedback.applied_version) == (TEXT, 0, "")
+    assert feedback.model_version == active_model.get().version
+    assert feedback.user == user
+
+
+@pytest.mark.django_db
+def test_feedback_requires_authentication(api_client):
+    """Anonymous clients cannot send feedback, as it ends up in the served model."""
+    response = api_client.post(reverse("sentiment-analysis-feedback"), {"text": TEXT, "label": 0}, format="json")
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert not SentimentFeedback.objects.exists()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("body", [{"label": 1}, {"text": "", "label": 1}, {"text": TEXT}, {"text": TEXT, "label": 2},
+                                  {"text": TEXT, "label": True}])
+def test_invalid_feedback_is_rejected(authenticated_client, body):
+    """Feedback without a text or with a label other than 0/1 gets a 400."""
+    response = authenticated_client.post(reverse("sentiment-analysis-feedback"), body, format="json")
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert not SentimentFeedback.objects.exists()
+
+
+def test_incremental_update_learns_the_corrections():
+    """The updated copy follows the feedback, the original model is untouched."""
+    vectorizer, model = builtin_bundle().sklearn()
+    coef = model.coef_.copy()
+
+    updated, metrics = incremental_update(vectorizer, model, [TEXT] * 5, [0] * 5, epochs=10, learning_rate=0.5)
+
+    assert metrics == {"rows": 5, "train_accuracy_before": 0.0, "train_accuracy_after": 1.0}
+    assert type(updated) is type(model)
+    assert (model.coef_ == coef).all()
+    with pytest.raises(ValueError):
+        incremental_update(vectorizer, model, [], [])
+
+
+@pytest.mark.django_db
+def test_apply_feedback_publishes_a_new_version(registry):
+    """The command publishes and activates an updated version and marks the feedback applied."""
+    SentimentFeedback.objects.bulk_create([SentimentFeedback(text=TEXT, label=0, model_version="v0")] * 5)
+
+    call_command("apply_feedback", "--name", "v1", "--epochs", "10", "--learning-rate", "0.5", "--activate")
+
+    assert registry.active()["version"] == "v1"
+    registry.verify("v1")
+    assert set(SentimentFeedback.objects.values_list("applied_version", flat=True)) == {"v1"}
+    bundle = active_model.reload()
+    assert bundle.version == "v1"
+    assert predict_sentiment(TEXT, bundle) == 0
+
+    # Nothing pending anymore: no new version
+    call_command("apply_feedback")
+    assert [manifest["version"] for manifest in registry.versions()] == ["v1"]
+
+
+@pytest.mark.django_db
+def test_feedback_stays_pending_until_a_version_is_activated(registry):
+    """A version published without --activate leaves the feedback to the next run."""
+    SentimentFeedback.objects.bulk_create([SentimentFeedback(text=TEXT, label=0, model_version="v0")] * 5)
+
+    call_command("apply_feedback", "--name", "preview")
+    assert registry.active() is None
+    assert set(SentimentFeedback.objects.values_list("applied_version", flat=True)) == {""}
+
+    call_command("apply_feedback", "--name", "v1", "--activate")
+    assert set(SentimentFeedback.objects.values_list("applied_version", flat=True)) == {"v1"}
@@ -0,0 +1,148 @@
+import random
+
+import numpy as np
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from ml.linear import LinearSentimentScorer, compact_linear_model, compaction_report, export_linear_model
+from ml.registry import builtin_bundle
+from utils import clean_texts
+
+
+sentiment_analysis_vectorizer, sentiment_analysis_model = builtin_bundle().sklearn()
+
+
+SENTENCES = [
+    "Super article, j'adore !",
+    "Nul, une perte de temps.",
+    "Le site répond globalement aux attentes",
+    "Je ne suis pas content du tout, service client horrible",
+    "Très bien, je recommande à tout le monde",
+    "Pas terrible, déçu par la fin de l'anime",
+    "Un chef-d'oeuvre absolu, merci @studio https://example.com #anime",
+    "",
+    "ok",
+    "pas mal mais pas génial non plus",
+]
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    """Real sentences plus random combinations of vocabulary n-grams."""
+    rng = random.Random(42)
+    terms = list(sentiment_analysis_vectorizer.vocabulary_)
+    random_docs = [
+        " ".join(rng.choice(terms) for _ in range(rng.randint(0, 40)))
+        for _ in range(1000)
+    ]
+    return clean_texts(SENTENCES) + random_docs
+
+
+@pytest.fixture(scope="module")
+def scorer(tmp_path_factory):
+    """A scorer loaded from a fresh export of the pickled artifacts."""
+    directory = tmp_path_factory.mktemp("linear")
+    export_linear_model(sentiment_analysis_vectorizer, sentiment_analysis_model, str(directory))
+    return LinearSentimentScorer.load(str(directory))
+
+
+def test_linear_predictions_match_sklearn(scorer, corpus):
+    """The fused scorer predicts exactly like vectorizer + model."""
+    expected = sentiment_analysis_model.predict(sentiment_analysis_vectorizer.transform(corpus))
+
+    assert scorer.predict_many(corpus) == [int(label) for label in expected]
+
+
+def test_linear_decision_function_matches_sklearn(scorer, corpus):
+    """The fused decision values match sklearn up to float rounding."""
+    expected = sentiment_analysis_model.decision_function(sentiment_analysis_vectorizer.transform(corpus))
+    actual = np.array([scorer.decision_function(text) for text in corpus])
+
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize("mmap", [False, True])
+def test_committed_artifact_matches_pickles(settings, corpus, mmap):
+    """The artifact shipped in the repository, memory-mapped or not, is in sync with the pickles."""
+    committed = LinearSentimentScorer.load(settings.ML_LINEAR_MODEL_DIR, mmap=mmap)
+    expected = sentiment_analysis_model.predict(sentiment_analysis_vectorizer.transform(corpus))
+
+    assert committed.predict_many(corpus) == [int(label) for label in expected]
+
+
+def test_export_rejects_unsupported_vectorizer(tmp_path):
+    """Vectorizer options the fused scorer cannot reproduce are refused."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    vectorizer = TfidfVectorizer(sublinear_tf=True).fit(["aa bb cc", "bb cc dd"])
+
+    with pytest.raises(ValueError):
+        export_linear_model(vectorizer, sentiment_analysis_model, str(tmp_path))
+
+
+def test_view_uses_linear_engine(api_client, settings):
+    """The sentiment endpoint can be switched to the fused scorer by setting."""
+    settings.ML_SCORING_ENGINE = "linear"
+    url = reverse("sentiment-analysis-batch")
+    response = api_client.post(url, {"texts": SENTENCES[:7]}, format="json")
+
+    assert response.status_code == status.HTTP_200_OK
+    expected = sentiment_analysis_model.predict(sentiment_analysis_vectorizer.transform(clean_texts(SENTENCES[:7])))
+    assert [item["prediction"] for item in response.json()["results"]] == [int(label) for label in expected]
+
+
+@pytest.fixture(scope="module")
+def exported_dir(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("linear_full")
+    export_linear_model(sentiment_analysis_vectorizer, sentiment_analysis_model, str(directory))
+    return str(directory)
+
+
+def test_compact_without_pruning_matches_sklearn(exported_dir, corpus, tmp_path):
+    """The hashed vocabulary and float32 weights keep the predictions of the full artifact."""
+    compact_linear_model(exported_dir, str(tmp_path), threshold=0.0, dtype="float32")
+    compact = LinearSentimentScorer.load(str(tmp_path))
+    expected = sentiment_analysis_model.decision_function(sentiment_analysis_vectorizer.transform(corpus))
+
+    assert len(compact.vocabulary) == len(sentiment_analysis_vectorizer.vocabulary_)
+    np.testing.assert_allclose([compact.decision_function(text) for text in corpus], expected, atol=1e-4)
+
+
+@pytest.mark.parametrize("mmap", [False, True])
+def test_pruned_float16_artifact(exported_dir, corpus, tmp_path, mmap):
+    """Pruning drops the small coefficients and keeps the lookups of the remaining n-grams."""
+    kept = compact_linear_model(exported_dir, str(tmp_path), threshold=0.3, dtype="float16")
+    compact = LinearSentimentScorer.load(str(tmp_path), mmap=mmap)
+    coef = sentiment_analysis_model.coef_[0]
+
+    assert kept == int((np.abs(coef) >= 0.3).sum())
+    assert not (tmp_path / "vocabulary_terms.npy").exists()
+    strong = [term for term, index in sentiment_analysis_vectorizer.vocabulary_.items() if abs(coef[index]) >= 0.3]
+    weak = [term for term, index in sentiment_analysis_vectorizer.vocabulary_.items() if abs(coef[index]) < 0.3]
+    assert (compact.vocabulary.lookup(strong) >= 0).all()
+    assert (compact.vocabulary.lookup(weak) == -1).all()
+
+    report = compaction_report(exported_dir, str(tmp_path), corpus[:200], compact.predict_many(corpus[:200]))
+    assert report["compact"]["features"] == kept
+    assert report["compact"]["size_bytes"] < report["full"]["size_bytes"] / 5
+    assert report["compact"]["accuracy"] == 1.0
+    assert report["agreement"] > 0.9
+    assert report["accuracy_delta"] == pytest.approx(report["compact"]["accuracy"] - report["full"]["accuracy"])
+
+
+def test_compact_rejects_pruning_hashing_model(tmp_path):
+    """A hashing artifact has no vocabulary to prune, only its precision can be reduced."""
+    from sklearn.feature_extraction.text import HashingVectorizer
+    from sklearn.linear_model import SGDClassifier
+
+    texts, labels = ["super bien", "nul horrible", "très bien", "pas bien du tout"], [1, 0, 1, 0]
+    vectorizer = HashingVectorizer(n_features=2 ** 10, alternate_sign=False)
+    model = SGDClassifier(loss="log_loss", random_state=0).fit(vectorizer.transform(texts), labels)
+    export_linear_model(vectorizer, model, str(tmp_path / "full"))
+
+    with pytest.raises(ValueError):
+        compact_linear_model(str(tmp_path / "full"), str(tmp_path / "compact"), threshold=0.1)
+    compact_linear_model(str(tmp_path / "full"), str(tmp_path / "compact"), dtype="float16")
+    compact = LinearSentimentScorer.load(str(tmp_path / "compact"))
+    assert compact.predict_many(texts) == [int(label) for label in model.predict(vectorizer.transform(texts))]
@@ -0,0 +1,87 @@
+import time
+
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from ml.models import PredictionLog
+from ml.prediction_log import prediction_log
+
+
+@pytest.fixture(autouse=True)
+def prediction_log_settings(settings):
+    """Enable logging with a flush interval long enough for the tests to flush themselves."""
+    settings.ML_PREDICTION_LOG_ENABLED = True
+    settings.ML_PREDICTION_LOG_BATCH_SIZE = 1000
+    settings.ML_PREDICTION_LOG_FLUSH_MS = 60000
+    prediction_log.clear()
+    yield
+    prediction_log.clear()
+
+
+def test_disabled_logging_buffers_nothing(settings):
+    """Without ML_PREDICTION_LOG_ENABLED the predictions are not kept."""
+    settings.ML_PREDICTION_LOG_ENABLED = False
+    prediction_log.record(["super"], [1], "v1", "single")
+
+    assert prediction_log.stats()["buffered"] == 0
+
+
+@pytest.mark.django_db
+def test_batch_predictions_are_logged(api_client):
+    """Every valid text of a batch is logged with its prediction, model version and endpoint."""
+    url = reverse("sentiment-analysis-batch")
+    response = api_client.post(url, {"texts": ["Super article !", "", "Nul."]}, format="json")
+    assert response.status_code == status.HTTP_200_OK
+    assert PredictionLog.objects.count() == 0  # nothing written by the request itself
+
+    prediction_log.flush()
+
+    logs = list(PredictionLog.objects.order_by("id"))
+    assert [log.text for log in logs] == ["Super article !", "Nul."]
+    assert [log.prediction for log in logs] == [result["prediction"] for result in response.json()["results"][::2]]
+    assert {log.model_version for log in logs} == {response["X-Model-Version"]}
+    assert {log.endpoint for log in logs} == {"batch"}
+
+
+def test_buffer_is_bounded(settings):
+    """Past ML_PREDICTION_LOG_MAX_BUFFER rows, predictions are dropped and counted."""
+    settings.ML_PREDICTION_LOG_MAX_BUFFER = 5
+    prediction_log.record([f"texte {i}" for i in range(8)], [1] * 8, "v1", "batch")
+    prediction_log.record(["encore"], [0], "v1", "single")
+
+    stats = prediction_log.stats()
+    assert stats["buffered"] == 5
+    assert stats["dropped"] == 4
+
+
+def test_long_texts_are_truncated(settings):
+    """Only the first ML_PREDICTION_LOG_MAX_TEXT_CHARS characters of a text are buffered."""
+    settings.ML_PREDICTION_LOG_MAX_TEXT_CHARS = 10
+    prediction_log.record(["x" * 1000000], [1], "v1", "long")
+
+    assert [row[0] for row in prediction_log._buffer] == ["x" * 10]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_background_thread_flushes_full_batches(settings):
+    """A full batch is written by the background thread, in one bulk_create."""
+    settings.ML_PREDICTION_LOG_BATCH_SIZE = 3
+    prediction_log.record(["un", "deux", "trois"], [1, 0, 1], "v1", "batch")
+
+    deadline = time.monotonic() + 5
+    while prediction_log.stats()["written"] < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert prediction_log.stats()["flushes"] == 1
+    assert sorted(PredictionLog.objects.values_list("text", flat=True)) == ["deux", "trois", "un"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_close_drains_the_buffer():
+    """Closing the writer (worker shutdown) writes the rows still buffered."""
+    prediction_log.record(["un", "deux"], [1, 0], "v1", "single")
+    prediction_log.close()
+
+    assert PredictionLog.objects.count() == 2
+    assert prediction_log.stats()["buffered"] == 0
@@ -0,0 +1,164 @@
+import pickle
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+from ml.registry import ModelRegistry, RegistryError, active_model, builtin_bundle
+
+
+@pytest.fixture
+def registry(settings, tmp_path):
+    """An empty registry, restoring the bundle served by the process afterwards."""
+    settings.ML_MODEL_REGISTRY_DIR = str(tmp_path / "registry")
+    # The tests run the poller's check themselves
+    settings.ML_MODEL_POLL_INTERVAL = 0
+    state = (active_model._bundle, active_model._served)
+    yield ModelRegistry(settings.ML_MODEL_REGISTRY_DIR)
+    active_model._bundle, active_model._served = state
+
+
+@pytest.fixture
+def inverted_model(tmp_path):
+    """Paths of a model predicting the opposite of the builtin one, and of its vectorizer."""
+    bundle = builtin_bundle()
+    _, model = bundle.sklearn()
+    model = pickle.loads(pickle.dumps(model))
+    model.coef_ = -model.coef_
+    model.intercept_ = -model.intercept_
+    path = tmp_path / "inverted_model.pkl"
+    path.write_bytes(pickle.dumps(model))
+    return str(path), bundle.vectorizer_path
+
+
+# Set by a test to make the pickles holding a `_Fragile` fail to load
+_BREAK_PICKLES = False
+
+
+def _load_fragile():
+    if _BREAK_PICKLES:
+        raise ImportError("Pickled with another version of the library")
+    return _Fragile()
+
+
+class _Fragile:
+    """Pickled attribute whose loading fails once _BREAK_PICKLES is set."""
+
+    def __reduce__(self):
+        return _load_fragile, ()
+
+
+def poll():
+    """Run one check of the background poller, then return the served bundle."""
+    active_model.check()
+    return active_model.get()
+
+
+def test_builtin_version_is_served_without_active_version(registry):
+    """An empty registry serves the artifacts of the repository root."""
+    assert active_model.reload().version.startswith("builtin-")
+
+
+def test_publish_writes_a_verified_manifest(registry, inverted_model):
+    """A published version has a checksum for every file and passes verification."""
+    version = registry.publish(*inverted_model, version="v1")
+
+    manifest = registry.manifest(version)
+    assert {"sentiment_analysis_model.pkl", "sentiment_analysis_vectorizer.pkl", "linear/coef.npy"} <= set(manifest["files"])
+    registry.verify(version)
+    with pytest.raises(RegistryError):
+        registry.publish(*inverted_model, version="v1")
+
+
+@pytest.mark.parametrize("engine", ["sklearn", "linear"])
+def test_activation_is_picked_up_by_the_poll(registry, inverted_model, settings, engine):
+    """Activating a version swaps the served bundle, and predictions follow it."""
+    settings.ML_SCORING_ENGINE = engine
+    builtin = active_model.reload()
+    registry.activate(registry.publish(*inverted_model, version="v1"))
+
+    served = poll()
+    assert served.version == "v1"
+    assert served is not builtin
+
+    from ml.services import predict_sentiment
+    assert predict_sentiment("Super article, j'adore !", builtin) == 1
+    assert predict_sentiment("Super article, j'adore !", served) == 0
+
+
+def test_in_flight_bundle_survives_a_swap(registry, inverted_model):
+    """A request keeps the bundle it started with while a new one is swapped in."""
+    from ml.services import predict_sentiments
+
+    in_flight = active_model.reload()
+    registry.activate(registry.publish(*inverted_model, version="v1"))
+    assert poll().version == "v1"
+
+    assert predict_sentiments(["Super article, j'adore !"], in_flight) == [1]
+
+
+def test_rollback_restores_the_previous_version(registry, inverted_model):
+    """Rollback re-activates the version that was active before."""
+    registry.activate(registry.publish(*inverted_model, version="v1"))
+    registry.activate(registry.publish(*inverted_model, version="v2"))
+
+    assert registry.rollback() == "v1"
+    assert poll().version == "v1"
+    with pytest.raises(RegistryError):
+        ModelRegistry(registry.root + "-empty").rollback()
+
+
+def test_tampered_version_is_refused(registry, inverted_model):
+    """A version whose files no longer match the manifest cannot be activated."""
+    version = registry.publish(*inverted_model, version="v1")
+    with open(f"{registry.version_dir(version)}/linear/coef.npy", "ab") as f:
+        f.write(b"\0")
+
+    with pytest.raises(RegistryError):
+        registry.activate(version)
+
+
+def test_response_reports_the_model_version(registry, inverted_model, api_client):
+    """Prediction responses carry the version that scored them."""
+    call_command("ml_model", "publish", "--model", inverted_model[0], "--vectorizer", inverted_model[1],
+                 "--version", "v1", "--activate")
+    active_model.reload()
+
+    response = api_client.post(reverse("sentiment-analysis"), {"text": "Super article, j'adore !"}, format="json")
+    assert response["X-Model-Version"] == "v1"
+    assert response.json() == {"prediction": 0}
+
+
+def test_corrupted_active_version_keeps_the_current_bundle(registry, inverted_model, caplog):
+    """A version that fails verification is logged, the served bundle stays, requests still succeed."""
+    served = active_model.reload()
+    version = registry.publish(*inverted_model, version="v1")
+    registry.activate(version)
+    with open(f"{registry.version_dir(version)}/linear/coef.npy", "ab") as f:
+        f.write(b"\0")
+
+    assert active_model.check() is False
+    assert active_model.get() is served
+    assert "Could not load the active model version" in caplog.text
+
+
+def test_unloadable_version_does_not_stop_the_poller(registry, inverted_model, settings, tmp_path, monkeypatch):
+    """Any error loading a version is survived: a later good version is still picked up."""
+    settings.ML_SCORING_ENGINE = "sklearn"
+    served = active_model.reload()
+    model_path, vectorizer_path = inverted_model
+    with open(model_path, "rb") as f:
+        model = pickle.load(f)
+    model.fragile = _Fragile()
+    fragile_path = tmp_path / "fragile_model.pkl"
+    fragile_path.write_bytes(pickle.dumps(model))
+    registry.activate(registry.publish(str(fragile_path), vectorizer_path, version="v1"))
+    monkeypatch.setattr(f"{__name__}._BREAK_PICKLES", True)
+
+    assert active_model.check() is False
+    assert active_model.get() is served
+
+    registry.activate(registry.publish(*inverted_model, version="v2"))
+
+    assert active_model.check() is True
+    assert active_model.get().version == "v2"
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from ml.management.commands import score_sentiment
+from ml.services import predict_sentiments
+
+
+TEXTS = ["Super article, j'adore !", "Nul, une perte de temps.", "", "Le site répond globalement aux attentes",
+         "Je ne suis pas content du tout, service client horrible", "Génial", "Bof"]
+
+
+@pytest.fixture
+def input_file(tmp_path):
+    """A JSONL file with valid texts, an empty text, a blank line and a non-JSON line."""
+    path = tmp_path / "in.jsonl"
+    lines = [json.dumps({"id": i, "text": text}) for i, text in enumerate(TEXTS)]
+    lines[3:3] = ["", "not json"]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return path
+
+
+def read_output(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def expected_output():
+    predictions = iter(predict_sentiments([text for text in TEXTS if text]))
+    results = [
+        {"id": i, "text": text, "prediction": next(predictions)} if text
+        else {"id": i, "text": text, "error": "Texte vide ou invalide"}
+        for i, text in enumerate(TEXTS)
+    ]
+    results[3:3] = [{"line": "not json", "error": "Texte vide ou invalide"}]
+    return results
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_scores_in_input_order(input_file, tmp_path, workers):
+    """Every non-blank line gets its result, in input order, whatever the number of workers."""
+    output = tmp_path / "out.jsonl"
+    call_command("score_sentiment", str(input_file), str(output), "--chunk-size", "2", "--workers", str(workers))
+
+    assert read_output(output) == expected_output()
+    checkpoint = json.loads((tmp_path / "out.jsonl.checkpoint").read_text())
+    assert checkpoint == {"input_offset": input_file.stat().st_size, "output_offset": output.stat().st_size, "rows": 8}
+
+
+def test_resume_continues_after_the_checkpoint(input_file, tmp_path, monkeypatch):
+    """An interrupted run resumes after the last chunk written, without duplicates."""
+    output = tmp_path / "out.jsonl"
+    score_chunk = score_sentiment._score_chunk
+    calls = []
+
+    def failing_score_chunk(lines, text_field):
+        calls.append(lines)
+        if len(calls) == 3:
+            raise KeyboardInterrupt
+        return score_chunk(lines, text_field)
+
+    monkeypatch.setattr(score_sentiment, "_score_chunk", failing_score_chunk)
+    with pytest.raises(KeyboardInterrupt):
+        call_command("score_sentiment", str(input_file), str(output), "--chunk-size", "2", "--workers", "0")
+    assert 0 < len(read_output(output)) < 8
+
+    call_command("score_sentiment", str(input_file), str(output), "--chunk-size", "2", "--workers", "0", "--resume")
+    assert read_output(output) == expected_output()
+
+
+def test_resume_requires_a_checkpoint(input_file, tmp_path):
+    """Resuming without a checkpoint is an error."""
+    with pytest.raises(CommandError):
+        call_command("score_sentiment", str(input_file), str(tmp_path / "out.jsonl"), "--resume")
@@ -0,0 +1,157 @@
+import copy
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from ml import services
+from ml.drift import drift_monitor
+from ml.registry import active_model
+from ml.sidecar import SidecarServer, SidecarUnavailable, sidecar_client
+
+
+TEXTS = ["Super article, j'adore !", "Nul, une perte de temps.", "Très bien, je recommande"]
+
+
+@pytest.fixture
+def socket_path(settings):
+    """Enable the sidecar on a short socket path (AF_UNIX paths are limited to ~100 bytes)."""
+    directory = tempfile.mkdtemp()
+    settings.ML_SIDECAR_ENABLED = True
+    settings.ML_SIDECAR_SOCKET = os.path.join(directory, "sidecar.sock")
+    settings.ML_SIDECAR_TIMEOUT_MS = 2000
+    sidecar_client.reset()
+    yield settings.ML_SIDECAR_SOCKET
+    sidecar_client.reset()
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+@pytest.fixture
+def sidecar(socket_path):
+    """A sidecar server running in a background thread."""
+    server = SidecarServer(socket_path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_sidecar_predictions_match_in_process(sidecar):
+    """Texts scored by the sidecar get the in-process predictions."""
+    bundle = active_model.get()
+    expected = services._predict_cleaned(TEXTS, bundle)
+
+    assert services.predict_sentiments(TEXTS, bundle) == expected
+    assert sidecar_client.stats()["texts"] == len(TEXTS)
+    assert sidecar_client.stats()["fallbacks"] == 0
+
+
+def test_concurrent_workers_share_the_sidecar(sidecar):
+    """Connections of several threads are all answered correctly."""
+    bundle = active_model.get()
+    expected = services._predict_cleaned(TEXTS, bundle)
+    results = []
+
+    def call():
+        results.append(sidecar_client.predict(TEXTS, bundle.version))
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [expected] * 8
+
+
+def test_missing_sidecar_falls_back_in_process(socket_path):
+    """Without a sidecar listening, texts are scored in-process."""
+    assert services.predict_sentiment(TEXTS[0]) == 1
+    assert sidecar_client.stats()["fallbacks"] == 1
+
+
+def test_slow_sidecar_falls_back_in_process(sidecar, settings, monkeypatch):
+    """A sidecar answering after ML_SIDECAR_TIMEOUT_MS is not waited for."""
+    settings.ML_SIDECAR_TIMEOUT_MS = 50
+
+    def slow(cleaned_texts, bundle):
+        time.sleep(0.5)
+        return [0] * len(cleaned_texts)
+
+    monkeypatch.setattr(services, "_predict_coalesced", slow)
+    started = time.perf_counter()
+    assert services.predict_sentiment(TEXTS[0]) == 1
+    assert time.perf_counter() - started < 0.4
+    assert sidecar_client.stats()["fallbacks"] == 1
+
+
+def test_other_model_version_falls_back_in_process(sidecar):
+    """During a hot reload the sidecar may serve another version: the worker scores itself."""
+    bundle = active_model.get()
+    with pytest.raises(SidecarUnavailable):
+        sidecar_client.predict(TEXTS, "other-version")
+
+    other = copy.copy(bundle)
+    other.version = "other-version"
+    assert services._predict_sidecar(TEXTS, other) == services._predict_cleaned(TEXTS, bundle)
+    assert sidecar_client.stats()["fallbacks"] == 2
+
+
+@pytest.mark.django_db
+def test_endpoint_scores_through_the_sidecar(api_client, sidecar):
+    """The sentiment endpoint uses the sidecar and reports it in the ML stats."""
+    response = api_client.post(reverse("sentiment-analysis"), {"text": TEXTS[0]}, format="json")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"prediction": 1}
+    assert api_client.get(reverse("ml_stats")).json()["sidecar"]["requests"] == 1
+
+
+def test_worker_never_loads_the_artifacts(socket_path, settings, monkeypatch):
+    """In sidecar mode, the warm-up and the served bundle of a worker leave the artifacts unloaded."""
+    from ml import registry
+    from ml.warmup import WarmUp
+
+    settings.ML_WARMUP_ENABLED = True
+    worker_model = registry.ActiveModel()
+    monkeypatch.setattr(registry, "active_model", worker_model)
+
+    worker_warmup = WarmUp()
+    worker_warmup.run()
+
+    assert worker_warmup.status()["state"] == "done"
+    bundle = worker_model.get()
+    settings.ML_DRIFT_ENABLED = True
+    drift_monitor.observe(TEXTS, [1, 0, 1], bundle)
+    drift_monitor.pending()
+    assert bundle._sklearn is None
+    assert bundle._linear == {}
+    drift_monitor.reset()
+
+
+@pytest.mark.django_db
+def test_article_and_long_text_scores_leave_the_artifacts_unloaded(sidecar, settings, monkeypatch):
+    """Probabilities come from the sidecar: saving an article loads nothing in the worker."""
+    from articles.models import Article
+    from ml import registry
+
+    worker_model = registry.ActiveModel()
+    monkeypatch.setattr(registry, "active_model", worker_model)
+    bundle = worker_model.get()
+    expected = services._score_cleaned([services.clean_text(TEXTS[0])], active_model.get())[0]
+    settings.ML_LONG_TEXT_CHARS = 100
+
+    article = Article.objects.create(title="Article", content=TEXTS[0])
+    long_document = services.predict_long_document(" ".join(TEXTS * 20), bundle)
+
+    assert article.sentiment_score == pytest.approx(expected)
+    assert long_document["windows"] >= 1
+    assert sidecar_client.stats()["fallbacks"] == 0
+    assert bundle._sklearn is None
+    assert bundle._linear == {}
@@ -0,0 +1,89 @@
+import csv
+import pickle
+import random
+import tracemalloc
+
+import pytest
+
+from ml.linear import LinearSentimentScorer, export_linear_model
+from ml.registry import ModelBundle
+from ml.services import explain_sentiment, predict_sentiment
+from ml.streaming import train_streaming
+from utils import clean_texts
+
+
+POSITIVE = ["super", "génial", "top", "j'adore", "excellent", "bravo"]
+NEGATIVE = ["nul", "horrible", "bof", "déteste", "mauvais", "pire"]
+
+
+def write_csv(path, rows, seed=0):
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["comment", "label"])
+        for i in range(rows):
+            label = rng.randint(0, 1)
+            words = rng.choices(POSITIVE if label else NEGATIVE, k=3) + rng.choices(POSITIVE + NEGATIVE, k=2)
+            writer.writerow([" ".join(words) + f" @user{i} !", label])
+
+
+@pytest.fixture(scope="module")
+def streamed(tmp_path_factory):
+    """A model trained by the streaming trainer, with its pickles and linear artifact."""
+    directory = tmp_path_factory.mktemp("streaming")
+    write_csv(directory / "data.csv", 3000)
+    vectorizer, model, metrics = train_streaming(
+        str(directory / "data.csv"), str(directory), chunk_size=500, n_features=2 ** 12, log=lambda message: None,
+    )
+    (directory / "vectorizer.pkl").write_bytes(pickle.dumps(vectorizer))
+    (directory / "model.pkl").write_bytes(pickle.dumps(model))
+    export_linear_model(vectorizer, model, str(directory / "linear"))
+    return directory, vectorizer, model, metrics
+
+
+def test_streaming_model_learns(streamed):
+    """The holdout rows are kept out of training and well classified."""
+    _, _, _, metrics = streamed
+
+    assert metrics["holdout_rows"] == 300
+    assert metrics["train_rows"] == 2700
+    assert metrics["accuracy"] > 0.95
+
+
+def test_hashed_linear_artifact_matches_sklearn(streamed):
+    """The fused scorer hashes n-grams exactly like the HashingVectorizer."""
+    directory, vectorizer, model, _ = streamed
+    scorer = LinearSentimentScorer.load(str(directory / "linear"))
+    texts = clean_texts(["Super top génial !", "Nul, horrible.", "bof top bof top", "", "mot inconnu"])
+
+    expected = model.decision_function(vectorizer.transform(texts))
+    assert [scorer.decision_function(text) for text in texts] == pytest.approx(expected, abs=1e-9)
+    assert sorted(path.name for path in (directory / "linear").iterdir()) == ["coef.npy", "meta.json"]
+
+
+@pytest.mark.parametrize("engine", ["sklearn", "linear"])
+def test_streaming_model_is_served_like_the_tfidf_one(streamed, settings, engine):
+    """ml.services predicts and explains with a hashing model through the same bundle interface."""
+    directory, _, _, _ = streamed
+    settings.ML_SCORING_ENGINE = engine
+    bundle = ModelBundle("streaming", str(directory / "model.pkl"), str(directory / "vectorizer.pkl"),
+                         str(directory / "linear"))
+
+    assert predict_sentiment("Super top génial !", bundle) == 1
+    explanation = explain_sentiment("Nul, horrible.", top_k=2, bundle=bundle)
+    assert explanation["prediction"] == 0
+    assert {entry["ngram"] for entry in explanation["top_ngrams"]} <= {"nul", "horrible", "nul horrible"}
+
+
+def test_streaming_memory_does_not_grow_with_the_dataset(tmp_path):
+    """Peak memory depends on the chunk size, not on the number of rows."""
+    peaks = []
+    for rows in (2000, 8000):
+        write_csv(tmp_path / "data.csv", rows)
+        tracemalloc.start()
+        train_streaming(str(tmp_path / "data.csv"), str(tmp_path), chunk_size=250, mix=2, epochs=1,
+                        n_features=2 ** 12, log=lambda message: None)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    assert peaks[1] < peaks[0] * 1.5
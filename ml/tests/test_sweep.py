@@ -0,0 +1,54 @@
+from ml.sweep import expand_grid, pareto_front, run_sweep
+
+
+def result(accuracy, p99, size, memory):
+    return {"metrics": {
+        "accuracy": accuracy,
+        "sklearn_latency": {"p99_ms": p99},
+        "pickle_bytes": size,
+        "loaded_memory_bytes": memory,
+    }}
+
+
+def test_expand_grid_varies_vectorizer_settings_slowest():
+    """Configurations sharing vectorizer settings are consecutive, so the vectorizer is fitted once."""
+    configs = expand_grid({"C": [0.5, 1.0], "max_features": [10, 20]})
+
+    assert configs == [
+        {"max_features": 10, "C": 0.5}, {"max_features": 10, "C": 1.0},
+        {"max_features": 20, "C": 0.5}, {"max_features": 20, "C": 1.0},
+    ]
+
+
+def test_pareto_front_drops_dominated_results():
+    """A result worse or equal on every axis is not Pareto-optimal."""
+    results = [
+        result(0.90, 1.0, 100, 100),
+        result(0.85, 1.0, 100, 100),  # dominated by the first one
+        result(0.80, 0.5, 100, 100),  # faster
+        result(0.90, 1.0, 100, 100),  # tie with the first one
+    ]
+
+    assert pareto_front(results) == [0, 2, 3]
+
+
+def test_run_sweep_measures_every_configuration():
+    """Every configuration gets quality, size, memory and latency metrics."""
+    positive = ["super article", "vraiment top", "excellent travail", "très bien"]
+    negative = ["nul article", "vraiment horrible", "mauvais travail", "très mauvais"]
+    texts = [positive[i % 4] if i % 2 else negative[i % 4] for i in range(80)]
+    labels = [i % 2 for i in range(80)]
+
+    results = run_sweep(
+        texts[:60], texts[60:], labels[:60], labels[60:],
+        grid={"max_features": [5, 50], "ngram_range": [[1, 2]], "C": [1.0]},
+        latency_samples=5, log=lambda message: None,
+    )
+
+    assert [entry["config"]["max_features"] for entry in results] == [5, 50]
+    metrics = results[1]["metrics"]
+    assert metrics["accuracy"] == 1.0
+    assert metrics["pickle_bytes"] > metrics["linear_bytes"] > 0
+    assert metrics["loaded_memory_bytes"] > 0
+    assert metrics["linear_latency"]["p50_ms"] <= metrics["linear_latency"]["p99_ms"]
+    assert any(entry["pareto"] for entry in results)
@@ -0,0 +1,105 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from ml import throttling
+from ml.throttling import batch_cost, json_body
+from weeb_api.core.throttles import MLCostThrottle
+
+
+@pytest.fixture(autouse=True)
+def ml_budget(settings, monkeypatch):
+    """A budget of 10 units per minute, one unit per 100 characters."""
+    settings.ML_THROTTLE_CHARS_PER_UNIT = 100
+    monkeypatch.setattr(MLCostThrottle, "THROTTLE_RATES", {"ml": "10/min"})
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def predict(client, text):
+    return client.post(reverse("sentiment-analysis"), {"text": text}, format="json")
+
+
+def post_async(async_client, url):
+    return async_to_sync(async_client.post)(url, {"text": "Super !"}, content_type="application/json")
+
+
+@pytest.mark.django_db
+def test_short_texts_are_charged_one_unit(api_client):
+    """Ten short texts fit in the budget, the eleventh gets a 429 with Retry-After."""
+    for _ in range(10):
+        assert predict(api_client, "Super !").status_code == status.HTTP_200_OK
+
+    response = predict(api_client, "Super !")
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert 0 < int(response["Retry-After"]) <= 60
+
+
+@pytest.mark.django_db
+def test_only_post_requests_are_charged(api_client):
+    """Requests answered 405 do not spend the budget."""
+    for _ in range(20):
+        assert api_client.get(reverse("sentiment-analysis")).status_code == status.HTTP_405_METHOD_NOT_ALLOWED
+
+    for _ in range(10):
+        assert predict(api_client, "Super !").status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_long_texts_cost_more(api_client):
+    """A text of ~350 characters costs 4 units: only two of them fit."""
+    text = "Super article, j'adore ! " * 14
+
+    assert predict(api_client, text).status_code == status.HTTP_200_OK
+    assert predict(api_client, text).status_code == status.HTTP_200_OK
+    assert predict(api_client, text).status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    # The remaining unit still pays for a short text
+    assert predict(api_client, "Super !").status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_batches_are_charged_per_item(api_client):
+    """A batch of 8 short texts costs 8 units."""
+    url = reverse("sentiment-analysis-batch")
+
+    assert api_client.post(url, {"texts": ["Super !"] * 8}, format="json").status_code == status.HTTP_200_OK
+    response = api_client.post(url, {"texts": ["Super !"] * 3}, format="json")
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert "Retry-After" in response
+
+
+def test_batch_body_is_parsed_once(rf, monkeypatch):
+    """The body parsed to cost a batch is the one the view reads."""
+    request = rf.post("/", {"texts": ["Super !", "Nul."]}, content_type="application/json")
+    assert batch_cost(request) == 2
+
+    monkeypatch.setattr(throttling.json, "loads", lambda data: pytest.fail("Body parsed twice"))
+    assert json_body(request) == {"texts": ["Super !", "Nul."]}
+
+
+@pytest.mark.django_db
+def test_async_view_is_throttled(async_client):
+    """The async endpoint shares the same budget."""
+    url = reverse("sentiment-analysis-async")
+    for _ in range(10):
+        response = post_async(async_client, url)
+        assert response.status_code == status.HTTP_200_OK
+    assert post_async(async_client, url).status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+
+@pytest.mark.django_db
+def test_admin_users_bypass_the_budget(api_client):
+    """Staff users authenticated with a JWT are never throttled."""
+    admin = get_user_model().objects.create_user(
+        email="admin@example.com", password="strong-password", first_name="Ad", last_name="Min", is_staff=True,
+        is_active=True,
+    )
+    api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(admin).access_token}")
+
+    for _ in range(12):
+        assert predict(api_client, "Super !").status_code == status.HTTP_200_OK
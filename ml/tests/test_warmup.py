@@ -0,0 +1,75 @@
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from ml.warmup import DEFAULT_CORPUS, WarmUp, warmup
+
+
+@pytest.fixture(autouse=True)
+def fresh_warmup(settings):
+    """Enable the warm-up and start every test with a pending one."""
+    settings.ML_WARMUP_ENABLED = True
+    warmup.reset()
+    yield
+    warmup.wait(10)
+    warmup.reset()
+
+
+def test_readiness_is_gated_by_warmup(api_client):
+    """The readiness endpoint answers 503 until the warm-up is done, 200 afterwards."""
+    url = reverse("readiness_check")
+    response = api_client.get(url)
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.json()["warmup"]["state"] == "pending"
+
+    warmup.start()
+    assert warmup.wait(10)
+
+    response = api_client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()["warmup"]
+    assert data["state"] == "done"
+    assert data["texts"] == len(DEFAULT_CORPUS)
+    assert data["model_version"]
+
+
+def test_readiness_without_warmup(api_client, settings):
+    """Without ML_WARMUP_ENABLED, processes are ready right away."""
+    settings.ML_WARMUP_ENABLED = False
+
+    assert api_client.get(reverse("readiness_check")).status_code == status.HTTP_200_OK
+
+
+def test_warmup_reads_configured_corpus(settings, tmp_path):
+    """ML_WARMUP_CORPUS lists the warm-up texts, one per non-blank line."""
+    corpus = tmp_path / "corpus.txt"
+    corpus.write_text("Super article\n\nNul, horrible\n", encoding="utf-8")
+    settings.ML_WARMUP_CORPUS = str(corpus)
+
+    state = WarmUp()
+    state.run()
+
+    assert state.status()["ready"]
+    assert state.texts == 2
+
+
+def test_failed_warmup_stays_not_ready(settings, tmp_path):
+    """A warm-up that cannot run reports the error and keeps the process not ready."""
+    settings.ML_WARMUP_CORPUS = str(tmp_path / "missing.txt")
+
+    state = WarmUp()
+    state.run()
+
+    status_ = state.status()
+    assert status_["state"] == "failed"
+    assert not status_["ready"]
+    assert "missing.txt" in status_["error"]
+
+
+def test_warmup_starts_once_per_process():
+    """Starting the warm-up again in the same process does not run it twice."""
+    warmup.start()
+    thread = warmup._thread
+    warmup.start()
+
+    assert warmup._thread is thread
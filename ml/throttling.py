@@ -0,0 +1,134 @@
+"""
+Cost-weighted throttling of the ML endpoints (weeb_api.core.throttles.MLCostThrottle).
+
+The ML views are plain Django views, so the DRF throttles of the API do not
+apply to them. `ml_throttle` charges each POST request against the "ml"
+budget of its client (DEFAULT_THROTTLE_RATES, THROTTLE_ML) before the view
+runs, and answers 429 with a Retry-After header once the budget is spent.
+
+Costs are counted in units of ML_THROTTLE_CHARS_PER_UNIT characters of
+payload, so that one long text weighs like many short ones:
+    - single text: 1 unit + 1 per ML_THROTTLE_CHARS_PER_UNIT bytes of body
+    - batch:       1 unit per item + 1 per ML_THROTTLE_CHARS_PER_UNIT bytes
+                   (the body is parsed once, shared with the view: json_body)
+    - stream:      1 unit + 1 per ML_THROTTLE_CHARS_PER_UNIT bytes of the
+                   announced Content-Length (the body is never read upfront)
+    - feedback:    1 unit
+
+The client is authenticated like the API views (JWT), so admin users keep
+bypassing the limits.
+"""
+
+import json
+import math
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.http import JsonResponse
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from weeb_api.core.throttles import MLCostThrottle
+
+
+def unit_cost(request):
+    """Cost of a request whose work does not depend on its size."""
+    return 1
+
+
+def text_cost(request):
+    """Cost of a single-text request: grows with the size of its body."""
+    return 1 + len(request.body) // settings.ML_THROTTLE_CHARS_PER_UNIT
+
+
+def json_body(request):
+    """
+    Return the parsed JSON body of a request, parsed once per request.
+
+    `batch_cost` needs the number of items before the view runs: the parsed
+    body is kept on the request so that the view does not parse it again.
+
+    Raises:
+        ValueError: If the body is not valid JSON.
+    """
+    if not hasattr(request, "_ml_json_body"):
+        request._ml_json_body = json.loads(request.body)
+    return request._ml_json_body
+
+
+def batch_cost(request):
+    """Cost of a batch request: its number of items, plus the size of its body."""
+    try:
+        body = json_body(request)
+        texts = body.get("texts") if isinstance(body, dict) else None
+    except ValueError:
+        texts = None
+    items = len(texts) if isinstance(texts, list) else 1
+    return max(1, items) + len(request.body) // settings.ML_THROTTLE_CHARS_PER_UNIT
+
+
+def stream_cost(request):
+    """Cost of a streaming request, from its Content-Length (0 when not announced)."""
+    try:
+        length = int(request.META.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        length = 0
+    return 1 + length // settings.ML_THROTTLE_CHARS_PER_UNIT
+
+
+def _throttled_response(request, cost):
+    """Charge the request to its client; return the 429 response when over budget, None otherwise."""
+    api_request = Request(
+        request, authenticators=[authenticator() for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+    )
+    try:
+        api_request.user
+    except APIException:
+        # Invalid token: charged as an anonymous client, like the view would serve it
+        api_request.user = AnonymousUser()
+
+    throttle = MLCostThrottle(cost(request))
+    if throttle.allow_request(api_request, None):
+        return None
+
+    wait = math.ceil(throttle.wait())
+    response = JsonResponse({"error": f"Trop de requêtes, réessayez dans {wait} secondes"}, status=429)
+    response["Retry-After"] = str(wait)
+    return response
+
+
+def ml_throttle(cost=text_cost):
+    """
+    Decorate an ML view, sync or async, with the cost-weighted throttle.
+
+    Only POST requests are charged: the views answer anything else with a
+    405 without doing any work.
+
+    Args:
+        cost (callable): Maps the request to its cost in units.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if request.method == "POST":
+                    # Authentication may query the database
+                    response = await sync_to_async(_throttled_response)(request, cost)
+                    if response is not None:
+                        return response
+                return await view(request, *args, **kwargs)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method == "POST":
+                response = _throttled_response(request, cost)
+                if response is not None:
+                    return response
+            return view(request, *args, **kwargs)
+        return wrapper
+
+    return decorator
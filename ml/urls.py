@@ -1,6 +1,16 @@
 from django.urls import path
-from .views import sentiment_analysis
+from .views import (
+    sentiment_analysis,
+    sentiment_analysis_async,
+    sentiment_analysis_batch,
+    sentiment_analysis_stream,
+    sentiment_feedback,
+)
 
 urlpatterns = [
     path('sentiment-analysis', sentiment_analysis, name='sentiment-analysis'),
+    path('sentiment-analysis/async', sentiment_analysis_async, name='sentiment-analysis-async'),
+    path('sentiment-analysis/batch', sentiment_analysis_batch, name='sentiment-analysis-batch'),
+    path('sentiment-analysis/stream', sentiment_analysis_stream, name='sentiment-analysis-stream'),
+    path('sentiment-analysis/feedback', sentiment_feedback, name='sentiment-analysis-feedback'),
 ]
@@ -1,38 +1,61 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.views.decorators.csrf import csrf_exempt
-from django.http import JsonResponse
-import pickle
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
 import json
-import numpy as np
-import os
-from utils import clean_text 
+from .drift import drift_monitor
+from .models import SentimentFeedback
+from .prediction_log import prediction_log
+from .registry import active_model
+from .services import (
+    aexplain_sentiment,
+    apredict_long_document,
+    apredict_sentiment,
+    explain_sentiment,
+    predict_long_document,
+    predict_sentiment,
+    predict_sentiments,
+)
+from .throttling import batch_cost, json_body, ml_throttle, stream_cost, unit_cost
 
 
+def _versioned(response, bundle):
+    """Report the model version that produced a response in X-Model-Version."""
+    response["X-Model-Version"] = bundle.version
+    return response
 
-# Load the sentiment analysis and vectorizer model once on server load
 
-# Path to Trained Logistic Regression Model for Sentiment Analysis
-SENTIMENT_ANALYSIS_MODEL_PATH = os.path.join(os.path.dirname(__file__), '../sentiment_analysis_model.pkl')
+def _record(texts, predictions, bundle, endpoint, scores=None):
+    """Hand served predictions to the prediction log and the drift sketches (both off the hot path)."""
+    prediction_log.record(texts, predictions, bundle.version, endpoint)
+    drift_monitor.observe(texts, predictions, bundle, scores)
 
-# Loading the model
-with open(SENTIMENT_ANALYSIS_MODEL_PATH, 'rb') as f:
-    sentiment_analysis_model = pickle.load(f)
 
-# Path to the TF-IDF vectorizer used during training
-SENTIMENT_ANALYSIS_VECTORIZER_PATH = os.path.join(os.path.dirname(__file__), '../sentiment_analysis_vectorizer.pkl')
+def _too_long(text):
+    """Return the 413 response of a text longer than ML_MAX_TEXT_CHARS, None otherwise."""
+    if len(text) > settings.ML_MAX_TEXT_CHARS:
+        return JsonResponse(
+            {"error": f"Texte trop long : {settings.ML_MAX_TEXT_CHARS} caractères maximum"},
+            status=413,
+        )
+    return None
 
-# Loading the vectorization model
-with open(SENTIMENT_ANALYSIS_VECTORIZER_PATH, 'rb') as f:
-    sentiment_analysis_vectorizer = pickle.load(f)
 
 # Sentiment Analysis Prediction View
 @csrf_exempt # allow POST requests without CSRF token (for Postman)
+@ml_throttle()
 def sentiment_analysis(request):
     """
     Predicts the sentiment of a given text via a POST request.
 
     Expected request (JSON) :
         {
-            "text": "text string to parse"
+            "text": "text string to parse",
+            "explain": true,  # optional, adds probabilities and top n-grams
+            "top_k": 5,       # optional, number of n-grams (1 to 50)
+            "windows": true   # optional, long texts only: adds the window scores
         }
 
     Response (JSON) :
@@ -40,8 +63,28 @@ def sentiment_analysis(request):
             "prediction": 0 fornegatve  # or 1 for positive
         }
 
+    Texts longer than ML_LONG_TEXT_CHARS are scored by overlapping windows
+    of words (see ml.services.predict_long_document) :
+        {
+            "prediction": 1,
+            "score": 0.83,               # probability of being positive
+            "windows": 12,
+            "window_scores": [0.91, ...] # with "windows": true
+        }
+
+    Response with "explain" (JSON) :
+        {
+            "prediction": 1,
+            "probabilities": {"0": 0.12, "1": 0.88},
+            "top_ngrams": [{"ngram": "super", "contribution": 1.92}, ...]
+        }
+
+    The X-Model-Version header names the model version that scored the text.
+
     Error codes :
-        - 400 : missing or empty field
+        - 400 : missing or empty field, invalid top_k, explain on a long text
+        - 413 : text longer than ML_MAX_TEXT_CHARS
+        - 429 : ML budget of the client spent (ml.throttling), see Retry-After
         - 500 : internal error (e.g. format or vectorization problem)
 
     Returns:
@@ -54,17 +97,343 @@ def sentiment_analysis(request):
             
             if not text:
                 return JsonResponse({"error": "Champ 'text' manquant"}, status=400)
+
+            error = _too_long(text)
+            if error is not None:
+                return error
+
+            if len(text) > settings.ML_LONG_TEXT_CHARS:
+                if body.get("explain"):
+                    return JsonResponse({"error": "Explication indisponible pour les textes longs"}, status=400)
+                bundle = active_model.get()
+                result = predict_long_document(text, bundle, bool(body.get("windows")))
+                _record([text], [result["prediction"]], bundle, "long", [result["score"]])
+                return _versioned(JsonResponse(result), bundle)
+
+            if body.get("explain"):
+                top_k = body.get("top_k", settings.ML_EXPLAIN_TOP_K)
+                if type(top_k) is not int or not 1 <= top_k <= 50:
+                    return JsonResponse({"error": "Champ 'top_k' invalide (entier entre 1 et 50)"}, status=400)
+                # One model version for the whole request, even during a hot reload
+                bundle = active_model.get()
+                result = explain_sentiment(text, top_k, bundle)
+                _record([text], [result["prediction"]], bundle, "explain", [result["probabilities"]["1"]])
+                return _versioned(JsonResponse(result), bundle)
             
-            # Text cleaning and preprocessing
-            cleaned = clean_text(text)
-            vectorized_text = sentiment_analysis_vectorizer.transform([cleaned])
-            
-            # Prediction
-            prediction = sentiment_analysis_model.predict(vectorized_text)[0]
+            # Text cleaning, preprocessing and prediction
+            bundle = active_model.get()
+            prediction = predict_sentiment(text, bundle)
+            _record([text], [prediction], bundle, "single")
             
-            return JsonResponse({"prediction": int(prediction)})
+            return _versioned(JsonResponse({"prediction": prediction}), bundle)
         
         except Exception as e:
             return JsonResponse({"error": str(e)}, status=500)
         
-    return JsonResponse({"error": "Méthode non autorisée"}, status=405)
\ No newline at end of file
+    return JsonResponse({"error": "Méthode non autorisée"}, status=405)
+
+
+# Async Sentiment Analysis Prediction View
+@csrf_exempt # allow POST requests without CSRF token (for Postman)
+@ml_throttle()
+async def sentiment_analysis_async(request):
+    """
+    Async variant of `sentiment_analysis`, meant to be served through ASGI
+    (weeb_api/asgi.py).
+
+    Same request, response and error codes as `sentiment_analysis`, "explain"
+    and long texts included. The scoring runs in a bounded thread pool
+    (ML_ASYNC_MAX_WORKERS) so that a single process can hold many slow client
+    connections at once; the model lookup and the prediction log / drift
+    hand-off run in threads too, never on the event loop.
+
+    Returns:
+        JsonResponse: Containing prediction or error.
+    """
+    if request.method == 'POST':
+        try:
+            body = json.loads(request.body)
+            text = body["text"]
+
+            if not text:
+                return JsonResponse({"error": "Champ 'text' manquant"}, status=400)
+
+            error = _too_long(text)
+            if error is not None:
+                return error
+
+            record = sync_to_async(_record, thread_sensitive=False)
+            # The first call of a process loads the model
+            bundle = await sync_to_async(active_model.get, thread_sensitive=False)()
+
+            if len(text) > settings.ML_LONG_TEXT_CHARS:
+                if body.get("explain"):
+                    return JsonResponse({"error": "Explication indisponible pour les textes longs"}, status=400)
+                result = await apredict_long_document(text, bundle, bool(body.get("windows")))
+                await record([text], [result["prediction"]], bundle, "long", [result["score"]])
+                return _versioned(JsonResponse(result), bundle)
+
+            if body.get("explain"):
+                top_k = body.get("top_k", settings.ML_EXPLAIN_TOP_K)
+                if type(top_k) is not int or not 1 <= top_k <= 50:
+                    return JsonResponse({"error": "Champ 'top_k' invalide (entier entre 1 et 50)"}, status=400)
+                result = await aexplain_sentiment(text, top_k, bundle)
+                await record([text], [result["prediction"]], bundle, "explain", [result["probabilities"]["1"]])
+                return _versioned(JsonResponse(result), bundle)
+
+            prediction = await apredict_sentiment(text, bundle)
+            await record([text], [prediction], bundle, "async")
+
+            return _versioned(JsonResponse({"prediction": prediction}), bundle)
+
+        except Exception as e:
+            return JsonResponse({"error": str(e)}, status=500)
+
+    return JsonResponse({"error": "Méthode non autorisée"}, status=405)
+
+
+# Batch Sentiment Analysis Prediction View
+@csrf_exempt # allow POST requests without CSRF token (for Postman)
+@ml_throttle(batch_cost)
+def sentiment_analysis_batch(request):
+    """
+    Predicts the sentiment of a list of texts via a single POST request.
+
+    The whole batch is cleaned, deduplicated, vectorized and predicted in one
+    pass. Invalid items (empty, not a string, longer than ML_MAX_TEXT_CHARS) do
+    not fail the request: they get their own error entry and the remaining
+    texts are still scored.
+
+    Expected request (JSON) :
+        {
+            "texts": ["first text", "second text", ...]
+        }
+
+    Response (JSON) :
+        {
+            "results": [
+                {"prediction": 1},
+                {"error": "Texte vide ou invalide"},
+                ...
+            ]
+        }
+
+    Error codes :
+        - 400 : missing 'texts' list or batch larger than ML_BATCH_MAX_SIZE
+        - 429 : ML budget of the client spent, charged per item (ml.throttling)
+        - 500 : internal error (e.g. format or vectorization problem)
+
+    Returns:
+        JsonResponse: Containing one result per input text, in input order.
+    """
+    if request.method == 'POST':
+        try:
+            # Already parsed by the throttle to count the items
+            body = json_body(request)
+            texts = body.get("texts") if isinstance(body, dict) else None
+
+            if not isinstance(texts, list) or not texts:
+                return JsonResponse({"error": "Champ 'texts' manquant ou invalide"}, status=400)
+
+            if len(texts) > settings.ML_BATCH_MAX_SIZE:
+                return JsonResponse(
+                    {"error": f"Trop de textes : {settings.ML_BATCH_MAX_SIZE} maximum par requête"},
+                    status=400,
+                )
+
+            # Only valid items go through the model, the others keep their error
+            valid_indexes = [
+                i for i, text in enumerate(texts)
+                if isinstance(text, str) and text and len(text) <= settings.ML_MAX_TEXT_CHARS
+            ]
+            bundle = active_model.get()
+            valid_texts = [texts[i] for i in valid_indexes]
+            predictions = predict_sentiments(valid_texts, bundle)
+            _record(valid_texts, predictions, bundle, "batch")
+
+            results = [
+                {"error": f"Texte trop long : {settings.ML_MAX_TEXT_CHARS} caractères maximum"}
+                if isinstance(text, str) and len(text) > settings.ML_MAX_TEXT_CHARS
+                else {"error": "Texte vide ou invalide"}
+                for text in texts
+            ]
+            for i, prediction in zip(valid_indexes, predictions):
+                results[i] = {"prediction": prediction}
+
+            return _versioned(JsonResponse({"results": results}), bundle)
+
+        except Exception as e:
+            return JsonResponse({"error": str(e)}, status=500)
+
+    return JsonResponse({"error": "Méthode non autorisée"}, status=405)
+
+
+# Sentiment Feedback View
+@ml_throttle(unit_cost)
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def sentiment_feedback(request):
+    """
+    Stores the correct label of a text, to correct the predictions of the model.
+
+    Feedback is only stored here: `manage.py apply_feedback` learns the
+    pending feedback incrementally and publishes a new model version
+    (ml/feedback.py). As it ends up in the served model, it is only
+    accepted from authenticated users (JWT) and records who sent it.
+
+    Expected request (JSON) :
+        {
+            "text": "text string that was mispredicted",
+            "label": 1  # 0 for negative, 1 for positive
+        }
+
+    Response (JSON, 201) :
+        {
+            "id": 42
+        }
+
+    Error codes :
+        - 400 : missing or empty text, label other than 0 or 1
+        - 401 : not authenticated
+        - 413 : text longer than ML_MAX_TEXT_CHARS
+        - 429 : ML budget of the client spent (ml.throttling)
+        - 500 : internal error
+
+    Returns:
+        JsonResponse: Containing the feedback id or error.
+    """
+    if request.method == 'POST':
+        try:
+            body = json.loads(request.body)
+            text = body.get("text") if isinstance(body, dict) else None
+            label = body.get("label") if isinstance(body, dict) else None
+
+            if not isinstance(text, str) or not text:
+                return JsonResponse({"error": "Champ 'text' manquant"}, status=400)
+
+            if type(label) is not int or label not in (0, 1):
+                return JsonResponse({"error": "Champ 'label' invalide (0 ou 1)"}, status=400)
+
+            error = _too_long(text)
+            if error is not None:
+                return error
+
+            feedback = SentimentFeedback.objects.create(
+                text=text, label=label, model_version=active_model.get().version, user=request.user,
+            )
+            return JsonResponse({"id": feedback.id}, status=201)
+
+        except Exception as e:
+            return JsonResponse({"error": str(e)}, status=500)
+
+    return JsonResponse({"error": "Méthode non autorisée"}, status=405)
+
+
+def _read_ndjson_lines(request, max_bytes):
+    """
+    Yield the lines of a request body one at a time, without reading the whole body.
+
+    Lines longer than `max_bytes` are skipped and yielded as None, so a single
+    huge line cannot grow the memory of the worker either.
+    """
+    while True:
+        line = request.readline(max_bytes + 1)
+        if not line:
+            return
+        if len(line) > max_bytes and not line.endswith(b"\n"):
+            while line and not line.endswith(b"\n"):
+                line = request.readline(max_bytes + 1)
+            yield None
+        elif line.strip():
+            yield line
+
+
+def _parse_ndjson_item(line):
+    """
+    Return the (id, text) of an NDJSON request line, text None when invalid.
+
+    A line is either a JSON string or an object {"text": ..., "id": ...}.
+    """
+    if line is None:
+        return None, None
+    try:
+        item = json.loads(line)
+    except ValueError:
+        return None, None
+    if isinstance(item, dict):
+        return item.get("id"), item.get("text")
+    return None, item
+
+
+def _score_ndjson_chunk(items, bundle):
+    """Score a chunk of parsed lines and return their NDJSON results."""
+    valid_indexes = [i for i, (_, text) in enumerate(items) if isinstance(text, str) and text]
+    valid_texts = [items[i][1] for i in valid_indexes]
+    predictions = predict_sentiments(valid_texts, bundle)
+    _record(valid_texts, predictions, bundle, "stream")
+
+    results = [{"error": "Texte vide ou invalide"} for _ in items]
+    for i, prediction in zip(valid_indexes, predictions):
+        results[i] = {"prediction": prediction}
+    for (item_id, _), result in zip(items, results):
+        if item_id is not None:
+            result["id"] = item_id
+
+    return "".join(json.dumps(result) + "\n" for result in results).encode()
+
+
+def _stream_ndjson_results(lines, bundle):
+    """Score parsed lines by chunks of ML_STREAM_CHUNK_SIZE, yielding each chunk's results."""
+    chunk = []
+    try:
+        for line in lines:
+            chunk.append(_parse_ndjson_item(line))
+            if len(chunk) >= settings.ML_STREAM_CHUNK_SIZE:
+                yield _score_ndjson_chunk(chunk, bundle)
+                chunk = []
+        if chunk:
+            yield _score_ndjson_chunk(chunk, bundle)
+    except Exception as e:
+        # The status line is already sent: report the failure as the last line
+        yield (json.dumps({"error": str(e)}) + "\n").encode()
+
+
+# Streaming Sentiment Analysis Prediction View
+@csrf_exempt # allow POST requests without CSRF token (for Postman)
+@ml_throttle(stream_cost)
+def sentiment_analysis_stream(request):
+    """
+    Predicts the sentiment of an unbounded number of texts sent as NDJSON.
+
+    The request body is read line by line and scored in chunks of
+    ML_STREAM_CHUNK_SIZE texts; the results of each chunk are streamed back
+    before the next chunk is read. Neither the request nor the response is
+    ever held in memory as a whole, whatever the payload size.
+
+    Expected request (NDJSON, one text per line) :
+        {"id": 1, "text": "first text"}
+        "second text"
+
+    Response (NDJSON, one result per non-blank input line, in input order) :
+        {"prediction": 1, "id": 1}
+        {"prediction": 0}
+        {"error": "Texte vide ou invalide"}
+
+    Lines that are not valid JSON, have no text or exceed
+    ML_STREAM_MAX_LINE_BYTES get an error result. An unexpected error stops
+    the stream with a final {"error": ...} line. Requests over the ML budget
+    of the client get a 429 before anything is read (ml.throttling).
+
+    Returns:
+        StreamingHttpResponse: The NDJSON results.
+    """
+    if request.method == 'POST':
+        bundle = active_model.get()
+        lines = _read_ndjson_lines(request, settings.ML_STREAM_MAX_LINE_BYTES)
+        response = StreamingHttpResponse(
+            _stream_ndjson_results(lines, bundle),
+            content_type="application/x-ndjson",
+        )
+        return _versioned(response, bundle)
+
+    return JsonResponse({"error": "Méthode non autorisée"}, status=405)
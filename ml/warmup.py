@@ -0,0 +1,165 @@
+"""
+Warm-up of the sentiment model when a worker starts (ML_WARMUP_ENABLED).
+
+The first requests of a fresh process are slow: the artifacts are loaded
+lazily, sklearn/numpy take their first-call code paths, the array pages are
+touched for the first time and the regexes of the cleaning and of the
+vectorizer are compiled. `warmup` runs a corpus through the same path as the
+endpoints (clean_text -> vectorizer -> model, one text at a time then as one
+batch, prediction cache bypassed) before the process reports itself ready on
+/api/monitoring/ready/.
+
+With ML_SIDECAR_ENABLED, the workers do not hold the artifacts (ml/sidecar.py):
+their warm-up only runs the cleaning, and `manage.py ml_sidecar` warms the
+model up in the sidecar before listening.
+
+It is started in a background thread by `MlConfig.ready`, so the server keeps
+booting meanwhile. With a preloaded gunicorn master, the master waits for it
+before forking (gunicorn.conf.py) and the workers inherit a warm process.
+"""
+
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+
+from utils import clean_text, clean_texts
+
+
+logger = logging.getLogger(__name__)
+
+# Used when ML_WARMUP_CORPUS is empty: short, medium and long texts
+DEFAULT_CORPUS = [
+    "Super !",
+    "Nul.",
+    "Super article, j'adore !",
+    "Nul, une perte de temps.",
+    "Le site répond globalement aux attentes",
+    "Je ne suis pas content du tout, service client horrible",
+    "Salut @bob ! Regarde https://t.co/xyz c'est génial #anime 2024 © vraiment top...",
+    " ".join(["Ce film est vraiment super, je le recommande à tout le monde (9/10) !"] * 30),
+]
+
+
+def load_corpus(path):
+    """
+    Return the warm-up texts: the non-blank lines of `path`, or DEFAULT_CORPUS.
+
+    Args:
+        path (str): UTF-8 text file with one text per line, or "".
+
+    Returns:
+        list[str]: The texts.
+    """
+    if not path:
+        return list(DEFAULT_CORPUS)
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+class WarmUp:
+    """
+    Warm-up state of the current process: pending, running, done or failed.
+
+    A failed warm-up leaves the process not ready, as the endpoints would fail
+    the same way.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread = None
+        self._pid = None
+        self.state = "pending"
+        self.texts = 0
+        self.seconds = None
+        self.model_version = None
+        self.error = None
+
+    def run(self):
+        """Warm the served model up in the calling thread and record the outcome."""
+        from .registry import active_model
+        from .services import _predict_cleaned
+
+        with self._lock:
+            self.state = "running"
+        started = time.perf_counter()
+        try:
+            texts = load_corpus(settings.ML_WARMUP_CORPUS)
+            bundle = active_model.get()
+            for _ in range(settings.ML_WARMUP_ROUNDS):
+                if settings.ML_SIDECAR_ENABLED:
+                    # The artifacts live in the sidecar, which warms itself
+                    # up: only the cleaning runs here, the model is not loaded
+                    clean_texts(texts)
+                    continue
+                for text in texts:
+                    _predict_cleaned([clean_text(text)], bundle)
+                _predict_cleaned(clean_texts(texts), bundle)
+        except Exception as e:
+            logger.exception("ML warm-up failed")
+            with self._lock:
+                self.state, self.error = "failed", str(e)
+        else:
+            with self._lock:
+                self.state, self.texts, self.model_version = "done", len(texts), bundle.version
+        finally:
+            self.seconds = round(time.perf_counter() - started, 3)
+            self._done.set()
+
+    def start(self):
+        """Run the warm-up in a background thread, once per process."""
+        with self._lock:
+            if self._pid == os.getpid() or self.state == "done":
+                # Started here already, or finished in the parent before a fork
+                return
+            self._pid = os.getpid()
+            self._done.clear()
+            self.state = "pending"
+            self._thread = threading.Thread(target=self.run, name="ml-warmup", daemon=True)
+            self._thread.start()
+
+    def wait(self, timeout=None):
+        """
+        Wait for a started warm-up to finish.
+
+        Returns:
+            bool: True once it is finished, successfully or not.
+        """
+        if self._thread is None:
+            return True
+        return self._done.wait(timeout)
+
+    def is_ready(self):
+        """Return whether the process can be sent traffic."""
+        return self.state == "done" or (not settings.ML_WARMUP_ENABLED and self.state == "pending")
+
+    def status(self):
+        """
+        Return the warm-up state of this process.
+
+        Returns:
+            dict: ready flag, state, number of texts, duration in seconds,
+            model version warmed up and error message.
+        """
+        with self._lock:
+            return {
+                "ready": self.is_ready(),
+                "state": self.state,
+                "texts": self.texts,
+                "seconds": self.seconds,
+                "model_version": self.model_version,
+                "error": self.error,
+            }
+
+    def reset(self):
+        """Forget the warm-up of this process (tests)."""
+        with self._lock:
+            self._thread = self._pid = None
+            self._done.clear()
+            self.state, self.texts, self.seconds, self.model_version, self.error = "pending", 0, None, None, None
+
+
+warmup = WarmUp()
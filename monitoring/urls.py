@@ -1,7 +1,10 @@
 from django.urls import path
-from .views import health_check, trigger_error
+from .views import health_check, readiness_check, trigger_error, ml_stats, drift_stats
 
 urlpatterns = [
     path('health/', health_check, name='health_check'),
+    path('ready/', readiness_check, name='readiness_check'),
     path('error/', trigger_error, name='trigger_error'),
+    path('ml/', ml_stats, name='ml_stats'),
+    path('drift/', drift_stats, name='drift_stats'),
 ]
@@ -1,10 +1,54 @@
 from django.http import JsonResponse
+from django.conf import settings
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from ml.cache import prediction_cache
+from ml.drift import merged_summary
+from ml.prediction_log import prediction_log
+from ml.registry import active_model
+from ml.sidecar import sidecar_client
+from ml.warmup import warmup
 
 def health_check(request):
     """Une vue simple qui renvoie un statut de succès."""
     return JsonResponse({"status": "ok", "message": "API is healthy"})
 
+def readiness_check(request):
+    """Une vue qui renvoie 503 tant que le modèle de ce worker n'est pas préchauffé."""
+    status = warmup.status()
+    if not status["ready"]:
+        return JsonResponse({"status": "not_ready", "warmup": status}, status=503)
+    return JsonResponse({"status": "ready", "warmup": status})
+
 def trigger_error(request):
     """Une vue conçue pour créer une erreur 500."""
     division_by_zero = 1 / 0
-    return JsonResponse({"this": "will never be returned"})
\ No newline at end of file
+    return JsonResponse({"this": "will never be returned"})
+
+def ml_stats(request):
+    """Une vue qui expose les compteurs du service de prédiction (worker courant)."""
+    stats = {"model": active_model.status(), "prediction_cache": prediction_cache.stats(),
+             "prediction_log": prediction_log.stats(), "warmup": warmup.status()}
+    if settings.ML_SIDECAR_ENABLED:
+        stats["sidecar"] = sidecar_client.stats()
+    if settings.ML_COALESCE_ENABLED:
+        from ml.services import get_coalescer
+        stats["coalescer"] = get_coalescer().stats()
+    return JsonResponse(stats)
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def drift_stats(request):
+    """
+    Une vue qui fusionne les sketches de dérive des entrées de tous les workers (?minutes=60).
+
+    Réservée aux administrateurs : les tokens inconnus les plus fréquents sont
+    des mots envoyés par les utilisateurs.
+    """
+    try:
+        minutes = int(request.GET.get("minutes", 60))
+    except ValueError:
+        return JsonResponse({"error": "Paramètre 'minutes' invalide"}, status=400)
+    if minutes < 1:
+        return JsonResponse({"error": "Paramètre 'minutes' invalide"}, status=400)
+    return JsonResponse(merged_summary(minutes))
@@ -2,19 +2,36 @@
 Train a sentiment analysis model on a labeled tweet dataset.
 
 Main steps:
-1. Download and load the dataset
-2. Clean the text data
+1. Download the dataset (skipped when the cached copy has the same checksum)
+2. Clean the text data (skipped when the cleaned corpus for this dataset and
+   cleaning code is cached, see ml/dataset.py)
 3. Vectorize using TF-IDF
 4. Split into training and test sets
 5. Train a logistic regression model
 6. Evaluate performance
 7. Save the model and the vectorizer for later use
+8. Export them as the fused linear scorer artifact (ml/linear.py)
+
+With --sweep, steps 4 to 8 are replaced by a grid of configurations whose
+quality, artifact size, loaded memory and latency are written to a JSON
+report (ml/sweep.py).
+
+With --streaming, the whole pipeline runs out-of-core instead: the CSV is
+read by chunks, hashed (no vocabulary) and learned with partial_fit, so
+memory does not grow with the dataset (ml/streaming.py).
 """
 
 # === Library imports ===
 
+# Command line, paths and stage timings
+import argparse
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
 # Data manipulation
-import gdown
 import pandas as pd
 
 # Visualisation (optionnal but useful)
@@ -36,110 +53,254 @@ from sklearn.metrics import accuracy_score, classification_report, roc_auc_score
 # Save models
 import pickle
 
-# Text preprocessing
-from utils import clean_text
-
-# === Step 1: Download and load the dataset ===
-
-# Google Drive public file ID and download target
-file_id = "17jeCw3TisLxDOtS5d3PXSF5G4mc4zWwq"
-output = "data.csv"
-
-print("\n📥 Downloading dataset from Google Drive...")
-gdown.download(f"https://drive.google.com/uc?id={file_id}", output, quiet=False)
-print("✅ Dataset downloaded.\n")
-
-# Read the CSV into a DataFrame
-df = pd.read_csv(output)
-
-print("📝 Preview of the dataset:")
-print(df.head(), "\n")
-
-print("📊 Available columns:")
-print(df.columns)
-print("\n")
-
-print("📈 Class distribution (positive/negative tweets):")
-print(df['label'].value_counts(), "\n")
-
-print("🔍 Missing values in the dataset:")
-df = df.dropna(subset=['comment', 'label'])
-print(df.isna().sum(), "\n")
-
-# === Step 2: Text cleaning ===
-
-print("🧹 Cleaning text data...")
-df['comment'] = df['comment'].astype(str)
-df['clean_text'] = df['comment'].apply(clean_text)
-print("✅ Text cleaned.\n")
-
-# === Step 3: Train/Test Split ===
-
-print("✂️ Splitting data: 80% train / 20% test...")
-X_train, X_test, y_train, y_test = train_test_split(df['clean_text'], df['label'], test_size=0.2, random_state=42)
-print("✅ Data split complete.\n")
-
-# === Step 4: TF-IDF Vectorization ===
-
-print("🧠 Vectorizing text using TF-IDF...")
-vectorizer = TfidfVectorizer(max_features=20000, ngram_range=(1,2), max_df=1.0, min_df=5)  # Unigrams + bigrames
-# max_features=20000: limits the dimensionality to prevent overfitting.
-# ngram_range=(1,2): takes word pairs into account (e.g., "très bien", "pas content").
-
-# Fit only on the training set
-vectorizer.fit(X_train)
-X_train_vect = vectorizer.transform(X_train)
-X_test_vect = vectorizer.transform(X_test)
-print("✅ Text vectorized.\n")
-
-# === Step 5: Train the Logistic Regression model ===
-
-print("⚙️ Training logistic regression model...")
-model = LogisticRegression(max_iter=50000, solver='saga', n_jobs=-1)
-model.fit(X_train_vect, y_train)
-print("✅ Model trained.\n")
-
-# === Step 6: Model Evaluation ===
-
-print("📏 Model evaluation:\n")
-
-y_pred = model.predict(X_test_vect)
-
-print("✅ Accuracy:", round(accuracy_score(y_test, y_pred), 3), "\n")
-print("✅ ROC AUC Score:", round(roc_auc_score(y_test, y_pred), 3), "\n")
-
-print("✅ Classification report:\n")
-print(classification_report(y_test, y_pred))
+# Cached download, parallel text preprocessing and vectorization
+from ml.dataset import fetch_raw_dataset, load_clean_corpus, parallel_transform
+
+# Fused linear scorer export
+from ml.linear import compact_linear_model, compaction_report, export_linear_model
+
+# Model selection sweep
+from ml.sweep import run_sweep, write_report
+
+# Out-of-core training
+from ml.streaming import train_streaming
+
+# Wall-clock seconds of each stage, printed at the end of the run
+timings = {}
+
+
+@contextmanager
+def stage(name):
+    started = time.perf_counter()
+    yield
+    timings[name] = time.perf_counter() - started
+
+
+def main():
+    # === Command line ===
+
+    parser = argparse.ArgumentParser(description="Train the sentiment analysis model.")
+    parser.add_argument(
+        "--cache-dir", default=os.getenv("TRAIN_CACHE_DIR", ".cache/train"),
+        help="Cache of the downloaded and cleaned dataset (default: .cache/train)",
+    )
+    parser.add_argument(
+        "--dataset-sha256", default=os.getenv("TRAIN_DATASET_SHA256"),
+        help="Expected SHA-256 of data.csv; the download is rejected when it differs",
+    )
+    parser.add_argument(
+        "--refresh-dataset", action="store_true",
+        help="Download data.csv again instead of reusing the cached copy (e.g. after the file was updated)",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count(),
+        help="Processes used to clean and vectorize the texts (default: all CPUs)",
+    )
+    parser.add_argument(
+        "--sweep", action="store_true",
+        help="Train a grid of configurations and write a report instead of saving a model",
+    )
+    parser.add_argument("--grid", help="JSON file of the settings to sweep (default: ml.sweep.DEFAULT_GRID)")
+    parser.add_argument("--report", default="sweep_report.json", help="Sweep report path (default: sweep_report.json)")
+    parser.add_argument(
+        "--latency-samples", type=int, default=500,
+        help="Test texts predicted one at a time to measure the sweep latencies (default: 500)",
+    )
+    parser.add_argument(
+        "--streaming", action="store_true",
+        help="Train out-of-core with a hashing vectorizer and partial_fit (bounded memory, see ml/streaming.py)",
+    )
+    parser.add_argument("--chunk-size", type=int, default=50000, help="--streaming: rows read at a time")
+    parser.add_argument("--epochs", type=int, default=3, help="--streaming: passes over the data")
+    parser.add_argument("--n-features", type=int, default=2 ** 20, help="--streaming: size of the hashing space")
+    parser.add_argument(
+        "--compact-threshold", type=float,
+        help="Also write 'sentiment_analysis_linear_compact/' without the features whose |coef| is below it",
+    )
+    parser.add_argument(
+        "--compact-dtype", choices=["float32", "float16"], default="float32",
+        help="--compact-threshold: precision of the compact idf/coef (default: float32)",
+    )
+    args = parser.parse_args()
+
+    if args.streaming:
+        return train_streaming_model(args)
+
+    # === Step 1: Download the dataset (cached by checksum) ===
+    # === Step 2: Text cleaning (cached by dataset checksum + cleaning code) ===
+
+    print(f"\n📥 Preparing the cleaned dataset (cache: {args.cache_dir})...")
+    texts, labels, stages = load_clean_corpus(
+        args.cache_dir, sha256=args.dataset_sha256, workers=args.workers, refresh=args.refresh_dataset,
+    )
+    timings.update(stages["timings"])
+    print(f"✅ Dataset {'downloaded' if stages['downloaded'] else 'found in cache'} (sha256 {stages['raw_sha256'][:12]}).")
+    print(f"✅ Text {'cleaned' if stages['cleaned'] else 'loaded already cleaned'}: {len(texts)} comments.\n")
+
+    print("📈 Class distribution (positive/negative tweets):")
+    print(pd.Series(labels).value_counts(), "\n")
+
+    # === Step 3: Train/Test Split ===
+
+    print("✂️ Splitting data: 80% train / 20% test...")
+    with stage("split"):
+        X_train, X_test, y_train, y_test = train_test_split(texts, labels, test_size=0.2, random_state=42)
+    print("✅ Data split complete.\n")
+
+    # === Sweep mode: measure a grid of configurations, save no model ===
+
+    if args.sweep:
+        grid = None
+        if args.grid:
+            with open(args.grid, encoding="utf-8") as f:
+                grid = json.load(f)
+
+        print("🔬 Sweeping configurations...")
+        with stage("sweep"):
+            results = run_sweep(X_train, X_test, y_train, y_test, grid=grid, latency_samples=args.latency_samples)
+        write_report(
+            args.report, results,
+            created_at=datetime.now(timezone.utc).isoformat(),
+            dataset_sha256=stages["raw_sha256"],
+            train_size=len(X_train),
+            test_size=len(X_test),
+            latency_samples=min(args.latency_samples, len(X_test)),
+        )
+        print(f"✅ Report written to {args.report}. Pareto-optimal configurations:")
+        for result in results:
+            if result["pareto"]:
+                print(f"   {json.dumps(result['config'])}")
+        print()
+        print_timings()
+        return
+
+    # === Step 4: TF-IDF Vectorization ===
+
+    print("🧠 Vectorizing text using TF-IDF...")
+    vectorizer = TfidfVectorizer(max_features=20000, ngram_range=(1,2), max_df=1.0, min_df=5)  # Unigrams + bigrames
+    # max_features=20000: limits the dimensionality to prevent overfitting.
+    # ngram_range=(1,2): takes word pairs into account (e.g., "très bien", "pas content").
+
+    # Fit only on the training set, vectorizing it in the same pass
+    with stage("fit_transform"):
+        X_train_vect = vectorizer.fit_transform(X_train)
+    # The test set is vectorized in chunks across the worker processes
+    with stage("transform"):
+        X_test_vect = parallel_transform(vectorizer, X_test, workers=args.workers)
+    print("✅ Text vectorized.\n")
+
+    # === Step 5: Train the Logistic Regression model ===
+
+    print("⚙️ Training logistic regression model...")
+    model = LogisticRegression(max_iter=50000, solver='saga', n_jobs=-1)
+    with stage("train"):
+        model.fit(X_train_vect, y_train)
+    print("✅ Model trained.\n")
+
+    # === Step 6: Model Evaluation ===
+
+    print("📏 Model evaluation:\n")
+
+    with stage("predict"):
+        y_pred = model.predict(X_test_vect)
+
+    print("✅ Accuracy:", round(accuracy_score(y_test, y_pred), 3), "\n")
+    print("✅ ROC AUC Score:", round(roc_auc_score(y_test, y_pred), 3), "\n")
+
+    print("✅ Classification report:\n")
+    print(classification_report(y_test, y_pred))
+
+    print("✅ Confusion matrix (text):\n")
+    print(pd.crosstab(y_test, y_pred, rownames=['Actual'], colnames=['Predicted']), "\n")
+
+    # === Step 7: Confusion Matrix Visualization ===
+
+    print("📊 Visualizing confusion matrix...\n")
+
+    cm = confusion_matrix(y_test, y_pred)
+    labels = ['Negative', 'Positive']
+
+    plt.figure(figsize=(6, 4))
+    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', xticklabels=labels, yticklabels=labels)
+    plt.xlabel('Predicted')
+    plt.ylabel('Actual')
+    plt.title('Confusion Matrix')
+    plt.tight_layout()
+    plt.show() 
+
+
+    # === Step 8: Save the model and vectorizer ===
+
+    save_artifacts(vectorizer, model)
+
+    if args.compact_threshold is not None:
+        save_compact_artifact(args.compact_threshold, args.compact_dtype, X_test, y_test)
+
+
+def save_compact_artifact(threshold, dtype, X_test, y_test):
+    """--compact-threshold: prune and quantize the linear artifact, then compare it on the test set."""
+    print(f"🗜️ Compacting the linear scorer (|coef| >= {threshold}, {dtype})...")
+    kept = compact_linear_model("sentiment_analysis_linear", "sentiment_analysis_linear_compact", threshold, dtype)
+    report = compaction_report("sentiment_analysis_linear", "sentiment_analysis_linear_compact", X_test, y_test)
+    print(f"✅ {kept} features kept in 'sentiment_analysis_linear_compact/'.\n")
+    for name in ("full", "compact"):
+        stats = report[name]
+        print(f"   {name:<8} {stats['features']:>7} features  {stats['size_bytes'] / 1024:8.0f} KiB  "
+              f"load {stats['load_ms']:7.2f} ms  {stats['resident_bytes'] / 1024:8.0f} KiB  "
+              f"accuracy {stats['accuracy']:.4f}")
+    print(f"   accuracy delta {report['accuracy_delta']:+.4f}, same prediction on {report['agreement']:.2%} of the texts\n")
+
+
+def print_timings():
+    """Print the wall-clock time of every stage run so far."""
+    print("⏱️ Wall-clock time per stage:")
+    for name, seconds in timings.items():
+        print(f"   {name:<14} {seconds:8.2f}s")
+    print()
+
+
+def save_artifacts(vectorizer, model):
+    """Save the model and the vectorizer, export the linear artifact and print the stage timings."""
+    print("💾 Saving trained model to 'sentiment_analysis_model.pkl'...")
+    with open("sentiment_analysis_model.pkl", "wb") as f:
+        pickle.dump(model, f)
+    print("✅ Model saved.\n")
 
-print("✅ Confusion matrix (text):\n")
-print(pd.crosstab(y_test, y_pred, rownames=['Actual'], colnames=['Predicted']), "\n")
+    print("💾 Saving vectorizer to 'sentiment_analysis_vectorizer.pkl'...")
+    with open('sentiment_analysis_vectorizer.pkl', 'wb') as f:
+        pickle.dump(vectorizer, f)
+    print("✅ Vectorizer saved.\n")
 
-# === Step 7: Confusion Matrix Visualization ===
+    print("💾 Exporting fused linear scorer to 'sentiment_analysis_linear/'...")
+    export_linear_model(vectorizer, model, "sentiment_analysis_linear")
+    print("✅ Linear scorer exported.\n")
 
-print("📊 Visualizing confusion matrix...\n")
+    print_timings()
 
-cm = confusion_matrix(y_test, y_pred)
-labels = ['Negative', 'Positive']
+    print("🎉 Training complete! The model is now ready to be used in an API or web app.\n")
 
-plt.figure(figsize=(6, 4))
-sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', xticklabels=labels, yticklabels=labels)
-plt.xlabel('Predicted')
-plt.ylabel('Actual')
-plt.title('Confusion Matrix')
-plt.tight_layout()
-plt.show() 
 
+def train_streaming_model(args):
+    """--streaming: out-of-core training on the raw CSV (ml/streaming.py), then the usual save."""
+    print(f"\n📥 Fetching the dataset (cache: {args.cache_dir})...")
+    with stage("fetch"):
+        raw_path, raw_sha256 = fetch_raw_dataset(
+            args.cache_dir, sha256=args.dataset_sha256, refresh=args.refresh_dataset,
+        )
+    print(f"✅ Dataset ready (sha256 {raw_sha256[:12]}).\n")
 
-# === Step 8: Save the model and vectorizer ===
+    print(f"🌊 Streaming training: chunks of {args.chunk_size} rows, {args.epochs} epochs...")
+    vectorizer, model, metrics = train_streaming(
+        raw_path, args.cache_dir, chunk_size=args.chunk_size, epochs=args.epochs, n_features=args.n_features,
+    )
+    timings.update(metrics["timings"])
+    print(f"✅ Model trained on {metrics['train_rows']} rows.\n")
+    print(f"✅ Holdout accuracy ({metrics['holdout_rows']} rows):", round(metrics["accuracy"], 3), "\n")
 
-print("💾 Saving trained model to 'sentiment_analysis_model.pkl'...")
-with open("sentiment_analysis_model.pkl", "wb") as f:
-    pickle.dump(model, f)
-print("✅ Model saved.\n")
+    save_artifacts(vectorizer, model)
 
-print("💾 Saving TF-IDF vectorizer to 'sentiment_analysis_vectorizer.pkl'...")
-with open('sentiment_analysis_vectorizer.pkl', 'wb') as f:
-    pickle.dump(vectorizer, f)
-print("✅ Vectorizer saved.\n")
 
-print("🎉 Training complete! The model is now ready to be used in an API or web app.\n")
+# Worker processes re-import this module when they are spawned (Windows, macOS):
+# the training itself must only run in the main process
+if __name__ == "__main__":
+    main()
@@ -1 +1 @@
-from .text_utils import clean_text
+from .text_utils import clean_text, clean_texts, iter_clean_tokens
@@ -0,0 +1,90 @@
+import random
+
+import pandas as pd
+import pytest
+
+from utils.text_utils import clean_text, clean_texts, iter_clean_tokens, reference_clean_text
+
+
+# Hand-written corpus covering every cleaning step and their interactions
+EQUIVALENCE_CORPUS = [
+    "",
+    "   ",
+    "Bonjour",
+    "Ce film est VRAIMENT super !!!",
+    "Salut @bob, regarde https://t.co/xyz c'est génial #anime",
+    "www.example.com et http://a.b/c?d=e&f=g#h en plein milieu",
+    "Episode 12 © 2024 — 3 étoiles sur 5",
+    "tabs\tand\nnew\r\nlines\xa0and unicode spaces",
+    "@http://x.y",
+    "x@www.y z",
+    "@ahttp://z b",
+    "@abchttp",
+    "@#abc",
+    "x#@y",
+    "###",
+    "@",
+    "mention@user_name123 suite",
+    "chiffres arabes ٣٤ et exposants ² ⅷ",
+    "İstanbul ǅ ß Ω",
+    "Emoji 😍🔥 et ponctuation «guillemets» … fin.",
+    "https",
+    "httpsx",
+    "wwwhttp://a",
+]
+
+# Random strings built from fragments that exercise the tricky transitions
+FRAGMENTS = [
+    "http", "https", "www", "://", "@", "#", "a", "É", "ß", "1", "٣", "©",
+    ".", " ", "\t", "\n", "\xa0", "_", "x", "w", "h", "t", "p", "s", "!", "é",
+]
+
+
+def _random_corpus(size=2000, seed=42):
+    """Return a reproducible corpus of random fragment combinations."""
+    rng = random.Random(seed)
+    return [
+        "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 20)))
+        for _ in range(size)
+    ]
+
+
+@pytest.mark.parametrize("text", EQUIVALENCE_CORPUS)
+def test_clean_text_matches_reference_on_corpus(text):
+    """The optimized cleaner produces the same output as the original one."""
+    assert clean_text(text) == reference_clean_text(text)
+
+
+def test_clean_text_matches_reference_on_random_corpus():
+    """The optimized cleaner matches the original one on random inputs."""
+    for text in _random_corpus():
+        assert clean_text(text) == reference_clean_text(text), repr(text)
+
+
+def test_clean_text_example():
+    """URLs, mentions, punctuation, digits and extra spaces are removed."""
+    text = "Salut @bob ! Regarde https://t.co/xyz   c'est TOP #anime 2024 ©"
+    assert clean_text(text) == "salut regarde cest top anime"
+
+
+def test_clean_texts_on_list():
+    """A list of texts is cleaned in order."""
+    assert clean_texts(["Hello!", "World 42"]) == ["hello", "world"]
+
+
+def test_clean_texts_on_series_keeps_index_and_name():
+    """A pandas Series is cleaned into a Series with the same index and name."""
+    series = pd.Series(["Hello!", "World 42"], index=[10, 20], name="comment")
+    cleaned = clean_texts(series)
+
+    assert isinstance(cleaned, pd.Series)
+    assert list(cleaned.index) == [10, 20]
+    assert cleaned.name == "comment"
+    assert list(cleaned) == ["hello", "world"]
+
+
+@pytest.mark.parametrize("chunk_chars", [1, 3, 7, 65536])
+def test_iter_clean_tokens_matches_clean_text(chunk_chars):
+    """Cleaning by pieces cut on whitespace yields the words of `clean_text`."""
+    for text in EQUIVALENCE_CORPUS + _random_corpus(500):
+        assert " ".join(iter_clean_tokens(text, chunk_chars)) == clean_text(text), repr(text)
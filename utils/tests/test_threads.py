@@ -0,0 +1,22 @@
+import threading
+
+from utils.threads import ProcessThread
+
+
+def test_thread_is_started_once_and_restarted_when_dead():
+    """ensure starts the thread on first use only, and again once it stopped."""
+    stop = threading.Event()
+    starts = []
+    thread = ProcessThread(stop.wait, "test-thread")
+
+    assert thread.ensure(starts.append) is True
+    assert thread.ensure(starts.append) is False
+    assert thread.is_running()
+
+    stop.set()
+    thread.join(5)
+    assert not thread.is_running()
+    assert thread.ensure(starts.append) is True
+    # Only the first start happens in a new process
+    assert starts == [True, False]
+    thread.join(5)
@@ -0,0 +1,59 @@
+import os
+import threading
+
+
+class ProcessThread:
+    """
+    A daemon background thread started at most once per process.
+
+    Threads do not survive a fork: a gunicorn worker inherits the state of
+    the master but not its threads. `ensure` starts the thread on first use
+    in each process, and again if it died.
+
+    Args:
+        target (callable): Body of the thread.
+        name (str): Thread name.
+        lock: Lock (or Condition) of the owner, held while the thread is
+            started; a private lock by default.
+    """
+
+    def __init__(self, target, name, lock=None):
+        self.target = target
+        self.name = name
+        self._lock = lock if lock is not None else threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def is_running(self):
+        """Return whether the thread is alive in this process."""
+        return self._thread is not None and self._pid == os.getpid() and self._thread.is_alive()
+
+    def ensure(self, on_start=None):
+        """
+        Start the thread unless it already runs in this process.
+
+        Args:
+            on_start (callable): Called with the lock held right before the
+                thread starts, with True when the previous thread belonged to
+                another process (state inherited through a fork).
+
+        Returns:
+            bool: True if the thread was started by this call.
+        """
+        if self.is_running():
+            return False
+        with self._lock:
+            if self.is_running():
+                return False
+            forked = self._pid != os.getpid()
+            self._pid = os.getpid()
+            if on_start is not None:
+                on_start(forked)
+            self._thread = threading.Thread(target=self.target, name=self.name, daemon=True)
+            self._thread.start()
+            return True
+
+    def join(self, timeout=None):
+        """Wait for the thread of this process to stop, if it runs."""
+        if self.is_running():
+            self._thread.join(timeout)
@@ -1,13 +1,19 @@
+import json
 import os
+import tempfile
 
-def env_int(k):
+def env_int(k, default=None):
     """
     Read an environment variable and return it as an integer.
 
     Ensures that numeric environment variables are interpreted
-    as integers instead of strings.
+    as integers instead of strings. When the variable is not set,
+    `default` is returned if one is provided.
     """
-    return int(os.getenv(k))
+    value = os.getenv(k)
+    if value is None and default is not None:
+        return default
+    return int(value)
 
 def env_bool(k, default="False"):
     """
@@ -16,4 +22,16 @@ def env_bool(k, default="False"):
     Interprets common truthy values ("1", "true", "yes", "on")
     as True. All other values are considered False.
     """
-    return str(os.getenv(k)).strip().lower() in {"1","true","yes","on"}
\ No newline at end of file
+    return str(os.getenv(k, default)).strip().lower() in {"1","true","yes","on"}
+
+def write_json_atomically(path, data):
+    """
+    Write `data` as JSON to `path` so that readers never see a partial file.
+
+    The JSON is written to a temporary file of the same directory, then
+    renamed over `path`.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".tmp-")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
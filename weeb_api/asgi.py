@@ -3,6 +3,12 @@ ASGI config for weeb_api project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with an ASGI server, e.g.:
+    uvicorn weeb_api.asgi:application --workers 4
+
+Like wsgi.py it defaults to the development settings; set
+DJANGO_SETTINGS_MODULE=weeb_api.settings.production in production.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -11,6 +17,6 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "weeb_api.settings")
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "weeb_api.settings.development")
 
 application = get_asgi_application()
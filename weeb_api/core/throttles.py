@@ -33,3 +33,45 @@ class SiteWideIPThrottle(SimpleRateThrottle):
         if user and (user.is_staff or user.is_superuser):
             return None  # Remove this line if admin IPs should still be throttled
         return f"throttle_site:{self.get_ident(request)}"
+
+class MLCostThrottle(_AdminBypassMixin, UserRateThrottle):
+    """
+    Per-client budget of the ML prediction endpoints, charged by request cost.
+
+    The "ml" rate (e.g. "600/min") is a budget of cost units, not of requests:
+    each request is charged `cost` units (see ml.throttling), capped at the
+    whole budget. Clients are identified by user id when authenticated, by IP
+    otherwise; admin users are exempt.
+    """
+    scope = "ml"
+
+    def __init__(self, cost=1):
+        self.cost = cost
+        super().__init__()
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        # [timestamp, cost] of the requests still in the window, most recent first
+        self.history = [entry for entry in self.cache.get(self.key, []) if entry[0] > self.now - self.duration]
+        self.charge = min(self.cost, self.num_requests)
+        if sum(cost for _, cost in self.history) + self.charge > self.num_requests:
+            return self.throttle_failure()
+        self.history.insert(0, [self.now, self.charge])
+        self.cache.set(self.key, self.history, self.duration)
+        return True
+
+    def wait(self):
+        """Return the seconds until enough of the budget is freed for the denied request."""
+        spent = sum(cost for _, cost in self.history)
+        for timestamp, cost in reversed(self.history):
+            spent -= cost
+            if spent + self.charge <= self.num_requests:
+                return max(0.0, timestamp + self.duration - self.now)
+        return 0.0
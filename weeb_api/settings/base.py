@@ -14,7 +14,7 @@ from pathlib import Path
 import os
 from dotenv import load_dotenv
 from datetime import timedelta
-from utils.utils import env_int
+from utils.utils import env_int, env_bool
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
@@ -118,6 +118,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "weeb_api.wsgi.application"
+ASGI_APPLICATION = "weeb_api.asgi.application"
 
 # -------------------------------------------------------------------
 # django-axes configuration
@@ -153,6 +154,124 @@ AXES_NEVER_LOCKOUT_WHITELIST = os.getenv("AXES_NEVER_LOCKOUT_WHITELIST")
 AXES_IP_WHITELIST = os.environ.get('AXES_IP_WHITELIST', '').split(',')
 
 
+# -------------------------------------------------------------------
+# Machine learning (sentiment analysis) configuration
+# -------------------------------------------------------------------
+# Maximum number of texts accepted in one call to the batch
+# prediction endpoint (/api/ml/predict/sentiment-analysis/batch).
+ML_BATCH_MAX_SIZE = env_int("ML_BATCH_MAX_SIZE", 100)
+
+# Streaming NDJSON endpoint: number of texts scored (and results sent) at a
+# time, and maximum size of a request line. Memory use depends on these
+# values only, not on the size of the payload.
+ML_STREAM_CHUNK_SIZE = env_int("ML_STREAM_CHUNK_SIZE", 500)
+ML_STREAM_MAX_LINE_BYTES = env_int("ML_STREAM_MAX_LINE_BYTES", 65536)
+
+# Long texts. Texts longer than ML_MAX_TEXT_CHARS characters are rejected.
+# Texts longer than ML_LONG_TEXT_CHARS are cleaned as a stream of words and
+# scored by windows of ML_WINDOW_TOKENS words overlapping by ML_WINDOW_OVERLAP
+# (ml.services.predict_long_document) instead of in one piece.
+ML_MAX_TEXT_CHARS = env_int("ML_MAX_TEXT_CHARS", 1000000)
+ML_LONG_TEXT_CHARS = env_int("ML_LONG_TEXT_CHARS", 20000)
+ML_WINDOW_TOKENS = env_int("ML_WINDOW_TOKENS", 256)
+ML_WINDOW_OVERLAP = env_int("ML_WINDOW_OVERLAP", 16)
+
+# Scoring engine used by the sentiment endpoints:
+# "sklearn" = pickled TF-IDF vectorizer + logistic regression,
+# "linear"  = fused tokenize-and-score engine (ml/linear.py) loaded from
+#             ML_LINEAR_MODEL_DIR, exported with `manage.py export_linear_model`.
+ML_SCORING_ENGINE = os.getenv("ML_SCORING_ENGINE", "sklearn")
+ML_LINEAR_MODEL_DIR = os.getenv("ML_LINEAR_MODEL_DIR", str(BASE_DIR / "sentiment_analysis_linear"))
+
+# Memory-map the linear artifact (read-only .npy arrays, sorted vocabulary
+# array instead of a dict) so that pre-forked gunicorn workers share one copy.
+# Use together with gunicorn.conf.py (preload_app + gc.freeze).
+ML_SHARED_ARTIFACTS = env_bool("ML_SHARED_ARTIFACTS")
+
+# Versioned model registry (ml/registry.py, `manage.py ml_model`). When it
+# has an active version, that version is served instead of the artifacts at
+# the repository root. A background thread of each process checks the ACTIVE
+# file every ML_MODEL_POLL_INTERVAL seconds and hot-swaps to a newly activated
+# version once it is loaded (0 disables the check: the version is only read
+# once at startup).
+ML_MODEL_REGISTRY_DIR = os.getenv("ML_MODEL_REGISTRY_DIR", str(BASE_DIR / "model_registry"))
+ML_MODEL_POLL_INTERVAL = env_int("ML_MODEL_POLL_INTERVAL", 5)
+
+# Prediction cache keyed by cleaned text + model version (ml/cache.py).
+# Size of the in-process LRU (0 disables the cache), entry lifetime in
+# seconds, and optional alias of a shared Django cache (e.g. "default")
+# used as a second level across workers.
+ML_PREDICTION_CACHE_SIZE = env_int("ML_PREDICTION_CACHE_SIZE", 10000)
+ML_PREDICTION_CACHE_TTL = env_int("ML_PREDICTION_CACHE_TTL", 3600)
+ML_PREDICTION_CACHE_BACKEND = os.getenv("ML_PREDICTION_CACHE_BACKEND", "")
+
+# Micro-batching of concurrent single-text predictions (ml/coalescer.py).
+# Texts arriving within the window, or until the max batch is reached,
+# are scored together. Only useful with threaded or async workers. A
+# request waits at most 50 windows (0.1 s minimum) for its batch, then
+# scores its texts itself.
+ML_COALESCE_ENABLED = env_bool("ML_COALESCE_ENABLED")
+ML_COALESCE_WINDOW_MS = env_int("ML_COALESCE_WINDOW_MS", 2)
+ML_COALESCE_MAX_BATCH = env_int("ML_COALESCE_MAX_BATCH", 32)
+
+# Inference sidecar (ml/sidecar.py, `manage.py ml_sidecar`). Workers send
+# their texts to the single sidecar process listening on ML_SIDECAR_SOCKET,
+# which holds the only copy of the artifacts and batches the texts of all
+# workers (with the ML_COALESCE_* window). Texts the sidecar does not score
+# within ML_SIDECAR_TIMEOUT_MS milliseconds are scored in-process.
+ML_SIDECAR_ENABLED = env_bool("ML_SIDECAR_ENABLED")
+ML_SIDECAR_SOCKET = os.getenv("ML_SIDECAR_SOCKET", "/tmp/weeb-ml-sidecar.sock")
+ML_SIDECAR_TIMEOUT_MS = env_int("ML_SIDECAR_TIMEOUT_MS", 500)
+
+# Prediction log (ml.models.PredictionLog, ml/prediction_log.py). Served
+# predictions are buffered in memory and written by a background thread with
+# one bulk_create every BATCH_SIZE rows or FLUSH_MS milliseconds. At most
+# MAX_BUFFER rows wait per process: beyond that, predictions are not logged.
+# The log is for auditing, not replay: only the first MAX_TEXT_CHARS
+# characters of each text are kept, so the buffer of a worker never holds
+# more than about MAX_BUFFER x MAX_TEXT_CHARS characters (10 MB by default).
+ML_PREDICTION_LOG_ENABLED = env_bool("ML_PREDICTION_LOG_ENABLED")
+ML_PREDICTION_LOG_BATCH_SIZE = env_int("ML_PREDICTION_LOG_BATCH_SIZE", 500)
+ML_PREDICTION_LOG_FLUSH_MS = env_int("ML_PREDICTION_LOG_FLUSH_MS", 1000)
+ML_PREDICTION_LOG_MAX_BUFFER = env_int("ML_PREDICTION_LOG_MAX_BUFFER", 10000)
+ML_PREDICTION_LOG_MAX_TEXT_CHARS = env_int("ML_PREDICTION_LOG_MAX_TEXT_CHARS", 1000)
+
+# Size of the thread pool the async sentiment view (ASGI) offloads the
+# CPU-bound scoring to. Bounds the number of texts scored at once per process.
+ML_ASYNC_MAX_WORKERS = env_int("ML_ASYNC_MAX_WORKERS", 4)
+
+# Input drift sketches (ml/drift.py): fixed-memory histograms of length,
+# out-of-vocabulary rate and predictions, and top out-of-vocabulary tokens.
+# One text in SAMPLE_EVERY is sketched, on its first MAX_WORDS words. Each
+# worker saves its sketch every FLUSH_SECONDS (0: never) as a DriftSnapshot,
+# kept RETENTION_DAYS days and merged by /api/monitoring/drift/.
+ML_DRIFT_ENABLED = env_bool("ML_DRIFT_ENABLED")
+ML_DRIFT_SAMPLE_EVERY = env_int("ML_DRIFT_SAMPLE_EVERY", 1)
+ML_DRIFT_MAX_WORDS = env_int("ML_DRIFT_MAX_WORDS", 128)
+ML_DRIFT_TOP_K = env_int("ML_DRIFT_TOP_K", 20)
+ML_DRIFT_FLUSH_SECONDS = env_int("ML_DRIFT_FLUSH_SECONDS", 60)
+ML_DRIFT_RETENTION_DAYS = env_int("ML_DRIFT_RETENTION_DAYS", 7)
+
+# Warm-up of the sentiment model when a process starts (ml/warmup.py): a
+# corpus (UTF-8 file, one text per line, built-in texts when empty) is run
+# ML_WARMUP_ROUNDS times through the scoring path, and /api/monitoring/ready/
+# answers 503 until it is done. Enable it for the serving processes only,
+# management commands would warm up for nothing.
+ML_WARMUP_ENABLED = env_bool("ML_WARMUP_ENABLED")
+ML_WARMUP_CORPUS = os.getenv("ML_WARMUP_CORPUS", "")
+ML_WARMUP_ROUNDS = env_int("ML_WARMUP_ROUNDS", 2)
+
+# Cost-weighted throttling of the ML endpoints (ml/throttling.py, "ml" rate
+# of DEFAULT_THROTTLE_RATES): a request costs 1 unit plus 1 per
+# ML_THROTTLE_CHARS_PER_UNIT characters of payload (1 unit per item for
+# batches).
+ML_THROTTLE_CHARS_PER_UNIT = env_int("ML_THROTTLE_CHARS_PER_UNIT", 1000)
+
+# Default number of n-grams returned when a prediction is requested
+# with "explain": true.
+ML_EXPLAIN_TOP_K = env_int("ML_EXPLAIN_TOP_K", 5)
+
+
 AUTHENTICATION_BACKENDS = [
     "axes.backends.AxesStandaloneBackend",   
     "django.contrib.auth.backends.ModelBackend",
@@ -245,5 +364,9 @@ REST_FRAMEWORK = {
         "user": os.getenv("THROTTLE_USER"),
         # Global per IP (all requests combined): max 200 requests per minute
         "sitewide_ip": os.getenv("THROTTLE_SITEWIDE"),
+        # ML endpoints (ml/throttling.py): budget of cost units per client,
+        # 600 per minute by default, a unit being ML_THROTTLE_CHARS_PER_UNIT
+        # characters
+        "ml": os.getenv("THROTTLE_ML", "600/min"),
     },
 }